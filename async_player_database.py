@@ -0,0 +1,196 @@
+"""
+Async Facade for the Player Database
+Awaitable versions of the PlayerDatabase methods for the Discord command
+handlers. Writes run on one dedicated thread (so they stay serialized); reads
+run on a small pool so a heavy history lookup doesn't hold up other commands.
+A cancelled or timed-out read is interrupted inside SQLite, not just abandoned.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from player_database import PlayerDatabase
+
+
+class AsyncPlayerDatabase:
+    def __init__(self, db: PlayerDatabase, read_workers: int = 3, query_timeout: float = 15.0,
+                 slow_query_ms: float = 500.0):
+        """
+        db: the PlayerDatabase to wrap
+        query_timeout: seconds before a read is interrupted (None = no limit)
+        slow_query_ms: queries slower than this are logged
+        """
+        self.db = db
+        self.query_timeout = query_timeout
+        self.slow_query_ms = slow_query_ms
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="player-db-write")
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="player-db-read")
+        self._running = {}  # call id -> thread id, while a read is executing
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self.query_stats = {}  # method -> {'calls', 'total_ms', 'max_ms', 'errors', 'cancelled'}
+
+    def _record(self, name: str, elapsed_ms: float, outcome: str = None):
+        with self._lock:
+            stats = self.query_stats.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                       'errors': 0, 'cancelled': 0})
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            if outcome:
+                stats[outcome] += 1
+        if elapsed_ms > self.slow_query_ms:
+            print(f"🐢 Slow database call: {name} took {elapsed_ms:.0f} ms")
+
+    def _run(self, call_id, func, args, kwargs):
+        """Executed on a DB thread"""
+        with self._lock:
+            self._running[call_id] = threading.get_ident()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running.pop(call_id, None)
+
+    def _interrupt(self, call_id):
+        with self._lock:
+            thread_id = self._running.get(call_id)
+            if thread_id is not None:
+                self.db.interrupt(thread_id)
+
+    async def _call(self, executor, name: str, *args, timeout: float = None, **kwargs):
+        loop = asyncio.get_running_loop()
+        call_id = next(self._ids)
+        func = getattr(self.db, name)
+        started = time.perf_counter()
+        future = loop.run_in_executor(executor, self._run, call_id, func, args, kwargs)
+        try:
+            if timeout is None:
+                result = await future
+            else:
+                result = await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Not started yet: the executor drops it. Running: abort the SQLite statement
+            if executor is self._readers:
+                self._interrupt(call_id)
+            self._record(name, (time.perf_counter() - started) * 1000, 'cancelled')
+            raise
+        except Exception:
+            self._record(name, (time.perf_counter() - started) * 1000, 'errors')
+            raise
+        self._record(name, (time.perf_counter() - started) * 1000)
+        return result
+
+    async def _read(self, name: str, *args, **kwargs):
+        return await self._call(self._readers, name, *args, timeout=self.query_timeout, **kwargs)
+
+    async def _write(self, name: str, *args, **kwargs):
+        # Writes are never interrupted half way; a cancelled caller just stops waiting
+        return await self._call(self._writer, name, *args, **kwargs)
+
+    def stats(self) -> Dict:
+        """Per-method call counts and timings (avg/max ms)"""
+        with self._lock:
+            return {name: dict(s, avg_ms=s['total_ms'] / s['calls'] if s['calls'] else 0.0)
+                    for name, s in self.query_stats.items()}
+
+    def close(self):
+        self._readers.shutdown(wait=False, cancel_futures=True)
+        self._writer.shutdown(wait=True)
+
+    # ---- writes ----------------------------------------------------------
+
+    async def update_player(self, guid: str, name: str, ip: str = None, beguid: str = None,
+                            server_name: str = None, geo_data: Dict = None,
+                            connected_at: str = None, open_session: bool = True) -> List[str]:
+        return await self._write('update_player', guid, name, ip, beguid, server_name, geo_data, connected_at,
+                                 open_session)
+
+    async def update_players_batch(self, events: List[Dict]) -> List[List[str]]:
+        return await self._write('update_players_batch', events)
+
+    async def close_session(self, guid: str, server_name: str = None, ended_at: str = None,
+                            reason: str = 'disconnect') -> Optional[int]:
+        return await self._write('close_session', guid, server_name, ended_at, reason)
+
+    async def close_server_sessions(self, server_name: str, ended_at: str = None,
+                                    reason: str = 'server_restart') -> int:
+        return await self._write('close_server_sessions', server_name, ended_at, reason)
+
+    async def acknowledge_alert(self, alert_id: int):
+        return await self._write('acknowledge_alert', alert_id)
+
+    async def acknowledge_alerts(self, ids: List[int] = None, before_timestamp: str = None,
+                                 guid: str = None) -> int:
+        return await self._write('acknowledge_alerts', ids, before_timestamp, guid)
+
+    async def ban_player(self, guid: str, reason: str):
+        return await self._write('ban_player', guid, reason)
+
+    async def unban_player(self, guid: str):
+        return await self._write('unban_player', guid)
+
+    async def add_notes(self, guid: str, notes: str):
+        return await self._write('add_notes', guid, notes)
+
+    async def save_checkpoint(self, stream: str, file_path: str, inode: int,
+                              offset: int, last_line_hash: str = None):
+        return await self._write('save_checkpoint', stream, file_path, inode, offset, last_line_hash)
+
+    async def cleanup_old_events(self, days: int = 30, archive_dir: str = None,
+                                 chunk_size: int = 5000, pause: float = 0.05) -> int:
+        return await self._write('cleanup_old_events', days, archive_dir, chunk_size, pause)
+
+    async def rebuild_alt_clusters(self, min_weight: float = None, max_age_days: int = None) -> Dict:
+        return await self._write('rebuild_alt_clusters', min_weight, max_age_days)
+
+    async def check_stats_counters(self, repair: bool = True) -> Dict:
+        return await self._write('check_stats_counters', repair)
+
+    async def rebuild_player_summary(self) -> int:
+        return await self._write('rebuild_player_summary')
+
+    # ---- reads -----------------------------------------------------------
+
+    async def get_player_by_guid(self, guid: str) -> Optional[Dict]:
+        return await self._read('get_player_by_guid', guid)
+
+    async def get_player_by_name(self, name: str) -> Optional[Dict]:
+        return await self._read('get_player_by_name', name)
+
+    async def get_player_profile(self, guid: str) -> Optional[Dict]:
+        return await self._read('get_player_profile', guid)
+
+    async def get_player_history(self, guid: str) -> Dict:
+        return await self._read('get_player_history', guid)
+
+    async def find_alts(self, ip_address: str) -> List[Dict]:
+        return await self._read('find_alts', ip_address)
+
+    async def find_alts_in_subnet(self, cidr: str, limit: int = 500) -> List[Dict]:
+        return await self._read('find_alts_in_subnet', cidr, limit)
+
+    async def find_name_alts(self, name: str, limit: int = 500) -> List[Dict]:
+        return await self._read('find_name_alts', name, limit)
+
+    async def get_open_sessions(self, server_name: str = None) -> List[Dict]:
+        return await self._read('get_open_sessions', server_name)
+
+    async def get_playtime(self, guid: str, server_name: str = None) -> Dict:
+        return await self._read('get_playtime', guid, server_name)
+
+    async def get_alt_cluster(self, guid: str, min_weight: float = None) -> Dict:
+        return await self._read('get_alt_cluster', guid, min_weight)
+
+    async def get_unacknowledged_alerts(self, limit: int = 50, after_id: int = None) -> List[Dict]:
+        return await self._read('get_unacknowledged_alerts', limit, after_id)
+
+    async def get_stats(self) -> Dict:
+        return await self._read('get_stats')
+
+    async def get_checkpoint(self, stream: str) -> Optional[Dict]:
+        return await self._read('get_checkpoint', stream)
@@ -5,13 +5,18 @@ Reads your server logs and automatically populates the database
 """
 
 import sys
-import time
 import os
 from collections import deque
 
 sys.path.insert(0, '/srv/armareforger/player_database')
 from player_database import PlayerDatabase
 from player_log_monitor import PlayerLogMonitor
+from log_tailer import FileCursor, LogTailer
+from log_manifest import get_manifest
+from ingest_queue import IngestQueue
+from log_classifier import EventPipeline, LogClock, log_end_time
+from log_backfill import checkpoint_stream
+from log_events import PlayerAuthenticated, PlayerDisconnected
 
 # Configuration
 DB_PATH = "/srv/armareforger/Skeeters_Clanker/data/players.db"
@@ -27,31 +32,108 @@ LOG_PATHS = {
 def get_latest_log_file(server_name):
     """Get the most recent console.log file for a server"""
     log_path = LOG_PATHS.get(server_name)
-    if not log_path or not os.path.exists(log_path):
-        print(f"⚠️ Log path not found for {server_name}: {log_path}")
+    latest = get_manifest(LOG_PATHS).latest(server_name)
+    if latest is None:
+        if not log_path or not os.path.exists(log_path):
+            print(f"⚠️ Log path not found for {server_name}: {log_path}")
+        else:
+            print(f"⚠️ No log directories found for {server_name}")
         return None
     
-    # Get all dated directories
-    dirs = [d for d in os.listdir(log_path) if os.path.isdir(os.path.join(log_path, d)) and d.startswith('20')]
-    if not dirs:
-        print(f"⚠️ No log directories found for {server_name}")
-        return None
+    if os.path.exists(latest.log_file):
+        return latest.log_file
+    return None
+
+def resume_from_checkpoints(db, tailer):
+    """Point each server's cursor at its saved ingestion checkpoint (if still valid)"""
+    for server_name in LOG_PATHS.keys():
+        checkpoint = db.get_checkpoint(server_name)
+        if not checkpoint:
+            continue
+        
+        # log_backfill may have imported further into this file while we were down
+        imported = db.get_checkpoint(checkpoint_stream(checkpoint['file_path']))
+        if imported and imported['inode'] == checkpoint['inode'] and imported['offset'] > checkpoint['offset']:
+            checkpoint = imported
+        
+        if tailer.restore(server_name, checkpoint):
+            print(f"⏩ {server_name}: resuming at byte {checkpoint['offset']:,} of {checkpoint['file_path']}")
+        else:
+            print(f"⚠️ {server_name}: checkpoint no longer matches {checkpoint['file_path']} - re-reading latest session")
+            # The server restarted while we were down: whoever was on it then is gone
+            ended_at = log_end_time(checkpoint['file_path']) or checkpoint['updated_at']
+            closed = db.close_server_sessions(server_name, ended_at)
+            if closed:
+                print(f"   Closed {closed} sessions left open on {server_name}")
+
+def build_pipeline(monitor, queue, tailer):
+    """
+    Parse pipeline with the player monitor subscribed to authentication and disconnect events
+    Geo lookups happen here; the DB write is handed to the ingest queue.
+    A session rollover closes every session still open on the old log and marks
+    that log as imported, so log_backfill does not read it again.
+    """
+    pipeline = EventPipeline()
+    clocks = {}  # server -> (log file, LogClock)
     
-    # Get most recent
-    dirs.sort(reverse=True)
-    log_file = os.path.join(log_path, dirs[0], "console.log")
+    def timestamp(event):
+        """ISO time of an event in the log currently being read"""
+        cursor = tailer.cursors.get(event.server_name)
+        if cursor is None:
+            return None
+        path, clock = clocks.get(event.server_name, (None, None))
+        if path != cursor.path:
+            clock = LogClock.for_log_file(cursor.path)
+            clocks[event.server_name] = (cursor.path, clock)
+        return clock.timestamp(event.log_time) if clock else None
     
-    if os.path.exists(log_file):
-        return log_file
-    return None
+    def handle(event):
+        geo_data = monitor.get_ip_geolocation(event.ip) if event.ip else None
+        queue.put(event.guid, event.name, event.ip, event.beguid, event.server_name, geo_data,
+                  timestamp(event))
+    
+    def handle_disconnect(event):
+        if event.guid:  # BattlEye's own disconnect line has no platform GUID
+            queue.put_disconnect(event.guid, event.server_name, timestamp(event))
+    
+    def rollover(server_name, old_path, new_path):
+        pipeline.reset(server_name)
+        queue.put_session_end(server_name, log_end_time(old_path))
+        # The old log is drained and its server process gone: record it as fully ingested
+        done = FileCursor(old_path)
+        done.seek_end()
+        queue.put_checkpoint(checkpoint_stream(old_path), done.checkpoint())
+    
+    pipeline.subscribe(handle, PlayerAuthenticated)
+    pipeline.subscribe(handle_disconnect, PlayerDisconnected)
+    tailer.on_rollover = rollover
+    return pipeline
+
+def ingest_new_lines(pipeline, queue, tailer, server_name):
+    """
+    Push every new line for one server through the pipeline and checkpoint after each chunk
+    Returns (lines processed, player events handled)
+    """
+    lines_processed = 0
+    events = 0
+    
+    for lines in tailer.iter_new_chunks(server_name):
+        # Blocks here (and stops reading the log) if the DB writer falls behind
+        events += pipeline.feed(lines, server_name)
+        lines_processed += len(lines)
+        
+        # Committed together with this chunk's player updates
+        queue.put_checkpoint(server_name, tailer.checkpoint(server_name))
+    
+    return lines_processed, events
 
-def import_all_logs(monitor, db):
-    """Import all existing logs from all servers"""
+def import_all_logs(monitor, db, tailer, queue):
+    """Import everything not yet ingested (whole latest session, or the rest since the last checkpoint)"""
     print("\n" + "="*60)
-    print("📥 IMPORTING ALL EXISTING PLAYER DATA FROM LOGS")
+    print("📥 IMPORTING NEW PLAYER DATA FROM LOGS")
     print("="*60 + "\n")
     
-    total_players = 0
+    pipeline = build_pipeline(monitor, queue, tailer)
     
     for server_name in LOG_PATHS.keys():
         log_file = get_latest_log_file(server_name)
@@ -61,16 +143,11 @@ def import_all_logs(monitor, db):
         print(f"\n📖 Processing {server_name}: {log_file}")
         
         try:
-            with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-                lines = f.readlines()
-                print(f"   Found {len(lines)} log lines")
-                
-                for i, line in enumerate(lines):
-                    alerts = monitor.process_log_line(line, server_name)
-                    if alerts:
-                        total_players += 1
-                        if total_players % 10 == 0:
-                            print(f"   Processed {total_players} players...")
+            alerts_before = queue.stats()['alerts']
+            lines, players = ingest_new_lines(pipeline, queue, tailer, server_name)
+            queue.flush()
+            print(f"   Read {lines} new log lines ({players} player events, "
+                  f"{queue.stats()['alerts'] - alerts_before} alerts)")
         except Exception as e:
             print(f"   ❌ Error: {e}")
     
@@ -79,51 +156,36 @@ def import_all_logs(monitor, db):
     print(f"✅ IMPORT COMPLETE")
     print(f"   Total players in database: {stats['total_players']}")
     print(f"   VPN IPs detected: {stats['vpn_ips_detected']}")
+    cache = db.get_cache_stats()
+    print(f"   Player cache: {cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']:.0%})")
     print("="*60 + "\n")
 
-def monitor_logs_continuously(monitor):
+def print_alerts(server_name, alerts):
+    print(f"🚨 [{server_name}] {'; '.join(alerts)}")
+
+def monitor_logs_continuously(monitor, tailer, queue):
     """Monitor logs in real-time"""
     print("\n📡 Starting continuous log monitoring...")
     print("   Press Ctrl+C to stop\n")
+    print(f"   Watching {len(LOG_PATHS)} servers ({tailer.mode})\n")
     
-    # Track last position in each log file
-    file_positions = {}
+    pipeline = build_pipeline(monitor, queue, tailer)
+    queue.on_alerts = print_alerts
     
     try:
         while True:
             for server_name in LOG_PATHS.keys():
-                log_file = get_latest_log_file(server_name)
-                if not log_file:
-                    continue
-                
-                # Initialize position tracking
-                if log_file not in file_positions:
-                    # Start at end of file
-                    try:
-                        with open(log_file, 'r') as f:
-                            f.seek(0, 2)  # Go to end
-                            file_positions[log_file] = f.tell()
-                    except:
-                        file_positions[log_file] = 0
-                
-                # Read new lines
                 try:
-                    with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-                        f.seek(file_positions[log_file])
-                        new_lines = f.readlines()
-                        file_positions[log_file] = f.tell()
-                        
-                        for line in new_lines:
-                            alerts = monitor.process_log_line(line, server_name)
-                            if alerts:
-                                print(f"🚨 [{server_name}] {'; '.join(alerts)}")
+                    ingest_new_lines(pipeline, queue, tailer, server_name)
                 except Exception as e:
-                    pass
+                    print(f"❌ [{server_name}] {e}")
             
-            time.sleep(2)  # Check every 2 seconds
+            tailer.wait(2)  # Wake on file changes, or check every 2 seconds
             
     except KeyboardInterrupt:
         print("\n\n⚠️ Stopping monitor...")
+        print(f"   Ingest queue: {queue.stats()}")
+        print(f"   Player cache: {queue.db.get_cache_stats()}")
 
 if __name__ == "__main__":
     print("""
@@ -138,15 +200,25 @@ if __name__ == "__main__":
     db = PlayerDatabase(DB_PATH)
     monitor = PlayerLogMonitor(DB_PATH, API_KEY)
     
-    # Import all existing logs first
-    import_all_logs(monitor, db)
+    # Resume where the last run stopped; servers without a checkpoint start at byte 0
+    tailer = LogTailer(LOG_PATHS, start_at_end=False)
+    resume_from_checkpoints(db, tailer)
+    
+    # Parsed connections are written in batches by a single writer thread
+    queue = IngestQueue(db)
+    
+    # Catch up on anything not yet ingested
+    import_all_logs(monitor, db, tailer, queue)
     
     # Ask if user wants continuous monitoring
     print("\n" + "="*60)
     response = input("Start continuous monitoring? (y/n): ")
     
     if response.lower() == 'y':
-        monitor_logs_continuously(monitor)
+        monitor_logs_continuously(monitor, tailer, queue)
     else:
         print("\n✅ Initial import complete. Database populated!")
         print("   Run this script again with 'y' to enable continuous monitoring")
+    
+    # Commit whatever is still queued before exiting
+    queue.close()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-consumer regexes (before) vs the shared single-pass classifier (after)
+Usage: python3 bench_log_classifier.py [lines]
+"""
+
+import random
+import re
+import sys
+import time
+
+from log_classifier import classify_line, parse_events, CRASH_KEYWORDS
+
+# Patterns as each consumer ran them before the shared classifier
+MONITOR_CONNECT = re.compile(r"Player (?:id=(\d+) )?(.+?) \((\d+)\) has been authenticated\.")
+MONITOR_BEGUID = re.compile(r"BE GUID: (\w+)")
+MONITOR_IP = re.compile(r"(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}):(\d+)")
+
+
+def legacy_parse(line):
+    """Everything the monitor, crash monitor and bot used to run against one line"""
+    # PlayerLogMonitor.parse_player_connection
+    if MONITOR_CONNECT.search(line):
+        MONITOR_IP.search(line)
+        MONITOR_BEGUID.search(line)
+
+    # crash_monitor.scan_logs_for_packet_loss (uncompiled, module-level cache lookups)
+    re.search(r'Player joined, id: (\d+),.*name: ([^,]+)', line)
+    re.search(r'PlayerId=(\d+), Name=([^,]+)', line)
+    re.search(r"BattlEye Server: 'Player #(\d+) ([^(]+) \(", line)
+    re.search(r'Player connected: connectionID=(\d+)', line)
+    if 'PktLoss:' in line:
+        re.findall(r'\[C(\d+)\], PktLoss: (\d+)/100', line)
+
+    # crash_monitor.scan_logs_for_crashes
+    for keyword in CRASH_KEYWORDS:
+        if keyword.lower() in line.lower():
+            break
+
+    # bot.py get_players / player_ips / vpn_check / find_player
+    re.search(r'Player joined, id: \d+,.*name: ([^,]+), identityId: ([a-f0-9-]+)', line)
+    re.search(r"BattlEye Server: 'Player #\d+ ([^(]+) \(([^:]+):\d+\) connected'", line)
+    re.search(r"BattlEye Server: 'Player #(\d+) ([^-]+) - BE GUID: ([a-f0-9]+)'", line)
+    re.search(r"BattlEye Server: 'Player #\d+ ([^ ]+) disconnected'", line)
+
+
+def make_lines(count, seed=1):
+    """Mix of player events, stats lines and the usual engine noise"""
+    rng = random.Random(seed)
+    noise = [
+        "SCRIPT       : SCR_BaseGameMode: Game state changed",
+        "RESOURCES    : Loading prefab {1234ABCD}Prefabs/Vehicles/Wheeled/UAZ469.et",
+        "NETWORK      : Replication tick took 3.2 ms",
+        "WORLD        : Entity spawned at <1234.5 12.0 5678.9>",
+        "AI           : Group waypoint completed",
+    ]
+    lines = []
+    for i in range(count):
+        t = f"{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}.{i % 1000:03d}"
+        n = rng.randint(1, 400)
+        roll = rng.random()
+        if roll < 0.02:
+            line = f"{t}  BattlEye Server: 'Player #{n} Player{n} (10.0.{n % 256}.{n % 200}:2302) connected'"
+        elif roll < 0.04:
+            line = f"{t}  BattlEye Server: 'Player #{n} Player{n} - BE GUID: {n:032x}'"
+        elif roll < 0.06:
+            line = f"{t}  BattlEye Server: 'Player #{n} Player{n} disconnected'"
+        elif roll < 0.08:
+            line = f"{t}  Player joined, id: {n}, platform: PC, name: Player{n}, identityId: {n:08x}-0000-1111-2222-333344445555"
+        elif roll < 0.10:
+            stats = ' '.join(f"[C{c}], PktLoss: {rng.randint(0, 20)}/100," for c in range(1, 40))
+            line = f"{t}  DEFAULT      : FPS: 60.0, frame time (avg: 16.6 ms) {stats}"
+        else:
+            line = f"{t}  {rng.choice(noise)}"
+        lines.append(line + "\n")
+    return lines
+
+
+def bench(name, func, lines):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    elapsed = time.perf_counter() - start
+    rate = len(lines) / elapsed
+    print(f"   {name:<28} {rate:>14,.0f} lines/sec  ({elapsed:.3f}s)")
+    return rate
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    lines = make_lines(count)
+
+    print(f"\n⏱️ Classifying {count:,} synthetic console.log lines\n")
+    before = bench("before (per-consumer regexes)", legacy_parse, lines)
+    after = bench("after (classify_line)", classify_line, lines)
+
+    start = time.perf_counter()
+    events = sum(1 for _ in parse_events(lines, "bench"))
+    elapsed = time.perf_counter() - start
+    print(f"   {'full pipeline (parse_events)':<28} {len(lines) / elapsed:>14,.0f} lines/sec  "
+          f"({elapsed:.3f}s, {events:,} events)")
+    print(f"\n✅ Speedup: {after / before:.1f}x")
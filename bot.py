@@ -9,11 +9,12 @@ from discord import app_commands
 from discord.ext import commands, tasks
 import docker
 import asyncio
+import ipaddress
 import re
 import os
 import json
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
 from collections import defaultdict
 
@@ -21,7 +22,14 @@ from collections import defaultdict
 import sys
 sys.path.insert(0, '/srv/armareforger/player_database')
 from player_database import PlayerDatabase
+from async_player_database import AsyncPlayerDatabase
 from player_log_monitor import PlayerLogMonitor
+from log_tailer import read_tail, read_tail_lines
+from log_index import LogIndex
+from log_manifest import get_manifest
+from log_summary import LiveSession, SessionSummaries, summarize_lines, player_matches
+from log_classifier import parse_events
+from log_events import PlayerConnected, PlayerGuid, PlayerDisconnected, PlayerJoined
 
 # =============================================================================
 # DATA STORAGE (persists to JSON files)
@@ -86,13 +94,19 @@ IPGEO_API_KEY = "aa519b371cdb46fc869e690cbba6e25c"  # ipgeolocation.io API key (
 
 # Initialize player database (after IPGEO_API_KEY is defined)
 DB_PATH = "/srv/armareforger/Skeeters_Clanker/data/players.db"
+EVENT_RETENTION_DAYS = 90  # connection_events older than this are archived and removed
+EVENT_ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+ALT_LINK_MAX_AGE_DAYS = 180  # accounts that last shared an IP/name/BE GUID longer ago than this aren't clustered
 try:
-    player_db = PlayerDatabase(DB_PATH)
+    player_db = PlayerDatabase(DB_PATH, alt_max_age_days=ALT_LINK_MAX_AGE_DAYS)
+    # Commands await this instead of calling player_db on the event loop
+    player_db_async = AsyncPlayerDatabase(player_db)
     player_monitor = PlayerLogMonitor(DB_PATH, IPGEO_API_KEY)
     print(f"✅ Player database initialized: {DB_PATH}")
 except Exception as e:
     print(f"⚠️ Player database initialization failed: {e}")
     player_db = None
+    player_db_async = None
     player_monitor = None
 
 
@@ -136,7 +150,7 @@ def lookup_ip(ip_address):
             pass
         
         return result if result else {'error': 'Lookup failed'}
-        
+    
     except Exception as e:
         return {'error': str(e)}
 
@@ -159,56 +173,65 @@ LOG_PATHS = {
     "ttt3": "/srv/armareforger/u98fbb3f3c/logs",
 }
 
+# Inverted index over archived sessions (player names, BE GUIDs, identity IDs, IPs)
+LOG_INDEX_PATH = os.path.join(DATA_DIR, "log_index.db")
+try:
+    log_index = LogIndex(LOG_INDEX_PATH, LOG_PATHS)
+except Exception as e:
+    print(f"⚠️ Log index initialization failed: {e}")
+    log_index = None
+
+# Sorted session directories per server, rescanned only when a log root changes
+session_manifest = get_manifest(LOG_PATHS)
+
+# JSON summaries written next to each closed console.log (players, connect times, crashes)
+session_summaries = SessionSummaries(LOG_PATHS)
+
 def get_latest_log_dir(server_name):
     """Get the most recent log directory for a server"""
-    import os
-    log_path = LOG_PATHS.get(server_name.lower())
-    if not log_path or not os.path.exists(log_path):
-        return None
-    
-    # Get all dated directories
-    dirs = [d for d in os.listdir(log_path) if os.path.isdir(os.path.join(log_path, d)) and d.startswith('20')]
-    if not dirs:
-        return None
-    
-    # Sort by name (they're date-formatted, so this works)
-    dirs.sort(reverse=True)
-    return os.path.join(log_path, dirs[0])
+    return session_manifest.latest_dir(server_name.lower())
 
 def get_all_log_dirs(server_name, max_sessions=10):
-    """Get log directories for a server (limited for performance)"""
-    import os
-    log_path = LOG_PATHS.get(server_name.lower())
-    if not log_path or not os.path.exists(log_path):
-        return []
-    
-    # Get all dated directories
-    dirs = [d for d in os.listdir(log_path) if os.path.isdir(os.path.join(log_path, d)) and d.startswith('20')]
-    dirs.sort(reverse=True)  # Most recent first
-    return [os.path.join(log_path, d) for d in dirs[:max_sessions]]
+    """Get log directories for a server, most recent first (limited for performance)"""
+    return session_manifest.recent_dirs(server_name.lower(), max_sessions)
+
+# Live sessions are read incrementally by byte offset and parsed as they grow: repeated
+# /players, /player-ips, /find-player and history calls only parse what was appended
+_live_sessions = {}  # server_name -> LiveSession over its current console.log
 
-def read_current_session_log(server_name, log_type='console'):
-    """Read ENTIRE current session log file - for player tracking"""
+def get_live_session(server_name):
+    """The server's current session log, brought up to date (None if there is none)"""
     import os
     
     log_dir = get_latest_log_dir(server_name)
     if not log_dir:
-        return ""
+        return None
     
-    log_file = os.path.join(log_dir, f"{log_type}.log")
+    log_file = os.path.join(log_dir, "console.log")
     if not os.path.exists(log_file):
-        return ""
+        return None
+    
+    key = server_name.lower()
+    live = _live_sessions.get(key)
+    if live is None or live.log_file != log_file:
+        # First call or a new session started - the old session's state is dropped
+        live = LiveSession(log_file)
+        _live_sessions[key] = live
     
     try:
-        with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-            return f.read()
-    except:
-        return ""
+        live.update()
+    except OSError:
+        return None
+    return live
+
+def live_session_summary(server_name):
+    """Summary of the server's live session (empty if there is no log)"""
+    live = get_live_session(server_name)
+    return live.summary() if live else summarize_lines([], 'live')
 
 def read_log_file_tail(server_name, log_type='console', lines=500):
     """Read last N lines from a server's log file - memory efficient for monitoring"""
     import os
-    from collections import deque
     
     log_dir = get_latest_log_dir(server_name)
     if not log_dir:
@@ -219,14 +242,13 @@ def read_log_file_tail(server_name, log_type='console', lines=500):
         return ""
     
     try:
-        with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-            last_lines = deque(f, maxlen=lines)
-        return ''.join(last_lines)
+        # mmap + backwards scan: cost depends on N, not on how big the session log is
+        return read_tail(log_file, lines)
     except:
         return ""
 
-def update_player_database(server_name, player_info):
-    """Update player database when we parse a player from logs"""
+async def update_player_database(server_name, player_info):
+    """Update player database when we parse a player from logs (HTTP and SQLite run off the event loop)"""
     if not player_db:
         return []
     
@@ -236,7 +258,7 @@ def update_player_database(server_name, player_info):
         if player_info.get('ip'):
             # Use cached IP lookup
             ip_clean = player_info['ip'].split(':')[0]
-            geo_result = lookup_ip(ip_clean)
+            geo_result = await asyncio.to_thread(lookup_ip, ip_clean)
             if 'error' not in geo_result:
                 geo_data = {
                     'country_name': geo_result.get('country'),
@@ -248,13 +270,14 @@ def update_player_database(server_name, player_info):
                 }
         
         # Update database and get alerts
-        alerts = player_db.update_player(
+        alerts = await player_db_async.update_player(
             guid=player_info['guid'],
             name=player_info['name'],
             ip=player_info.get('ip'),
             beguid=player_info.get('beguid'),
             server_name=server_name,
-            geo_data=geo_data
+            geo_data=geo_data,
+            open_session=False  # found by a log search, not a connect: no play session
         )
         
         # If VPN alert channel is set, send alerts there
@@ -291,34 +314,55 @@ async def send_database_alerts(alerts, server_name):
         print(f"Error sending database alerts: {e}")
 
 
-def search_logs_for_player(server_name, search_term, max_sessions=10):
-    """Search logs efficiently without loading everything into memory"""
+def _scan_log_for_player(log_file, search_lower, results, max_results, start=0):
+    """Linear scan of one log file from byte offset start (only used for what the index doesn't cover yet)"""
+    try:
+        with open(log_file, 'rb') as f:
+            f.seek(start)
+            for raw in f:
+                line = raw.decode('utf-8', errors='replace')
+                if len(results) >= max_results:
+                    break
+                if search_lower in line.lower():
+                    # Only keep lines with player info
+                    if 'BattlEye' in line or 'Player joined' in line:
+                        results.append(line.strip())
+    except:
+        pass
+
+def search_logs_for_player(server_name, search_term, max_results=100):
+    """
+    Search every session of a server for player lines, newest first
+    Archived sessions come from the log index; only the live session (and any
+    session closed since the last index update) is scanned directly
+    """
     import os
     
     results = []
     search_lower = search_term.lower()
-    max_results = 100  # Higher limit with 128GB RAM
     
-    for log_dir in get_all_log_dirs(server_name, max_sessions):
+    # Live session - its player lines are kept by get_live_session
+    live = get_live_session(server_name)
+    for line in live.player_lines() if live else []:
         if len(results) >= max_results:
-            break
-            
-        log_file = os.path.join(log_dir, "console.log")
-        if not os.path.exists(log_file):
-            continue
-        
-        try:
-            with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-                for line in f:
-                    if len(results) >= max_results:
-                        break
-                    if search_lower in line.lower():
-                        # Only keep lines with player info
-                        if 'BattlEye' in line or 'Player joined' in line:
-                            results.append(line.strip())
-        except:
-            pass
+            return results
+        if search_lower in line.lower():
+            results.append(line)
     
+    if log_index is None:
+        for log_dir in get_all_log_dirs(server_name)[1:]:
+            if len(results) >= max_results:
+                break
+            _scan_log_for_player(os.path.join(log_dir, "console.log"), search_lower, results, max_results)
+        return results
+    
+    # Partially indexed sessions: the index search below returns the indexed part
+    for session_dir, log_file, indexed_size in reversed(log_index.pending_sessions(server_name.lower())):
+        if len(results) >= max_results:
+            return results
+        _scan_log_for_player(log_file, search_lower, results, max_results, start=indexed_size)
+    
+    results.extend(log_index.search(server_name.lower(), search_term, max_results - len(results)))
     return results
 
 def get_container_id(name_or_id: str) -> str:
@@ -378,6 +422,55 @@ async def check_permission(interaction: discord.Interaction) -> bool:
 # BOT EVENTS
 # =============================================================================
 
+@tasks.loop(minutes=5)
+async def update_log_index():
+    """Index sessions that closed since the last run (in a thread - first run can take a while)"""
+    try:
+        stats = await asyncio.to_thread(log_index.update)
+        if stats['sessions_indexed']:
+            print(f"📇 Log index updated: {stats}")
+    except Exception as e:
+        print(f"⚠️ Log index update failed: {e}")
+
+@tasks.loop(minutes=5)
+async def update_session_summaries():
+    """Write summary sidecars for sessions that closed since the last run"""
+    try:
+        built = await asyncio.to_thread(session_summaries.update)
+        if built:
+            print(f"📝 Wrote {built} session summaries")
+    except Exception as e:
+        print(f"⚠️ Session summary update failed: {e}")
+
+@tasks.loop(hours=6)
+async def prune_connection_events():
+    """Archive and delete old connection events in small chunks (own thread, not the command writer)"""
+    try:
+        deleted = await asyncio.to_thread(player_db.cleanup_old_events, EVENT_RETENTION_DAYS, EVENT_ARCHIVE_DIR)
+        if deleted:
+            print(f"🗄️ Archived {deleted} connection events older than {EVENT_RETENTION_DAYS} days")
+    except Exception as e:
+        print(f"⚠️ Connection event retention failed: {e}")
+
+@tasks.loop(hours=24)
+async def rebuild_alt_clusters():
+    """Recompute alt clusters so links older than ALT_LINK_MAX_AGE_DAYS drop out (own thread)"""
+    try:
+        stats = await asyncio.to_thread(player_db.rebuild_alt_clusters)
+        print(f"🔗 Alt clusters rebuilt: {stats['clusters']} clusters, {stats['clustered_players']} players")
+    except Exception as e:
+        print(f"⚠️ Alt cluster rebuild failed: {e}")
+
+@tasks.loop(hours=24)
+async def verify_stats_counters():
+    """Recount the /db-stats counters the slow way and repair them if they drifted"""
+    try:
+        result = await asyncio.to_thread(player_db.check_stats_counters)
+        if not result['consistent']:
+            print(f"⚠️ Stats counters were off ({result['counters']} vs {result['actual']}) - rebuilt")
+    except Exception as e:
+        print(f"⚠️ Stats counter check failed: {e}")
+
 @bot.event
 async def on_ready():
     print(f'{bot.user} has connected to Discord!')
@@ -388,6 +481,17 @@ async def on_ready():
         print(f'Synced {len(synced)} command(s)')
     except Exception as e:
         print(f'Failed to sync commands: {e}')
+    
+    if log_index is not None and not update_log_index.is_running():
+        update_log_index.start()
+    if not update_session_summaries.is_running():
+        update_session_summaries.start()
+    if player_db is not None and not prune_connection_events.is_running():
+        prune_connection_events.start()
+    if player_db is not None and not rebuild_alt_clusters.is_running():
+        rebuild_alt_clusters.start()
+    if player_db is not None and not verify_stats_counters.is_running():
+        verify_stats_counters.start()
 
 # =============================================================================
 # CONTAINER MANAGEMENT COMMANDS
@@ -511,7 +615,7 @@ async def server_status(interaction: discord.Interaction, container_name: str):
         
         embed.set_footer(text=f"Container: {container.short_id}")
         await interaction.followup.send(embed=embed)
-        
+    
     except docker.errors.NotFound:
         await interaction.followup.send(f"❌ Container `{container_name}` not found.")
     except Exception as e:
@@ -536,7 +640,7 @@ async def start_server(interaction: discord.Interaction, container_name: str):
         
         container.start()
         await interaction.followup.send(f"✅ **{container_name.upper()}** started successfully!")
-        
+    
     except docker.errors.NotFound:
         await interaction.followup.send(f"❌ Container `{container_name}` not found.")
     except Exception as e:
@@ -561,7 +665,7 @@ async def stop_server(interaction: discord.Interaction, container_name: str):
         
         container.stop(timeout=30)
         await interaction.followup.send(f"🛑 **{container_name.upper()}** stopped successfully!")
-        
+    
     except docker.errors.NotFound:
         await interaction.followup.send(f"❌ Container `{container_name}` not found.")
     except Exception as e:
@@ -589,7 +693,7 @@ async def restart_server(interaction: discord.Interaction, container_name: str):
             await interaction.channel.send(f"✅ **{container_name.upper()}** restarted successfully!")
         else:
             await interaction.channel.send(f"⚠️ **{container_name.upper()}** restart completed but status is: {container.status}")
-        
+    
     except docker.errors.NotFound:
         await interaction.followup.send(f"❌ Container `{container_name}` not found.")
     except Exception as e:
@@ -621,7 +725,7 @@ async def get_logs(interaction: discord.Interaction, container_name: str, lines:
             logs = logs[-1900:]
         
         await interaction.followup.send(f"📜 **{container_name.upper()}** logs:\n```\n{logs}\n```")
-        
+    
     except docker.errors.NotFound:
         await interaction.followup.send(f"❌ Container `{container_name}` not found.")
     except Exception as e:
@@ -657,7 +761,7 @@ async def search_logs(interaction: discord.Interaction, container_name: str, pat
             result = result[-1900:]
         
         await interaction.followup.send(f"🔍 Found {len(matches)} matches for `{pattern}`:\n```\n{result}\n```")
-        
+    
     except docker.errors.NotFound:
         await interaction.followup.send(f"❌ Container `{container_name}` not found.")
     except Exception as e:
@@ -680,42 +784,36 @@ async def get_players(interaction: discord.Interaction, container_name: str):
         container_id = get_container_id(container_name)
         container = docker_client.containers.get(container_id)
         
-        # Read ENTIRE current session (from game start to now)
-        logs = read_current_session_log(container_name, 'console')
-        if not logs:
+        # Player events of the ENTIRE current session (from game start to now)
+        live = await asyncio.to_thread(get_live_session, container_name)
+        if live and live.line_count:
+            events = live.player_events()
+        else:
             # Fallback to docker logs
             logs = container.logs(tail=2000).decode('utf-8', errors='replace')
+            events = parse_events(logs.split('\n'))
         
         # Track players - use dict to track join/leave status
         players = {}  # name -> {'joined': bool, 'identity': str}
         
-        for line in logs.split('\n'):
+        for event in events:
             # Player joined: "Player joined, id: 131, ... name: Heck Let Loose, identityId: xxx"
-            join_match = re.search(r'Player joined, id: \d+,.*name: ([^,]+), identityId: ([a-f0-9-]+)', line)
-            if join_match:
-                name, identity = join_match.groups()
-                players[name.strip()] = {'joined': True, 'identity': identity}
+            if type(event) is PlayerJoined and event.identity:
+                players[event.name] = {'joined': True, 'identity': event.identity}
             
             # BattlEye connect: "BattlEye Server: 'Player #283 Crowbar™ (IP) connected'"
-            be_connect = re.search(r"BattlEye Server: 'Player #\d+ ([^(]+) \([^)]+\) connected'", line)
-            if be_connect:
-                name = be_connect.group(1).strip()
+            elif type(event) is PlayerConnected:
+                name = event.name
                 if name not in players:
                     players[name] = {'joined': True, 'identity': ''}
                 else:
                     players[name]['joined'] = True
             
             # BattlEye disconnect: "BattlEye Server: 'Player #214 jimmyrobbo2102 disconnected'"
-            be_disconnect = re.search(r"BattlEye Server: 'Player #\d+ ([^ ]+) disconnected'", line)
-            if be_disconnect:
-                name = be_disconnect.group(1).strip()
+            elif type(event) is PlayerDisconnected:
+                name = event.name
                 if name in players:
                     players[name]['joined'] = False
-            
-            # Player disconnected via network
-            if 'Player disconnected:' in line:
-                # Mark recent players as potentially disconnected - will be overwritten if they reconnect
-                pass
         
         # Filter to only currently connected players
         connected = [name for name, data in players.items() if data['joined']]
@@ -736,7 +834,7 @@ async def get_players(interaction: discord.Interaction, container_name: str):
             embed.description = "No players currently connected (or unable to determine from logs)"
         
         await interaction.followup.send(embed=embed)
-        
+    
     except docker.errors.NotFound:
         await interaction.followup.send(f"❌ Container `{container_name}` not found.")
     except Exception as e:
@@ -759,7 +857,7 @@ async def find_player(interaction: discord.Interaction, container_name: str, sea
         container = docker_client.containers.get(container_id)
         
         # Use efficient line-by-line search (doesn't load entire file)
-        matching_lines = search_logs_for_player(container_name, search, max_sessions=10)
+        matching_lines = search_logs_for_player(container_name, search)
         
         if not matching_lines:
             await interaction.followup.send(f"🔍 No results found for `{search}`")
@@ -768,35 +866,18 @@ async def find_player(interaction: discord.Interaction, container_name: str, sea
         # Parse the matching lines
         seen_players = {}
         
-        for line in matching_lines:
+        for event in parse_events(matching_lines):
             # BattlEye connect: "BattlEye Server: 'Player #283 Crowbar™ (IP) connected'"
-            be_connect = re.search(r"BattlEye Server: 'Player #(\d+) ([^(]+) \(([^)]+)\) connected'", line)
-            if be_connect:
-                name = be_connect.group(2).strip()
-                if name not in seen_players:
-                    seen_players[name] = {'ip': be_connect.group(3)}
-                else:
-                    seen_players[name]['ip'] = be_connect.group(3)
-                continue
+            if type(event) is PlayerConnected:
+                seen_players.setdefault(event.name, {})['ip'] = event.address
             
             # BattlEye GUID: "BattlEye Server: 'Player #283 Crowbar™ - BE GUID: xxx'"
-            be_guid = re.search(r"BattlEye Server: 'Player #(\d+) ([^-]+) - BE GUID: ([a-f0-9]+)'", line)
-            if be_guid:
-                name = be_guid.group(2).strip()
-                if name not in seen_players:
-                    seen_players[name] = {'guid': be_guid.group(3)}
-                else:
-                    seen_players[name]['guid'] = be_guid.group(3)
-                continue
+            elif type(event) is PlayerGuid:
+                seen_players.setdefault(event.name, {})['guid'] = event.beguid
             
             # ServerAdminTools: "Player joined, id: 131, ... name: Heck Let Loose, identityId: xxx"
-            admin_match = re.search(r'Player joined, id: (\d+),.*name: ([^,]+), identityId: ([a-f0-9-]+)', line)
-            if admin_match:
-                name = admin_match.group(2).strip()
-                if name not in seen_players:
-                    seen_players[name] = {'identity': admin_match.group(3)}
-                else:
-                    seen_players[name]['identity'] = admin_match.group(3)
+            elif type(event) is PlayerJoined and event.identity:
+                seen_players.setdefault(event.name, {})['identity'] = event.identity
         
         if not seen_players:
             await interaction.followup.send(f"🔍 No player info found for `{search}`")
@@ -810,7 +891,7 @@ async def find_player(interaction: discord.Interaction, container_name: str, sea
                 'beguid': info.get('guid'),
                 'ip': info.get('ip')
             }
-            update_player_database(container_name, player_info)
+            await update_player_database(container_name, player_info)
         
         embed = discord.Embed(
             title=f"🔍 Search Results: {search}",
@@ -837,7 +918,7 @@ async def find_player(interaction: discord.Interaction, container_name: str, sea
             embed.set_footer(text=f"Showing 15 of {len(seen_players)} unique players")
         
         await interaction.followup.send(embed=embed)
-        
+    
     except docker.errors.NotFound:
         await interaction.followup.send(f"❌ Container `{container_name}` not found.")
     except Exception as e:
@@ -862,7 +943,7 @@ async def ip_lookup(interaction: discord.Interaction, ip_address: str):
         await interaction.followup.send(f"❌ Invalid IP address format: `{ip_address}`")
         return
     
-    result = lookup_ip(ip_address)
+    result = await asyncio.to_thread(lookup_ip, ip_address)
     
     if 'error' in result:
         await interaction.followup.send(f"❌ Lookup failed: {result['error']}")
@@ -916,17 +997,16 @@ async def player_ip(interaction: discord.Interaction, container_name: str, playe
     
     try:
         # Search logs for player's IP
-        matching_lines = search_logs_for_player(container_name, player_name, max_sessions=10)
+        matching_lines = search_logs_for_player(container_name, player_name)
         
         # Find IP from BattlEye connect line
         player_ip = None
         actual_name = None
         
-        for line in matching_lines:
-            be_connect = re.search(r"BattlEye Server: 'Player #\d+ ([^(]+) \(([^:]+):\d+\) connected'", line)
-            if be_connect:
-                actual_name = be_connect.group(1).strip()
-                player_ip = be_connect.group(2)
+        for event in parse_events(matching_lines):
+            if type(event) is PlayerConnected and event.port:
+                actual_name = event.name
+                player_ip = event.ip
                 break
         
         if not player_ip:
@@ -934,7 +1014,7 @@ async def player_ip(interaction: discord.Interaction, container_name: str, playe
             return
         
         # Lookup the IP
-        result = lookup_ip(player_ip)
+        result = await asyncio.to_thread(lookup_ip, player_ip)
         
         if 'error' in result:
             await interaction.followup.send(f"❌ Found IP `{player_ip}` but lookup failed: {result['error']}")
@@ -969,7 +1049,7 @@ async def player_ip(interaction: discord.Interaction, container_name: str, playe
         embed.add_field(name="🌍 Coordinates", value=f"{result['lat']}, {result['lon']}", inline=True)
         
         await interaction.followup.send(embed=embed)
-        
+    
     except Exception as e:
         await interaction.followup.send(f"❌ Error: {str(e)}")
 
@@ -986,26 +1066,25 @@ async def player_ips(interaction: discord.Interaction, container_name: str):
         container_id = get_container_id(container_name)
         container = docker_client.containers.get(container_id)
         
-        # Read current session
-        logs = read_current_session_log(container_name, 'console')
-        if not logs:
+        # Player events of the current session
+        live = await asyncio.to_thread(get_live_session, container_name)
+        if live and live.line_count:
+            events = live.player_events()
+        else:
             logs = container.logs(tail=2000).decode('utf-8', errors='replace')
+            events = parse_events(logs.split('\n'))
         
         # Extract player IPs
         players = {}  # name -> {ip, connected}
         
-        for line in logs.split('\n'):
+        for event in events:
             # BattlEye connect
-            be_connect = re.search(r"BattlEye Server: 'Player #\d+ ([^(]+) \(([^:]+):\d+\) connected'", line)
-            if be_connect:
-                name = be_connect.group(1).strip()
-                ip = be_connect.group(2)
-                players[name] = {'ip': ip, 'connected': True}
+            if type(event) is PlayerConnected and event.port:
+                players[event.name] = {'ip': event.ip, 'connected': True}
             
             # BattlEye disconnect
-            be_disconnect = re.search(r"BattlEye Server: 'Player #\d+ ([^ ]+) disconnected'", line)
-            if be_disconnect:
-                name = be_disconnect.group(1).strip()
+            elif type(event) is PlayerDisconnected:
+                name = event.name
                 if name in players:
                     players[name]['connected'] = False
         
@@ -1028,7 +1107,7 @@ async def player_ips(interaction: discord.Interaction, container_name: str):
             if count >= 10:
                 break
             
-            ip_info = lookup_ip(info['ip'])
+            ip_info = await asyncio.to_thread(lookup_ip, info['ip'])
             if 'error' not in ip_info:
                 location = f"{ip_info['city']}, {ip_info['country']}"
                 embed.add_field(
@@ -1048,7 +1127,7 @@ async def player_ips(interaction: discord.Interaction, container_name: str):
             embed.set_footer(text=f"Use /player-ip to lookup individual players. Rate limited to 10.")
         
         await interaction.followup.send(embed=embed)
-        
+    
     except docker.errors.NotFound:
         await interaction.followup.send(f"❌ Container `{container_name}` not found.")
     except Exception as e:
@@ -1071,41 +1150,37 @@ async def player_history(interaction: discord.Interaction, container_name: str,
     await interaction.response.defer()
     
     try:
-        # Search logs - 20 sessions is fine with this hardware
-        matching_lines = search_logs_for_player(container_name, player_name, max_sessions=20)
+        search_lower = player_name.lower()
         
-        if not matching_lines:
-            await interaction.followup.send(f"🔍 No history found for `{player_name}`")
-            return
+        # The live session is parsed, the last 19 closed ones come from their summary sidecars
+        live = await asyncio.to_thread(live_session_summary, container_name)
+        closed = await asyncio.to_thread(session_summaries.closed, container_name.lower(), 19)
         
         # Parse connection data - use sets with max size
         ips_used = set()
         names_used = set()
         guids = set()
         connect_count = 0
-        
-        for line in matching_lines:
-            # BattlEye connect with IP
-            be_connect = re.search(r"BattlEye Server: 'Player #(\d+) ([^(]+) \(([^:]+):\d+\) connected'", line)
-            if be_connect:
-                name = be_connect.group(2).strip()
-                ip = be_connect.group(3)
-                if len(names_used) < 20:
-                    names_used.add(name)
-                if len(ips_used) < 20:
-                    ips_used.add(ip)
-                connect_count += 1
-                continue
-            
-            # BattlEye GUID
-            be_guid = re.search(r"BattlEye Server: 'Player #\d+ ([^-]+) - BE GUID: ([a-f0-9]+)'", line)
-            if be_guid:
-                name = be_guid.group(1).strip()
-                guid = be_guid.group(2)
-                if len(names_used) < 20:
-                    names_used.add(name)
-                if len(guids) < 10:
-                    guids.add(guid)
+        found = False
+        
+        for summary in [live] + closed:
+            for record in summary['players']:
+                if not player_matches(record, search_lower):
+                    continue
+                found = True
+                for name in record['names']:
+                    if len(names_used) < 20:
+                        names_used.add(name)
+                for ip in record['ips']:
+                    if len(ips_used) < 20:
+                        ips_used.add(ip)
+                if record['beguid'] and len(guids) < 10:
+                    guids.add(record['beguid'])
+                connect_count += len(record['connections'])
+        
+        if not found:
+            await interaction.followup.send(f"🔍 No history found for `{player_name}`")
+            return
         
         embed = discord.Embed(
             title=f"📜 Player History: {player_name}",
@@ -1130,11 +1205,11 @@ async def player_history(interaction: discord.Interaction, container_name: str,
         embed.set_footer(text="Use /player-ip to check for VPN/proxy")
         
         await interaction.followup.send(embed=embed)
-        
+    
     except Exception as e:
         await interaction.followup.send(f"❌ Error: {str(e)}")
 
-@bot.tree.command(name="player-playtime", description="Estimate a player's playtime from logs")
+@bot.tree.command(name="player-playtime", description="Show a player's playtime")
 @app_commands.describe(
     container_name="Server name (ttt1, ttt2, ttt3)",
     player_name="Player name to search for"
@@ -1147,63 +1222,48 @@ async def player_playtime(interaction: discord.Interaction, container_name: str,
     await interaction.response.defer()
     
     try:
-        # 20 sessions with this hardware
-        log_dirs = get_all_log_dirs(container_name, max_sessions=20)
-        
-        total_sessions = 0
-        total_minutes = 0
-        longest_session = 0
-        player_lower = player_name.lower()
-        
-        for log_dir in log_dirs:
-            log_file = os.path.join(log_dir, "console.log")
-            if not os.path.exists(log_file):
-                continue
+        # Closed sessions are rolled up in the player database: one indexed read over all history
+        playtime = None
+        player = await player_db_async.get_player_by_name(player_name) if player_db_async else None
+        if player:
+            playtime = await player_db_async.get_playtime(player['guid'], container_name)
+        
+        if playtime and playtime['sessions']:
+            total_sessions = playtime['sessions']
+            total_minutes = playtime['total_seconds'] // 60
+            longest_session = playtime['longest_seconds'] // 60
+            footer = f"Based on {total_sessions} recorded sessions since {playtime['first_session'][:10]}"
+        else:
+            # Not in the database (yet): the live session is parsed, the last 19 closed ones come from their summaries
+            live = await asyncio.to_thread(live_session_summary, container_name)
+            summaries = [live] + await asyncio.to_thread(session_summaries.closed, container_name.lower(), 19)
             
-            connect_time = None
-            player_found = False
+            total_sessions = 0
+            total_minutes = 0
+            longest_session = 0
+            player_lower = player_name.lower()
             
-            try:
-                with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-                    for line in f:
-                        # Quick check before expensive operations
-                        if player_lower not in line.lower():
-                            continue
-                        
-                        player_found = True
-                        
-                        # Connect
-                        if 'connected' in line and 'BattlEye' in line:
-                            time_match = re.search(r'(\d{2}:\d{2}:\d{2})', line)
-                            if time_match:
-                                try:
-                                    connect_time = datetime.strptime(time_match.group(1), '%H:%M:%S')
-                                except:
-                                    pass
-                        
-                        # Disconnect
-                        elif 'disconnected' in line and connect_time:
-                            time_match = re.search(r'(\d{2}:\d{2}:\d{2})', line)
-                            if time_match:
-                                try:
-                                    disconnect_time = datetime.strptime(time_match.group(1), '%H:%M:%S')
-                                    if disconnect_time < connect_time:
-                                        disconnect_time += timedelta(days=1)
-                                    session_length = (disconnect_time - connect_time).seconds // 60
-                                    if 0 < session_length < 1440:
-                                        total_minutes += session_length
-                                        total_sessions += 1
-                                        if session_length > longest_session:
-                                            longest_session = session_length
-                                    connect_time = None
-                                except:
-                                    pass
+            for summary in summaries:
+                player_found = False
+                
+                for record in summary['players']:
+                    if not player_matches(record, player_lower):
+                        continue
+                    
+                    player_found = True
+                    
+                    for connected, disconnected, seconds in record['connections']:
+                        session_length = (seconds or 0) // 60
+                        if 0 < session_length < 1440:
+                            total_minutes += session_length
+                            total_sessions += 1
+                            if session_length > longest_session:
+                                longest_session = session_length
                 
                 if player_found and total_sessions == 0:
                     total_sessions = 1
-                    
-            except:
-                pass
+            
+            footer = f"Based on last {len(summaries)} sessions analyzed"
         
         if total_sessions == 0:
             await interaction.followup.send(f"🔍 No playtime data found for `{player_name}`")
@@ -1225,10 +1285,10 @@ async def player_playtime(interaction: discord.Interaction, container_name: str,
         if longest_session > 0:
             embed.add_field(name="🏆 Longest Session", value=f"{longest_session // 60}h {longest_session % 60}m", inline=True)
         
-        embed.set_footer(text=f"Based on last {len(log_dirs)} sessions analyzed")
+        embed.set_footer(text=footer)
         
         await interaction.followup.send(embed=embed)
-        
+    
     except Exception as e:
         await interaction.followup.send(f"❌ Error: {str(e)}")
 
@@ -1331,7 +1391,7 @@ async def watchlist_check(interaction: discord.Interaction, container_name: str)
         for key, data in WATCHLIST.items():
             if len(found_players) >= 10:
                 break
-                
+            
             name = data.get('name', key)
             name_lower = name.lower()
             
@@ -1359,7 +1419,7 @@ async def watchlist_check(interaction: discord.Interaction, container_name: str)
             await interaction.followup.send(embed=embed)
         else:
             await interaction.followup.send(f"✅ No watchlisted players found on **{container_name.upper()}**")
-            
+    
     except Exception as e:
         await interaction.followup.send(f"❌ Error: {str(e)}")
 
@@ -1399,20 +1459,12 @@ async def vpn_check(interaction: discord.Interaction, container_name: str):
         
         # Get connected players with IPs - limit parsing
         players = {}
-        for line in logs.split('\n'):
-            if 'BattlEye' not in line:
-                continue
-                
-            be_connect = re.search(r"BattlEye Server: 'Player #\d+ ([^(]+) \(([^:]+):\d+\) connected'", line)
-            if be_connect:
-                name = be_connect.group(1).strip()
-                ip = be_connect.group(2)
-                players[name] = {'ip': ip, 'connected': True}
-                continue
+        for event in parse_events(logs.split('\n')):
+            if type(event) is PlayerConnected and event.port:
+                players[event.name] = {'ip': event.ip, 'connected': True}
             
-            be_disconnect = re.search(r"BattlEye Server: 'Player #\d+ ([^ ]+) disconnected'", line)
-            if be_disconnect:
-                name = be_disconnect.group(1).strip()
+            elif type(event) is PlayerDisconnected:
+                name = event.name
                 if name in players:
                     players[name]['connected'] = False
         
@@ -1431,7 +1483,7 @@ async def vpn_check(interaction: discord.Interaction, container_name: str):
             if checked >= 20:
                 break
             
-            result = lookup_ip(info['ip'])
+            result = await asyncio.to_thread(lookup_ip, info['ip'])
             if result.get('is_proxy') or result.get('is_hosting'):
                 vpn_users.append({
                     'name': name,
@@ -1465,7 +1517,7 @@ async def vpn_check(interaction: discord.Interaction, container_name: str):
             await interaction.followup.send(embed=embed)
         else:
             await interaction.followup.send(f"✅ No VPN/proxy users detected on **{container_name.upper()}** (checked {checked} players)")
-            
+    
     except Exception as e:
         await interaction.followup.send(f"❌ Error: {str(e)}")
 
@@ -1489,17 +1541,11 @@ async def duplicate_check(interaction: discord.Interaction, container_name: str)
         # Map IPs to player names with limits
         ip_to_players = defaultdict(set)
         
-        for line in logs.split('\n'):
-            # Quick filter
-            if 'BattlEye' not in line or 'connected' not in line:
-                continue
-                
-            be_connect = re.search(r"BattlEye Server: 'Player #\d+ ([^(]+) \(([^:]+):\d+\) connected'", line)
-            if be_connect:
-                name = be_connect.group(1).strip()
-                ip = be_connect.group(2)
+        for event in parse_events(logs.split('\n')):
+            if type(event) is PlayerConnected and event.port:
+                ip = event.ip
                 if len(ip_to_players[ip]) < 20:  # Limit names per IP
-                    ip_to_players[ip].add(name)
+                    ip_to_players[ip].add(event.name)
         
         # Find IPs with multiple players
         duplicates = {ip: names for ip, names in ip_to_players.items() if len(names) > 1}
@@ -1525,7 +1571,7 @@ async def duplicate_check(interaction: discord.Interaction, container_name: str)
             )
         
         await interaction.followup.send(embed=embed)
-        
+    
     except Exception as e:
         await interaction.followup.send(f"❌ Error: {str(e)}")
 
@@ -1552,14 +1598,12 @@ async def show_errors(interaction: discord.Interaction, container_name: str, cou
         log_dir = get_latest_log_dir(container_name)
         errors = []
         
-        # Read error.log with deque (memory efficient)
+        # Read the tail of error.log (only the last 50 lines are touched)
         if log_dir:
             error_file = os.path.join(log_dir, "error.log")
             if os.path.exists(error_file):
                 try:
-                    from collections import deque
-                    with open(error_file, 'r', encoding='utf-8', errors='replace') as f:
-                        last_lines = deque(f, maxlen=50)
+                    last_lines = read_tail_lines(error_file, 50)
                     
                     for line in last_lines:
                         line = line.strip()
@@ -1599,7 +1643,7 @@ async def show_errors(interaction: discord.Interaction, container_name: str, cou
             embed.add_field(name="Errors", value=f"```{error_text}```", inline=False)
         
         await interaction.followup.send(embed=embed)
-        
+    
     except Exception as e:
         await interaction.followup.send(f"❌ Error: {str(e)}")
 
@@ -1648,7 +1692,7 @@ async def monitor_start(interaction: discord.Interaction, container_name: str, f
                 
                 last_log = logs
                 await asyncio.sleep(5)
-                
+        
         except asyncio.CancelledError:
             await interaction.channel.send(f"📡 Stopped monitoring **{container_name.upper()}**")
         except Exception as e:
@@ -1785,10 +1829,13 @@ async def help_command(interaction: discord.Interaction):
         value="`/db-stats` - Database statistics\n"
               "`/player-db-history` - Complete history\n"
               "`/find-alts-by-ip` - Find alts by IP\n"
+              "`/find-alts-by-subnet` - Find alts in an IP range\n"
               "`/find-alts-by-name` - Find alts by name\n"
+              "`/alt-cluster` - All linked accounts\n"
               "`/player-ban-database` - Ban in DB\n"
               "`/player-notes-add` - Add notes\n"
-              "`/db-alerts` - View alerts",
+              "`/db-alerts` - View alerts\n"
+              "`/db-alerts-ack` - Acknowledge alerts",
         inline=False
     )
     
@@ -1810,7 +1857,7 @@ async def db_stats(interaction: discord.Interaction):
         await interaction.response.send_message("❌ Player database not initialized", ephemeral=True)
         return
     
-    stats = player_db.get_stats()
+    stats = await player_db_async.get_stats()
     
     embed = discord.Embed(
         title="📊 Player Database Statistics",
@@ -1828,9 +1875,11 @@ async def db_stats(interaction: discord.Interaction):
 @bot.tree.command(name="player-db-history", description="Get complete player history from database")
 @app_commands.describe(
     server_name="Server name (ttt1, ttt2, ttt3)",
-    player_identifier="Player name or GUID"
+    player_identifier="Player name or GUID",
+    full_history="List every name and IP plus BE GUID changes and recent connections"
 )
-async def player_db_history(interaction: discord.Interaction, server_name: str, player_identifier: str):
+async def player_db_history(interaction: discord.Interaction, server_name: str, player_identifier: str,
+                            full_history: bool = False):
     """Get detailed player history from database"""
     if not await check_permission(interaction):
         return
@@ -1841,17 +1890,25 @@ async def player_db_history(interaction: discord.Interaction, server_name: str,
     
     await interaction.response.defer()
     
-    # Try to find player
-    player = player_db.get_player_by_guid(player_identifier)
+    # The profile (player + precomputed summary) is one primary-key read; a name needs a search first
+    player = await player_db_async.get_player_profile(player_identifier)
     if not player:
-        player = player_db.get_player_by_name(player_identifier)
+        match = await player_db_async.get_player_by_name(player_identifier)
+        if match:
+            player = await player_db_async.get_player_profile(match['guid'])
     
     if not player:
         await interaction.followup.send(f"❌ Player not found: `{player_identifier}`")
         return
     
-    # Get complete history
-    history = player_db.get_player_history(player['guid'])
+    # Complete lists only when asked for
+    history = None
+    if full_history:
+        try:
+            history = await player_db_async.get_player_history(player['guid'])
+        except asyncio.TimeoutError:
+            await interaction.followup.send(f"⏱️ History lookup for `{player_identifier}` timed out, try again shortly")
+            return
     
     embed = discord.Embed(
         title=f"📜 Database History: {player['current_name']}",
@@ -1861,40 +1918,70 @@ async def player_db_history(interaction: discord.Interaction, server_name: str,
     )
     
     # Names used
-    if history['names']:
+    names = history['names'][:20] if history else player['recent_names']
+    if names:
         names_list = []
-        for name_data in history['names'][:10]:
+        for name_data in names:
             names_list.append(f"• {name_data['name']} ({name_data['use_count']}x)")
         embed.add_field(
-            name=f"🏷️ Names ({len(history['names'])} total)",
+            name=f"🏷️ Names ({player['name_count']} total)",
             value="\n".join(names_list) or "None",
             inline=False
         )
     
     # IPs used
-    if history['ips']:
+    ips = history['ips'][:20] if history else player['recent_ips']
+    if ips:
         ips_list = []
-        for ip_data in history['ips'][:10]:
+        for ip_data in ips:
             vpn = "🔒VPN" if ip_data['is_vpn'] else ""
             country = f"({ip_data['country']})" if ip_data['country'] else ""
             ips_list.append(f"• {ip_data['ip_address']} {country} {vpn}")
         embed.add_field(
-            name=f"🌍 IPs ({len(history['ips'])} total)",
+            name=f"🌍 IPs ({player['ip_count']} total)",
             value="\n".join(ips_list) or "None",
             inline=False
         )
     
+    # Play sessions
+    if player['session_count']:
+        embed.add_field(
+            name=f"🎮 Sessions ({player['session_count']})",
+            value=f"{player['session_seconds'] / 3600:.1f} hours played\n"
+                  f"Last: {(player['last_session_at'] or 'unknown')[:16]}",
+            inline=False
+        )
+    
     # Recent alerts
-    if history['alerts']:
+    alerts = history['alerts'][:10] if history else player['recent_alerts']
+    if alerts:
         alerts_list = []
-        for alert in history['alerts'][:5]:
+        for alert in alerts:
             alerts_list.append(f"• {alert['alert_message'][:60]}")
         embed.add_field(
-            name=f"⚠️ Alerts ({len(history['alerts'])})",
+            name=f"⚠️ Alerts ({player['alert_count']})",
             value="\n".join(alerts_list) or "None",
             inline=False
         )
     
+    if history:
+        if history['beguid_changes']:
+            embed.add_field(
+                name=f"🛡️ BE GUID changes ({len(history['beguid_changes'])})",
+                value="\n".join(f"• {change['changed_at'][:16]} → `{change['new_beguid'][:16]}...`"
+                                for change in history['beguid_changes'][:5]),
+                inline=False
+            )
+        if history['connections']:
+            embed.add_field(
+                name="🔌 Recent connections",
+                value="\n".join(f"• {event['timestamp'][:16]} {event['server_name'] or ''} {event['event_type']}"
+                                for event in history['connections'][:10]),
+                inline=False
+            )
+    else:
+        embed.set_footer(text="Use full_history:True for every name and IP, BE GUID changes and connections")
+    
     await interaction.followup.send(embed=embed)
 
 @bot.tree.command(name="find-alts-by-ip", description="Find alt accounts using same IP address")
@@ -1911,7 +1998,7 @@ async def find_alts_by_ip(interaction: discord.Interaction, ip_address: str):
     await interaction.response.defer()
     
     ip_clean = ip_address.split(':')[0]
-    alts = player_db.find_alts(ip_clean)
+    alts = await player_db_async.find_alts(ip_clean)
     
     if not alts:
         await interaction.followup.send(f"❌ No players found using IP: `{ip_clean}`")
@@ -1938,6 +2025,60 @@ async def find_alts_by_ip(interaction: discord.Interaction, ip_address: str):
     
     await interaction.followup.send(embed=embed)
 
+@bot.tree.command(name="find-alts-by-subnet", description="Find accounts that used any IP in a subnet")
+@app_commands.describe(subnet="CIDR block, e.g. 203.0.113.0/24 (a bare IPv4 address means its /24, IPv6 its /64)")
+async def find_alts_by_subnet(interaction: discord.Interaction, subnet: str):
+    """Find all accounts that have used an address in a subnet (alts rotating through one ISP range)"""
+    if not await check_permission(interaction):
+        return
+    
+    if not player_db:
+        await interaction.response.send_message("❌ Player database not initialized", ephemeral=True)
+        return
+    
+    cidr = subnet.strip()
+    if '/' not in cidr:
+        host = cidr.split(':')[0] if cidr.count(':') == 1 else cidr  # drop an IPv4 :port
+        cidr = f"{host}/64" if ':' in host else f"{host}/24"
+    try:
+        network = ipaddress.ip_network(cidr, strict=False)
+    except ValueError:
+        await interaction.response.send_message(f"❌ Not a valid subnet: `{subnet}`", ephemeral=True)
+        return
+    if network.prefixlen < (16 if network.version == 4 else 32):
+        await interaction.response.send_message(f"❌ `{network}` is too broad - use /16 or smaller for IPv4, /32 for IPv6",
+                                                ephemeral=True)
+        return
+    
+    await interaction.response.defer()
+    
+    alts = await player_db_async.find_alts_in_subnet(str(network))
+    
+    if not alts:
+        await interaction.followup.send(f"❌ No players found in subnet: `{network}`")
+        return
+    
+    embed = discord.Embed(
+        title=f"🔍 Alt Accounts - Subnet: {network}",
+        description=f"Found {len(alts)} account(s) using this subnet",
+        color=discord.Color.orange(),
+        timestamp=datetime.utcnow()
+    )
+    
+    for alt in alts[:15]:
+        embed.add_field(
+            name=alt['current_name'],
+            value=f"GUID: `{alt['guid'][:16]}...`\n"
+                  f"IPs: {alt['ips'][:60]}\n"
+                  f"Last: {alt['subnet_last_used'][:10]}",
+            inline=True
+        )
+    
+    if len(alts) > 15:
+        embed.set_footer(text=f"Showing 15 of {len(alts)} results")
+    
+    await interaction.followup.send(embed=embed)
+
 @bot.tree.command(name="find-alts-by-name", description="Find all accounts using a specific name")
 @app_commands.describe(player_name="Player name to search for")
 async def find_alts_by_name(interaction: discord.Interaction, player_name: str):
@@ -1951,7 +2092,7 @@ async def find_alts_by_name(interaction: discord.Interaction, player_name: str):
     
     await interaction.response.defer()
     
-    alts = player_db.find_name_alts(player_name)
+    alts = await player_db_async.find_name_alts(player_name)
     
     if not alts:
         await interaction.followup.send(f"❌ No accounts found with name: `{player_name}`")
@@ -1978,6 +2119,61 @@ async def find_alts_by_name(interaction: discord.Interaction, player_name: str):
     
     await interaction.followup.send(embed=embed)
 
+@bot.tree.command(name="alt-cluster", description="Show every account linked to a player by shared IPs, names or BE GUIDs")
+@app_commands.describe(
+    player="Player name or GUID",
+    min_weight="Only follow links at least this strong (BE GUID 3, IP 2, name 1 per shared value)"
+)
+async def alt_cluster(interaction: discord.Interaction, player: str, min_weight: float = None):
+    """Show a player's whole alt cluster"""
+    if not await check_permission(interaction):
+        return
+    
+    if not player_db:
+        await interaction.response.send_message("❌ Player database not initialized", ephemeral=True)
+        return
+    
+    await interaction.response.defer()
+    
+    target = await player_db_async.get_player_by_guid(player) or await player_db_async.get_player_by_name(player)
+    if not target:
+        await interaction.followup.send(f"❌ Player not found: `{player}`")
+        return
+    
+    cluster = await player_db_async.get_alt_cluster(target['guid'], min_weight)
+    if len(cluster['members']) < 2:
+        await interaction.followup.send(f"✅ No linked accounts for **{target['current_name']}**")
+        return
+    
+    names = {member['guid']: member['current_name'] for member in cluster['members']}
+    embed = discord.Embed(
+        title=f"🔗 Alt Cluster: {target['current_name']}",
+        description=f"{len(cluster['members'])} linked account(s), {len(cluster['links'])} link(s)",
+        color=discord.Color.orange(),
+        timestamp=datetime.utcnow()
+    )
+    
+    for member in cluster['members'][:15]:
+        banned = " 🔨" if member['is_banned'] else ""
+        embed.add_field(
+            name=f"{member['current_name']}{banned}",
+            value=f"GUID: `{member['guid'][:16]}...`\n"
+                  f"IP: {member['current_ip'] or 'Unknown'}\n"
+                  f"Last: {member['last_seen'][:10]}",
+            inline=True
+        )
+    
+    link_lines = []
+    for link in cluster['links'][:10]:
+        shared = ", ".join(f"{kind} `{value}`" for kind, value in link['shared'][:3])
+        link_lines.append(f"{names[link['guid_a']]} ↔ {names[link['guid_b']]} ({link['weight']:g}): {shared}")
+    embed.add_field(name="Strongest links", value="\n".join(link_lines)[:1024] or "None", inline=False)
+    
+    if len(cluster['members']) > 15:
+        embed.set_footer(text=f"Showing 15 of {len(cluster['members'])} accounts")
+    
+    await interaction.followup.send(embed=embed)
+
 @bot.tree.command(name="player-ban-database", description="[ADMIN] Ban player in database")
 @app_commands.describe(
     guid="Player GUID to ban",
@@ -1992,12 +2188,12 @@ async def player_ban_database(interaction: discord.Interaction, guid: str, reaso
         await interaction.response.send_message("❌ Player database not initialized", ephemeral=True)
         return
     
-    player = player_db.get_player_by_guid(guid)
+    player = await player_db_async.get_player_by_guid(guid)
     if not player:
         await interaction.response.send_message(f"❌ Player not found: `{guid}`", ephemeral=True)
         return
     
-    player_db.ban_player(guid, reason)
+    await player_db_async.ban_player(guid, reason)
     
     await interaction.response.send_message(
         f"✅ Banned in database: **{player['current_name']}**\nReason: {reason}"
@@ -2017,21 +2213,22 @@ async def player_notes_add(interaction: discord.Interaction, guid: str, notes: s
         await interaction.response.send_message("❌ Player database not initialized", ephemeral=True)
         return
     
-    player = player_db.get_player_by_guid(guid)
+    player = await player_db_async.get_player_by_guid(guid)
     if not player:
         await interaction.response.send_message(f"❌ Player not found: `{guid}`", ephemeral=True)
         return
     
-    player_db.add_notes(guid, notes)
+    await player_db_async.add_notes(guid, notes)
     
     await interaction.response.send_message(
         f"✅ Added notes for: **{player['current_name']}**"
     )
 
 @bot.tree.command(name="db-alerts", description="[ADMIN] View unacknowledged database alerts")
-@app_commands.describe(limit="Number of alerts to show (max 25)")
-async def db_alerts(interaction: discord.Interaction, limit: int = 10):
-    """View unacknowledged alerts"""
+@app_commands.describe(limit="Number of alerts to show (max 25)",
+                       after_id="Show the page after this alert ID (from the previous page's footer)")
+async def db_alerts(interaction: discord.Interaction, limit: int = 10, after_id: int = None):
+    """View unacknowledged alerts, newest first, one page at a time"""
     if not await check_permission(interaction):
         return
     
@@ -2041,21 +2238,25 @@ async def db_alerts(interaction: discord.Interaction, limit: int = 10):
     
     await interaction.response.defer()
     
-    limit = min(limit, 25)
-    alerts = player_db.get_unacknowledged_alerts(limit)
+    limit = max(1, min(limit, 25))
+    # One extra row tells us whether there is a next page
+    alerts = await player_db_async.get_unacknowledged_alerts(limit + 1, after_id)
+    has_more = len(alerts) > limit
+    alerts = alerts[:limit]
     
     if not alerts:
-        await interaction.followup.send("✅ No unacknowledged alerts")
+        await interaction.followup.send("✅ No more unacknowledged alerts" if after_id else "✅ No unacknowledged alerts")
         return
     
+    stats = await player_db_async.get_stats()
     embed = discord.Embed(
         title="⚠️ Database Alerts",
-        description=f"Showing {len(alerts)} alert(s)",
+        description=f"Showing {len(alerts)} of {stats['unacknowledged_alerts']} unacknowledged alert(s)",
         color=discord.Color.orange(),
         timestamp=datetime.utcnow()
     )
     
-    for alert in alerts[:10]:
+    for alert in alerts:
         embed.add_field(
             name=f"Alert #{alert['id']} - {alert['current_name']}",
             value=f"{alert['alert_message']}\n"
@@ -2063,8 +2264,52 @@ async def db_alerts(interaction: discord.Interaction, limit: int = 10):
             inline=False
         )
     
+    if has_more:
+        embed.set_footer(text=f"Next page: /db-alerts after_id:{alerts[-1]['id']}")
+    
     await interaction.followup.send(embed=embed)
 
+@bot.tree.command(name="db-alerts-ack", description="[ADMIN] Acknowledge database alerts in bulk")
+@app_commands.describe(ids="Alert IDs, comma separated",
+                       before="Acknowledge everything created before this date (YYYY-MM-DD)",
+                       guid="Acknowledge all alerts for this player GUID")
+async def db_alerts_ack(interaction: discord.Interaction, ids: str = None, before: str = None, guid: str = None):
+    """Acknowledge alerts by ID, by age and/or by player (filters combine)"""
+    if not await check_permission(interaction):
+        return
+    
+    if not player_db:
+        await interaction.response.send_message("❌ Player database not initialized", ephemeral=True)
+        return
+    
+    if not (ids or before or guid):
+        await interaction.response.send_message("❌ Give alert `ids`, a `before` date or a player `guid`", ephemeral=True)
+        return
+    
+    alert_ids = None
+    if ids:
+        try:
+            alert_ids = [int(part) for part in ids.replace(' ', ',').split(',') if part]
+        except ValueError:
+            await interaction.response.send_message(f"❌ Invalid alert IDs: `{ids}`", ephemeral=True)
+            return
+    
+    if before:
+        try:
+            datetime.strptime(before, '%Y-%m-%d')
+        except ValueError:
+            await interaction.response.send_message(f"❌ Invalid date: `{before}` (use YYYY-MM-DD)", ephemeral=True)
+            return
+    
+    await interaction.response.defer()
+    
+    acknowledged = await player_db_async.acknowledge_alerts(alert_ids, before, guid)
+    stats = await player_db_async.get_stats()
+    
+    await interaction.followup.send(
+        f"✅ Acknowledged {acknowledged} alert(s) - {stats['unacknowledged_alerts']} still open"
+    )
+
 # =============================================================================
 # RUN BOT
 # =============================================================================
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Query Plan Checks for the Player Database
+Builds (or reuses) a synthetic player database, calls every public PlayerDatabase
+method against it and runs EXPLAIN QUERY PLAN on each SQL statement the call
+executed. A check fails if a statement scans a whole table, or if the call takes
+longer than its time budget. Exits non-zero on any failure.
+
+Maintenance methods that read whole tables on purpose (rebuilds, recounts) and
+name searches too short for the trigram index are timed but allowed to scan.
+Every public method needs a check - a new method without one fails the run.
+
+Usage: python3 check_query_plans.py [--players 1000000] [--db PATH] [--keep]
+                                    [--repeat 3] [--budget-scale 1.0]
+"""
+
+import argparse
+import os
+import random
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from player_database import PlayerDatabase, pack_ip
+
+SERVERS = ["TTT1", "TTT2", "TTT3"]
+SYLLABLES = ["ka", "zu", "ri", "mo", "tek", "vor", "lin", "dra", "sha", "gul", "pex", "ny",
+             "bro", "kil", "ash", "tor", "wex", "qui", "fen", "jo", "sty", "mar", "hex", "uld"]
+
+# Methods that run no SQL of their own (or only wrap other methods)
+NOT_QUERIES = {'batch', 'interrupt', 'get_cache_stats'}
+
+# Checks that are meant to read whole tables - timed, but scans are not failures
+FULL_SCANS_ALLOWED = {
+    'rebuild_alt_clusters': "recomputes every link from the full name/IP/BE GUID history",
+    'check_stats_counters': "recounts every counter from scratch",
+    'rebuild_player_summary': "summarizes every player from the full history",
+    'find_name_alts (short)': "substrings under 3 characters can't use the trigram index",
+}
+
+
+class TracedPlayerDatabase(PlayerDatabase):
+    """PlayerDatabase that records every SQL statement its connections execute"""
+
+    def __init__(self, *args, **kwargs):
+        self.statements = None  # list while recording
+        super().__init__(*args, **kwargs)
+
+    def _configure(self, conn):
+        conn = super()._configure(conn)
+        conn.set_trace_callback(self._trace)
+        return conn
+
+    def _trace(self, sql: str):
+        if self.statements is not None:
+            self.statements.append(sql)
+
+
+def _guid(i: int) -> str:
+    h = f"{i * 2654435761 % (1 << 64):016x}{i:016x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+
+def build_database(path: str, players: int, seed: int = 1):
+    """
+    Fill an empty database with `players` players and a realistic spread of history:
+    1-3 names and IPs each (some shared, so there are alts), BE GUID changes,
+    connection events, closed and open sessions, and alerts (most unacknowledged).
+    The player_summary rows are filled in by its triggers as the rows go in
+    """
+    rng = random.Random(seed)
+    db = PlayerDatabase(path, player_cache_size=0)
+    conn = db._get_connection()
+    now = datetime.now()
+    chunk = 50000
+
+    def when(max_days=365):
+        return (now - timedelta(seconds=rng.randrange(max_days * 86400))).isoformat(timespec='seconds')
+
+    def make_name():
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(2 + rng.randrange(3))).capitalize()
+        return name + str(rng.randrange(1000)) if rng.random() < 0.5 else name
+
+    shared_names = [make_name() for _ in range(max(players // 50, 10))]
+    # Sparse enough that shared IPs form small alt clusters, not one giant one
+    ip_pool = max(players * 10, 10)
+
+    def ip_for(n):
+        return f"{10 + n // 16777216 % 200}.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"
+
+    started = time.time()
+    for start in range(0, players, chunk):
+        player_rows, name_rows, ip_rows, beguid_rows = [], [], [], []
+        event_rows, session_rows, alert_rows = [], [], []
+        for i in range(start, min(start + chunk, players)):
+            guid = _guid(i)
+            first_seen, last_seen = sorted((when(), when()))
+
+            names = [make_name()] + [rng.choice(shared_names) for _ in range(rng.randrange(3))]
+            names = list(dict.fromkeys(names))
+            ips = list(dict.fromkeys(ip_for(rng.randrange(ip_pool)) for _ in range(1 + rng.randrange(3))))
+            beguid = f"{rng.getrandbits(128):032x}"
+
+            player_rows.append((guid, beguid, names[-1], ips[-1], first_seen, last_seen,
+                                rng.randrange(1, 200), rng.random() < 0.002))
+            name_rows += [(guid, name, first_seen, last_seen) for name in names]
+            ip_rows += [(guid, ip, 'US', 'ISP', rng.random() < 0.03, first_seen, last_seen, pack_ip(ip))
+                        for ip in ips]
+            if rng.random() < 0.1:
+                beguid_rows.append((guid, f"{rng.getrandbits(128):032x}", beguid, when()))
+
+            for _ in range(3):
+                server, at = rng.choice(SERVERS), when()
+                event_rows.append((guid, 'connect', server, at, names[-1], ips[-1]))
+                ended = datetime.fromisoformat(at) + timedelta(seconds=rng.randrange(60, 7200))
+                session_rows.append((guid, server, at, ended.isoformat(timespec='seconds'),
+                                     int((ended - datetime.fromisoformat(at)).total_seconds()), 'disconnect'))
+            if rng.random() < 300 / players:  # a few full servers online right now
+                session_rows.append((guid, rng.choice(SERVERS), when(1), None, None, None))
+            if rng.random() < 0.1:
+                alert_rows.append((guid, 'NAME_CHANGE', f"Name changed to {names[-1]}", names[0],
+                                   names[-1], when(), rng.random() < 0.3))
+
+        conn.executemany('''
+            INSERT INTO players (guid, beguid, current_name, current_ip, first_seen, last_seen,
+                                 total_connections, is_banned)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', player_rows)
+        conn.executemany('''
+            INSERT INTO player_names (guid, name, first_used, last_used) VALUES (?, ?, ?, ?)
+        ''', name_rows)
+        conn.executemany('''
+            INSERT INTO player_ips (guid, ip_address, country, isp, is_vpn, first_used, last_used, ip_packed)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ip_rows)
+        conn.executemany('''
+            INSERT INTO beguid_changes (guid, old_beguid, new_beguid, changed_at) VALUES (?, ?, ?, ?)
+        ''', beguid_rows)
+        conn.executemany('''
+            INSERT INTO connection_events (guid, event_type, server_name, timestamp, name_used, ip_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', event_rows)
+        conn.executemany('''
+            INSERT INTO sessions (guid, server_name, started_at, ended_at, duration_seconds, end_reason)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', session_rows)
+        conn.executemany('''
+            INSERT INTO player_alerts (guid, alert_type, alert_message, old_value, new_value,
+                                       created_at, acknowledged)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', alert_rows)
+        conn.commit()
+        print(f"   {min(start + chunk, players):,}/{players:,} players ({time.time() - started:.0f}s)")
+
+    links = db.rebuild_alt_clusters()
+    conn.execute('ANALYZE')
+    conn.commit()
+    print(f"   {links['links']:,} alt links, {links['clusters']:,} clusters ({time.time() - started:.0f}s)")
+
+
+def sample_inputs(conn, players: int, seed: int = 2) -> Dict:
+    """Real keys from the synthetic data for the calls to look up"""
+    rng = random.Random(seed)
+    guid = _guid(rng.randrange(players))
+    clustered = conn.execute('SELECT guid FROM alt_clusters LIMIT 1').fetchone()
+    alerts = conn.execute('''
+        SELECT id FROM player_alerts WHERE acknowledged = 0 ORDER BY created_at DESC, id DESC LIMIT 200
+    ''').fetchall()
+    player = conn.execute('SELECT current_name, current_ip FROM players WHERE guid = ?', (guid,)).fetchone()
+    return {
+        'guid': guid,
+        'name': player[0],
+        'ip': player[1],
+        'subnet': player[1].rsplit('.', 1)[0] + '.0/24',
+        'clustered_guid': clustered[0] if clustered else guid,
+        'alert_ids': [row[0] for row in alerts],
+    }
+
+
+def plan_checks(s: Dict) -> List[tuple]:
+    """(label, method, args, kwargs, budget ms or None) - reads first, then writes"""
+    new_guid = _guid(10 ** 12)
+    now = datetime.now().isoformat(timespec='seconds')
+    batch = [{'guid': _guid(10 ** 12 + i), 'name': f"Batch{i}", 'ip': f"198.51.100.{i}",
+              'beguid': f"{i:032x}", 'server_name': 'TTT2', 'connected_at': now} for i in range(100)]
+    return [
+        ('get_player_by_guid', 'get_player_by_guid', (s['guid'],), {}, 5),
+        ('get_player_by_name', 'get_player_by_name', (s['name'],), {}, 100),
+        ('get_player_profile', 'get_player_profile', (s['guid'],), {}, 5),
+        ('get_player_history', 'get_player_history', (s['guid'],), {}, 20),
+        ('find_alts', 'find_alts', (s['ip'],), {}, 10),
+        ('find_alts_in_subnet', 'find_alts_in_subnet', (s['subnet'],), {}, 20),
+        ('find_name_alts', 'find_name_alts', (s['name'],), {}, 100),
+        ('find_name_alts (short)', 'find_name_alts', ('ka',), {}, 2500),
+        ('get_open_sessions', 'get_open_sessions', (), {}, 50),
+        ('get_open_sessions (server)', 'get_open_sessions', ('TTT1',), {}, 50),
+        ('get_playtime', 'get_playtime', (s['guid'],), {}, 10),
+        ('get_playtime (server)', 'get_playtime', (s['guid'], 'TTT1'), {}, 10),
+        ('get_alt_cluster', 'get_alt_cluster', (s['clustered_guid'],), {}, 20),
+        ('get_alt_cluster (min_weight)', 'get_alt_cluster', (s['clustered_guid'], 3.0), {}, 20),
+        ('get_unacknowledged_alerts', 'get_unacknowledged_alerts', (25,), {}, 10),
+        ('get_unacknowledged_alerts (page)', 'get_unacknowledged_alerts', (25, s['alert_ids'][-1]), {}, 10),
+        ('get_stats', 'get_stats', (), {}, 5),
+        ('get_checkpoint', 'get_checkpoint', ('TTT1',), {}, 5),
+        ('update_player (new)', 'update_player', (new_guid, 'NewPlayer', '192.0.2.1', 'f' * 32, 'TTT1'),
+         {'connected_at': now}, 50),
+        ('update_player (changed)', 'update_player', (s['guid'], 'Renamed', '192.0.2.2', 'e' * 32, 'TTT1'),
+         {'connected_at': now}, 50),
+        ('update_players_batch', 'update_players_batch', (batch,), {}, 500),
+        ('close_session', 'close_session', (new_guid, 'TTT1'), {}, 20),
+        ('close_server_sessions', 'close_server_sessions', ('TTT2',), {}, 200),
+        ('acknowledge_alert', 'acknowledge_alert', (s['alert_ids'][0],), {}, 20),
+        ('acknowledge_alerts (ids)', 'acknowledge_alerts', (s['alert_ids'][1:100],), {}, 50),
+        ('acknowledge_alerts (guid)', 'acknowledge_alerts', (), {'guid': s['guid']}, 20),
+        ('ban_player', 'ban_player', (s['guid'], 'plan check'), {}, 20),
+        ('unban_player', 'unban_player', (s['guid'],), {}, 20),
+        ('add_notes', 'add_notes', (s['guid'], 'plan check'), {}, 20),
+        ('save_checkpoint', 'save_checkpoint', ('plan-check', '/tmp/console.log', 1, 0), {}, 20),
+        ('cleanup_old_events', 'cleanup_old_events', (364,), {'pause': 0}, 2000),
+        ('acknowledge_alerts (before)', 'acknowledge_alerts', (), {'before_timestamp': '2000-01-01'}, 20),
+        ('check_stats_counters', 'check_stats_counters', (False,), {}, None),
+        ('rebuild_alt_clusters', 'rebuild_alt_clusters', (), {}, None),
+        ('rebuild_player_summary', 'rebuild_player_summary', (), {}, None),
+    ]
+
+
+def is_query(sql: str) -> bool:
+    # FTS5 reads its own shadow tables ('main'.'player_names_fts_data' ...) - not ours to plan
+    return (sql.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+            and "'main'." not in sql)
+
+
+def partial_indexes(conn) -> Dict[str, str]:
+    """Indexes with a WHERE clause -> their leading column (scanning one reads only the rows it covers)"""
+    partial = {}
+    for name, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index'").fetchall():
+        if sql and ' WHERE ' in sql.upper():
+            partial[name] = conn.execute(f'PRAGMA index_info({name})').fetchone()[2]
+    return partial
+
+
+def has_equality(sql: str, column: str) -> bool:
+    """Whether the statement compares `column` with = or IN (...) anywhere"""
+    return re.search(rf'(?<![\w.])(?:\w+\.)?{column}\s*(?:(?<![!<>])=|IN\s*\()', sql, re.IGNORECASE) is not None
+
+
+def full_scans(conn, sql: str, partial: Dict[str, str]) -> List[str]:
+    """
+    The plan lines of `sql` that read a whole table or index
+    Virtual tables, constant rows and subquery results are excepted, and so are scans
+    of a partial index - unless the statement has an equality on the index's leading
+    column, in which case the scan means that predicate couldn't use the index
+    """
+    scans = []
+    for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}'):
+        detail = row[3]
+        if not detail.startswith('SCAN ') or 'VIRTUAL TABLE' in detail or 'CONSTANT ROW' in detail:
+            continue
+        if detail.startswith('SCAN (subquery'):
+            continue
+        index = detail.rsplit(' ', 1)[-1]
+        if ' INDEX ' in detail and index in partial and not has_equality(sql, partial[index]):
+            continue
+        scans.append(detail)
+    return scans
+
+
+def run_checks(db: TracedPlayerDatabase, checks: List[tuple], repeat: int, budget_scale: float) -> int:
+    """Run every check, print a line per check; returns the number of failures"""
+    explain = sqlite3.connect(db.db_path)
+    partial = partial_indexes(explain)
+    failures = 0
+
+    for label, method, args, kwargs, budget in checks:
+        func = getattr(db, method)
+        is_read = method.startswith(('get_', 'find_'))
+        times = []
+        db.statements = []
+        # Writes change the data, so only reads are repeated
+        for _ in range(repeat if is_read else 1):
+            started = time.perf_counter()
+            func(*args, **kwargs)
+            times.append((time.perf_counter() - started) * 1000)
+        statements, db.statements = db.statements, None
+        elapsed = min(times)
+
+        problems = []
+        if label not in FULL_SCANS_ALLOWED:
+            for sql in dict.fromkeys(statements):
+                if is_query(sql):
+                    for scan in full_scans(explain, sql, partial):
+                        problems.append(f"{scan}  <- {' '.join(sql.split())[:120]}")
+        if budget is not None and elapsed > budget * budget_scale:
+            problems.append(f"{elapsed:.1f} ms is over the {budget * budget_scale:.0f} ms budget")
+
+        budget_text = f"/ {budget * budget_scale:.0f} ms" if budget is not None else "(maintenance)"
+        print(f"{'❌' if problems else '✅'} {label:<36} {elapsed:9.1f} ms {budget_text}")
+        for problem in dict.fromkeys(problems):
+            print(f"      {problem}")
+        failures += bool(problems)
+
+    explain.close()
+    return failures
+
+
+def uncovered_methods(checks: List[tuple]) -> List[str]:
+    """Public PlayerDatabase methods with no check (new methods must be added to plan_checks)"""
+    covered = {method for _, method, _, _, _ in checks}
+    return [name for name in dir(PlayerDatabase)
+            if not name.startswith('_') and callable(getattr(PlayerDatabase, name))
+            and name not in covered and name not in NOT_QUERIES]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail on full table scans or slow PlayerDatabase queries")
+    parser.add_argument('--players', type=int, default=1000000, help="Synthetic players to generate")
+    parser.add_argument('--db', default=None, help="Database to build (or reuse if it exists)")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated database")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per read (fastest counts)")
+    parser.add_argument('--budget-scale', type=float, default=1.0, help="Multiply every time budget")
+    args = parser.parse_args()
+
+    work_dir = None
+    db_path = args.db
+    if db_path is None:
+        work_dir = tempfile.mkdtemp(prefix="plan_check_")
+        db_path = os.path.join(work_dir, "players.db")
+
+    if not os.path.exists(db_path):
+        print(f"🏗️ Building a {args.players:,} player database at {db_path}")
+        build_database(db_path, args.players)
+
+    # Checks write to the database: run them on a copy so a kept database stays reusable
+    check_dir = tempfile.mkdtemp(prefix="plan_check_run_")
+    check_path = os.path.join(check_dir, "players.db")
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(check_path)
+    source.backup(target)
+    source.close()
+    target.close()
+
+    db = TracedPlayerDatabase(check_path)
+    players = db._get_connection().execute('SELECT COUNT(*) FROM players').fetchone()[0]
+    checks = plan_checks(sample_inputs(db._get_connection(), players))
+
+    print(f"\n🔍 Checking query plans against {players:,} players\n")
+    failures = run_checks(db, checks, args.repeat, args.budget_scale)
+
+    missing = uncovered_methods(checks)
+    for name in missing:
+        print(f"❌ {name}: no plan check - add it to plan_checks()")
+    failures += len(missing)
+
+    shutil.rmtree(check_dir, ignore_errors=True)
+    if work_dir and not args.keep:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    elif work_dir:
+        print(f"\n💾 Database kept at {db_path} (reuse with --db)")
+
+    print()
+    if failures:
+        print(f"❌ {failures} check(s) failed")
+        raise SystemExit(1)
+    print(f"✅ All {len(checks)} checks passed")
@@ -14,6 +14,11 @@ import os
 from datetime import datetime
 from collections import deque
 
+from log_tailer import LogTailer, read_tail, read_tail_lines
+from log_manifest import get_manifest
+from log_classifier import classify_lines, parse_events
+from log_events import NetStats, CrashMarker
+
 WEBHOOK_URL = 'https://discord.com/api/webhooks/1452426838423900190/7q3iAx6EK3SFGeYRTotr9tv1Zm_m0AW6E7D-8FiE4WFhWFepED_AWdUy57pRXWBKFati'
 CHECK_INTERVAL = 30
 LOG_SCAN_LINES = 100
@@ -37,24 +42,44 @@ LOG_PATHS = {
     "ttt3": "/srv/armareforger/u98fbb3f3c/logs",
 }
 
+_manifest = get_manifest(LOG_PATHS)
+
 def get_latest_log_dir(server_name):
     """Get the most recent log directory for a server"""
-    log_path = LOG_PATHS.get(server_name)
-    if not log_path or not os.path.exists(log_path):
-        return None
-    
-    # Get all dated directories
-    dirs = [d for d in os.listdir(log_path) if os.path.isdir(os.path.join(log_path, d)) and d.startswith('20')]
-    if not dirs:
-        return None
-    
-    # Sort by name (they're date-formatted, so this works)
-    dirs.sort(reverse=True)
-    return os.path.join(log_path, dirs[0])
+    return _manifest.latest_dir(server_name)
+
+# Console logs are followed incrementally: each scan only reads bytes appended since the last one
+_console_buffers = {}  # server_name -> deque of recent lines
+
+def _reset_console_buffer(server_name, old_path, new_path):
+    """New session started - drop lines from the previous session"""
+    buf = _console_buffers.get(server_name)
+    if buf is not None:
+        buf.clear()
+
+_console_tailer = LogTailer(LOG_PATHS, use_inotify=False, on_rollover=_reset_console_buffer)
 
 def read_log_file(server_name, log_type='console', lines=500):
     """Read last N lines from a server's log file - memory efficient"""
-    from collections import deque
+    if log_type == 'console':
+        buf = _console_buffers.get(server_name)
+        try:
+            if buf is None or buf.maxlen != lines:
+                # (Re)seed from an mmap tail ending exactly where the tailer starts following
+                _console_tailer.cursors.pop(server_name, None)
+                cursor = _console_tailer.start(server_name)
+                if cursor is None:
+                    return ""
+                buf = deque(maxlen=lines)
+                if cursor.offset:
+                    buf.extend(read_tail_lines(cursor.path, lines, end=cursor.offset))
+                _console_buffers[server_name] = buf
+            
+            for line in _console_tailer.iter_new_lines(server_name):
+                buf.append(line)
+        except Exception:
+            return ""
+        return ''.join(buf)
     
     log_dir = get_latest_log_dir(server_name)
     if not log_dir:
@@ -65,15 +90,11 @@ def read_log_file(server_name, log_type='console', lines=500):
         return ""
     
     try:
-        # Use deque for memory-efficient tail reading
-        with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-            last_lines = deque(f, maxlen=lines)
-        return ''.join(last_lines)
+        # mmap + backwards scan from EOF - only the last N lines are decoded
+        return read_tail(log_file, lines)
     except:
         return ""
 
-CRASH_KEYWORDS = ["Application crash", "malloc()"]
-
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -93,10 +114,9 @@ def send_webhook(title, description, color=0xFF0000, fields=None, server_name=No
 def scan_logs_for_crashes(container, lines=LOG_SCAN_LINES):
     try:
         logs = container.logs(tail=lines).decode('utf-8', errors='replace')
-        for line in logs.split('\n'):
-            for keyword in CRASH_KEYWORDS:
-                if keyword.lower() in line.lower():
-                    return (line.strip(), keyword)
+        for event in classify_lines(logs.split('\n')):
+            if type(event) is CrashMarker:
+                return (event.line.strip(), event.keyword)
     except:
         pass
     return None
@@ -112,43 +132,17 @@ def scan_logs_for_packet_loss(container, server_name, lines=500):
         
         high_loss_players = []
         
-        # Build connection ID to player name mapping from logs
-        conn_to_player = {}
-        for line in logs.split('\n'):
-            # Match: "Player joined, id: 131, ... name: Heck Let Loose"
-            admin_match = re.search(r'Player joined, id: (\d+),.*name: ([^,]+)', line)
-            if admin_match:
-                pid, name = admin_match.groups()
-                conn_to_player[pid] = name.strip()
-            
-            # Match: "### Updating player: PlayerId=131, Name=Heck Let Loose"
-            update_match = re.search(r'PlayerId=(\d+), Name=([^,]+)', line)
-            if update_match:
-                pid, name = update_match.groups()
-                conn_to_player[pid] = name.strip()
-            
-            # Match BattlEye: "BattlEye Server: 'Player #283 Crowbar™ (IP) connected'"
-            be_match = re.search(r"BattlEye Server: 'Player #(\d+) ([^(]+) \(", line)
-            if be_match:
-                player_num, name = be_match.groups()
-                conn_to_player[player_num] = name.strip()
-            
-            # Match: "Player connected: connectionID=113" followed by name info
-            conn_match = re.search(r'Player connected: connectionID=(\d+)', line)
-            if conn_match:
-                conn_id = conn_match.group(1)
-                # Look for name in nearby context
+        # One pass: the enrichment stage maps connection ids to names from the
+        # join/update/BattlEye connect lines seen before each stats line
+        latest = None
+        for event in parse_events(logs.split('\n'), server_name):
+            if type(event) is NetStats:
+                latest = event  # only the most recent stats line matters
         
         # Find packet loss entries (from most recent FPS line)
-        fps_lines = [l for l in logs.split('\n') if 'PktLoss:' in l]
-        if fps_lines:
-            latest_fps = fps_lines[-1]  # Most recent stats
-            matches = re.findall(r'\[C(\d+)\], PktLoss: (\d+)/100', latest_fps)
-            for conn_id, loss in matches:
-                loss = int(loss)
+        if latest:
+            for conn_id, loss, player_name in latest.player_losses():
                 if loss >= PACKET_LOSS_THRESHOLD:
-                    # Try to find player name
-                    player_name = conn_to_player.get(conn_id, f"Connection {conn_id}")
                     high_loss_players.append((conn_id, loss, player_name))
         
         return high_loss_players
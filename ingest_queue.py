@@ -0,0 +1,379 @@
+"""
+Bounded Ingest Queue between Log Parsing and the Player Database
+A single writer thread drains the queue in batches (one commit per batch).
+Producers block above the high watermark until the writer catches up to the
+low watermark, so a slow database pauses log reading instead of losing lines.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Tuple
+
+# Duplicate handling for events still waiting in the queue
+POLICY_KEEP = 'keep'    # write every event
+POLICY_DROP = 'drop'    # drop an event identical to one already queued
+POLICY_MERGE = 'merge'  # fold an event into the queued one for the same GUID (newest values win)
+
+_CHECKPOINT = object()   # marker item: save a checkpoint once everything before it is written
+_DISCONNECT = object()   # marker item: close one player's session
+_SESSION_END = object()  # marker item: close every session open on a server
+
+
+class _Item:
+    __slots__ = ('guid', 'name', 'ip', 'beguid', 'server_name', 'geo_data', 'connected_at')
+
+    def __init__(self, guid, name, ip, beguid, server_name, geo_data, connected_at=None):
+        self.guid = guid
+        self.name = name
+        self.ip = ip
+        self.beguid = beguid
+        self.server_name = server_name
+        self.geo_data = geo_data
+        self.connected_at = connected_at
+
+    def key(self):
+        return (self.guid, self.name, self.ip, self.beguid, self.server_name)
+
+
+class IngestQueue:
+    def __init__(self, db, maxsize: int = 10000, high_watermark: int = None, low_watermark: int = None,
+                 batch_size: int = 500, flush_interval: float = 0.5, policy: str = POLICY_KEEP,
+                 on_alerts: Callable[[str, List[str]], None] = None, retry_delay: float = 1.0):
+        """
+        db: PlayerDatabase (only the writer thread touches it)
+        high/low watermark default to 80% / 20% of maxsize
+        on_alerts(server_name, alerts) is called from the writer thread after each commit
+        """
+        if policy not in (POLICY_KEEP, POLICY_DROP, POLICY_MERGE):
+            raise ValueError(f"Unknown duplicate policy: {policy}")
+
+        self.db = db
+        self.maxsize = maxsize
+        self.high_watermark = high_watermark or int(maxsize * 0.8)
+        self.low_watermark = low_watermark if low_watermark is not None else int(maxsize * 0.2)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.on_alerts = on_alerts
+        self.retry_delay = retry_delay
+
+        self._queue = deque()  # _Item or (marker, ...) tuples
+        self._pending = {}     # duplicate key -> queued _Item (drop/merge policies)
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._drained = threading.Condition(self._lock)  # depth fell to low watermark / writer idle
+        self._throttled = False
+        self._writing = 0
+        self._closed = False
+
+        self.metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'merged': 0,
+            'checkpoints': 0,
+            'session_ends': 0,
+            'batches': 0,
+            'retries': 0,
+            'errors': 0,
+            'alerts': 0,
+            'max_depth': 0,
+            'producer_waits': 0,
+            'producer_wait_seconds': 0.0,
+            'last_batch_size': 0,
+            'last_batch_ms': 0.0,
+        }
+
+        self._writer = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._writer.start()
+
+    # ---- producer side ---------------------------------------------------
+
+    def _wait_for_room(self):
+        """Backpressure: once over the high watermark, block until back at the low watermark"""
+        if len(self._queue) >= self.high_watermark:
+            self._throttled = True
+        if not self._throttled:
+            return
+
+        started = time.time()
+        self.metrics['producer_waits'] += 1
+        while self._throttled and not self._closed:
+            self._drained.wait()
+        self.metrics['producer_wait_seconds'] += time.time() - started
+
+    def _append(self, item):
+        self._queue.append(item)
+        depth = len(self._queue)
+        if depth > self.metrics['max_depth']:
+            self.metrics['max_depth'] = depth
+        self._not_empty.notify()
+
+    def put(self, guid: str, name: str, ip: str = None, beguid: str = None,
+            server_name: str = None, geo_data: Dict = None, connected_at: str = None) -> bool:
+        """
+        Queue one player connection (same arguments as PlayerDatabase.update_player)
+        Blocks while the queue is throttled; returns False if dropped/merged as a duplicate
+        """
+        item = _Item(guid, name, ip, beguid, server_name, geo_data, connected_at)
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("IngestQueue is closed")
+
+            if self.policy == POLICY_DROP:
+                if item.key() in self._pending:
+                    self.metrics['dropped'] += 1
+                    return False
+                self._pending[item.key()] = item
+
+            elif self.policy == POLICY_MERGE:
+                queued = self._pending.get(guid)
+                if queued is not None:
+                    queued.name = name
+                    queued.ip = ip or queued.ip
+                    queued.beguid = beguid or queued.beguid
+                    queued.server_name = server_name or queued.server_name
+                    queued.geo_data = geo_data or queued.geo_data
+                    self.metrics['merged'] += 1
+                    return False
+                self._pending[guid] = item
+
+            self._wait_for_room()
+            self._append(item)
+            self.metrics['enqueued'] += 1
+            return True
+
+    def _forget(self, guid: str = None, server_name: str = None):
+        """
+        Stop queued events from absorbing later duplicates once a disconnect or
+        session end is queued after them: a reconnect is a new connection
+        """
+        if server_name is not None:
+            server_name = server_name.upper()
+        for key, queued in list(self._pending.items()):
+            if guid is not None and queued.guid != guid:
+                continue
+            if server_name is not None and (queued.server_name or '').upper() != server_name:
+                continue
+            del self._pending[key]
+
+    def _put_marker(self, item: tuple):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("IngestQueue is closed")
+            if item[0] is _DISCONNECT and self._pending:
+                self._forget(guid=item[1])
+            elif item[0] is _SESSION_END and self._pending:
+                self._forget(server_name=item[1])
+            self._wait_for_room()
+            self._append(item)
+
+    def put_checkpoint(self, stream: str, checkpoint: Dict):
+        """
+        Save a checkpoint (PlayerDatabase.save_checkpoint kwargs) in the same
+        commit as every event queued before it
+        """
+        self._put_marker((_CHECKPOINT, stream, checkpoint))
+
+    def put_disconnect(self, guid: str, server_name: str = None, ended_at: str = None):
+        """Close the player's session once the connects queued before it are written"""
+        self._put_marker((_DISCONNECT, guid, server_name, ended_at))
+
+    def put_session_end(self, server_name: str, ended_at: str = None):
+        """The server's session log ended (restart/rollover): close every session still open on it"""
+        self._put_marker((_SESSION_END, server_name, ended_at))
+
+    # ---- writer side -----------------------------------------------------
+
+    def _take_batch(self) -> List:
+        with self._lock:
+            while not self._queue and not self._closed:
+                self._not_empty.wait(self.flush_interval)
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            # Taken items can no longer absorb duplicates
+            for item in batch:
+                if type(item) is _Item:
+                    key = item.guid if self.policy == POLICY_MERGE else item.key()
+                    if self._pending.get(key) is item:
+                        del self._pending[key]
+            self._writing = len(batch)
+            return batch
+
+    def _write_events(self, items: List[_Item]) -> List:
+        events = [{'guid': item.guid, 'name': item.name, 'ip': item.ip, 'beguid': item.beguid,
+                   'server_name': item.server_name, 'geo_data': item.geo_data,
+                   'connected_at': item.connected_at} for item in items]
+        alerts = self.db.update_players_batch(events)
+        if alerts and alerts[0] and alerts[0][0].startswith("Error:"):
+            # Bad event somewhere in the run - write one by one so only that one is lost
+            alerts = [self.db.update_player(**event) for event in events]
+        return [(item.server_name, item_alerts) for item, item_alerts in zip(items, alerts)]
+
+    @staticmethod
+    def _segments(batch: List) -> List:
+        """Split a batch into runs of consecutive events (lists) and the markers between them"""
+        segments = []
+        run = []
+        for item in batch:
+            if type(item) is _Item:
+                run.append(item)
+                continue
+            if run:
+                segments.append(run)
+                run = []
+            segments.append(item)
+        if run:
+            segments.append(run)
+        return segments
+
+    def _write_segment(self, segment) -> List:
+        """Write one run of events or one marker; returns [(server_name, alerts)]"""
+        if type(segment) is list:
+            return self._write_events(segment)
+        if segment[0] is _CHECKPOINT:
+            _, stream, checkpoint = segment
+            self.db.save_checkpoint(stream, **checkpoint)
+        elif segment[0] is _DISCONNECT:
+            _, guid, server_name, ended_at = segment
+            self.db.close_session(guid, server_name, ended_at)
+        else:
+            _, server_name, ended_at = segment
+            self.db.close_server_sessions(server_name, ended_at)
+        return []
+
+    def _write_batch(self, batch: List) -> Tuple[List, List]:
+        """One transaction for the whole batch; returns ([(server_name, alerts)], failed markers)"""
+        results = []
+        with self.db.batch():
+            for segment in self._segments(batch):
+                results.extend(self._write_segment(segment))
+        return results, []
+
+    def _write_each(self, batch: List) -> Tuple[List, List]:
+        """
+        Fallback after the batch transaction failed: one transaction per run and per
+        marker, so a bad run only loses its own events and later checkpoints still land
+        Returns ([(server_name, alerts)], markers that could not be written)
+        """
+        results = []
+        failed = []
+        for segment in self._segments(batch):
+            while True:
+                try:
+                    with self.db.batch():
+                        results.extend(self._write_segment(segment))
+                    break
+                except sqlite3.OperationalError as e:
+                    if 'locked' not in str(e) and 'busy' not in str(e):
+                        self._segment_failed(segment, e, results, failed)
+                        break
+                    self.metrics['retries'] += 1
+                    time.sleep(self.retry_delay)
+                except Exception as e:
+                    self._segment_failed(segment, e, results, failed)
+                    break
+        return results, failed
+
+    @staticmethod
+    def _segment_failed(segment, error: Exception, results: List, failed: List):
+        if type(segment) is list:
+            print(f"❌ Ingest run of {len(segment)} events dropped: {error}")
+            results.extend((item.server_name, [f"Error: {error}"]) for item in segment)
+        else:
+            print(f"❌ Ingest marker dropped: {error}")
+            failed.append(segment)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                with self._lock:
+                    self._writing = 0
+                    self._drained.notify_all()
+                    if self._closed:
+                        return
+                continue
+
+            started = time.time()
+            while True:
+                try:
+                    results, failed = self._write_batch(batch)
+                    break
+                except sqlite3.OperationalError as e:
+                    if 'locked' not in str(e) and 'busy' not in str(e):
+                        print(f"⚠️ Ingest batch of {len(batch)} failed ({e}), writing it piece by piece")
+                        results, failed = self._write_each(batch)
+                        break
+                    # Locked/busy database: keep the batch and try again - nothing is lost
+                    self.metrics['retries'] += 1
+                    print(f"⚠️ Ingest batch failed ({e}), retrying in {self.retry_delay}s")
+                    time.sleep(self.retry_delay)
+                except Exception as e:
+                    print(f"⚠️ Ingest batch of {len(batch)} failed ({e}), writing it piece by piece")
+                    results, failed = self._write_each(batch)
+                    break
+
+            with self._lock:
+                self._writing = 0
+                self.metrics['batches'] += 1
+                self.metrics['last_batch_size'] = len(batch)
+                self.metrics['last_batch_ms'] = (time.time() - started) * 1000
+                # Markers the fallback couldn't write count as errors, not as checkpoints/session ends
+                self.metrics['errors'] += len(failed)
+                for item in batch:
+                    if type(item) is not _Item and not any(item is marker for marker in failed):
+                        if item[0] is _CHECKPOINT:
+                            self.metrics['checkpoints'] += 1
+                        elif item[0] is _SESSION_END:
+                            self.metrics['session_ends'] += 1
+                for server_name, alerts in results:
+                    if alerts and alerts[0].startswith("Error:"):
+                        self.metrics['errors'] += 1
+                    else:
+                        self.metrics['written'] += 1
+                        self.metrics['alerts'] += len(alerts)
+                if self._throttled and len(self._queue) <= self.low_watermark:
+                    self._throttled = False
+                self._drained.notify_all()
+
+            if self.on_alerts:
+                for server_name, alerts in results:
+                    if alerts and not alerts[0].startswith("Error:"):
+                        self.on_alerts(server_name, alerts)
+
+    # ---- control ---------------------------------------------------------
+
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> Dict:
+        """Metrics snapshot, including current depth and throttle state"""
+        with self._lock:
+            stats = dict(self.metrics)
+            stats['depth'] = len(self._queue)
+            stats['throttled'] = self._throttled
+            return stats
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until everything queued so far is committed; False on timeout"""
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._lock:
+            while self._queue or self._writing:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._not_empty.notify()
+                self._drained.wait(remaining)
+            return True
+
+    def close(self, timeout: float = None):
+        """Write what is queued, then stop the writer thread"""
+        self.flush(timeout)
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._drained.notify_all()
+        self._writer.join(timeout)
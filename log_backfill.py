@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Historical Log Backfill for the Player Database
+Parses every archived session directory of every server in parallel and
+feeds the results to a single database writer. Safe to stop and re-run.
+
+Usage: python3 log_backfill.py [--workers N] [--include-live]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from log_tailer import FileCursor
+from log_manifest import get_manifest
+from ingest_queue import IngestQueue
+from log_classifier import LogClock, log_end_time, parse_events
+from log_events import PlayerAuthenticated, PlayerDisconnected
+
+
+def checkpoint_stream(log_file: str) -> str:
+    """Checkpoint key for one archived file (live tailing uses the bare server name)"""
+    return f"backfill:{log_file}"
+
+
+def list_session_logs(log_paths: Dict[str, str], include_live: bool = False) -> List[Tuple[str, str]]:
+    """
+    Every (server_name, console.log) pair under LOG_PATHS, oldest session first
+    The newest session of each server is skipped unless include_live is set,
+    since auto_monitor owns the live file
+    """
+    manifest = get_manifest(log_paths)
+    files = []
+    for server_name, log_path in log_paths.items():
+        if not log_path or not os.path.exists(log_path):
+            print(f"⚠️ Log path not found for {server_name}: {log_path}")
+            continue
+
+        if include_live:
+            sessions = [info for info in manifest.sessions(server_name) if info.log_size is not None]
+        else:
+            sessions = manifest.closed_sessions(server_name)
+
+        for info in sessions:
+            files.append((info.name, server_name, info.log_file))
+
+    # Session directory names are timestamps, so this is chronological across servers
+    files.sort()
+    return [(server_name, log_file) for _, server_name, log_file in files]
+
+
+def parse_log_file(server_name: str, log_file: str, checkpoint: Optional[Dict] = None) -> Dict:
+    """
+    Worker: parse one console.log (from its checkpoint if still valid)
+    Returns player connects/disconnects (in log order, with ISO times) plus the
+    cursor position to checkpoint afterwards
+    """
+    cursor = None
+    if checkpoint:
+        cursor = FileCursor.restore(log_file, checkpoint.get('inode'),
+                                    checkpoint['offset'], checkpoint.get('last_line_hash'))
+    if cursor is None:
+        cursor = FileCursor(log_file)
+    start_offset = cursor.offset
+
+    lines = 0
+
+    def counted(source):
+        nonlocal lines
+        for line in source:
+            lines += 1
+            yield line
+
+    # Plain tuples back to the parent - cheaper to pickle than event objects
+    clock = LogClock.for_log_file(log_file)
+    events = []
+    disconnects = 0
+    for event in parse_events(counted(cursor.iter_lines()), server_name):
+        cls = type(event)
+        if cls is PlayerAuthenticated:
+            at = clock.timestamp(event.log_time) if clock else None
+            events.append((event.guid, event.name, event.ip, event.beguid, at))
+        elif cls is PlayerDisconnected and event.guid:
+            at = clock.timestamp(event.log_time) if clock else None
+            events.append((event.guid, None, None, None, at))  # name None = disconnect
+            disconnects += 1
+
+    return {
+        'server_name': server_name,
+        'log_file': log_file,
+        'events': events,
+        'disconnects': disconnects,
+        'lines': lines,
+        'bytes': cursor.offset - start_offset,
+        'checkpoint': cursor.checkpoint(),
+    }
+
+
+def _parse_task(task):
+    return parse_log_file(*task)
+
+
+def _is_complete(log_file: str, checkpoint: Optional[Dict]) -> bool:
+    """True if a previous run already ingested this file up to its current size"""
+    if not checkpoint:
+        return False
+    try:
+        st = os.stat(log_file)
+    except OSError:
+        return True
+    return checkpoint.get('inode') == st.st_ino and checkpoint['offset'] >= st.st_size
+
+
+def backfill(db, log_paths: Dict[str, str], workers: int = None, include_live: bool = False) -> Dict:
+    """
+    Parse all session logs in a process pool; this process is the only DB writer
+    Each file is checkpointed once its events are written, so an interrupted
+    backfill resumes with the next unfinished file. Files auto_monitor has read
+    (see its rollover checkpoint) are skipped or resumed where it stopped
+    """
+    all_files = list_session_logs(log_paths, include_live)
+    manifest = get_manifest(log_paths)
+    live_files = {info.log_file for info in map(manifest.latest, log_paths) if info is not None}
+
+    tasks = []
+    for server_name, log_file in all_files:
+        live = db.get_checkpoint(server_name)
+        if log_file in live_files and live and live['file_path'] == log_file:
+            continue  # auto_monitor is still reading this one
+        checkpoint = db.get_checkpoint(checkpoint_stream(log_file))
+        if not checkpoint and live and live['file_path'] == log_file:
+            # auto_monitor stopped partway through this session: its lines are already in
+            checkpoint = live
+        if not _is_complete(log_file, checkpoint):
+            tasks.append((server_name, log_file, checkpoint))
+
+    stats = {
+        'files_total': len(all_files),
+        'files_skipped': len(all_files) - len(tasks),
+        'files_processed': 0,
+        'lines_processed': 0,
+        'events': 0,
+        'alerts_generated': 0,
+        'errors': 0,
+    }
+
+    print(f"📚 {len(all_files)} session logs found, {stats['files_skipped']} already imported, "
+          f"{len(tasks)} to go ({workers or os.cpu_count()} workers)")
+    if not tasks:
+        return stats
+
+    started = time.time()
+    bytes_done = 0
+
+    # Batched commits on a writer thread; parsing pauses if the writer falls behind
+    queue = IngestQueue(db)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() keeps session order, so name/IP change alerts come out in the order they happened
+        for result in executor.map(_parse_task, tasks, chunksize=1):
+            server_name = result['server_name']
+            for guid, name, ip, beguid, at in result['events']:
+                if name is None:
+                    queue.put_disconnect(guid, server_name, at)
+                else:
+                    queue.put(guid, name, ip, beguid, server_name=server_name, connected_at=at)
+
+            # An archived session ended with a server restart: close whoever never logged a disconnect
+            if result['log_file'] not in live_files:
+                queue.put_session_end(server_name, log_end_time(result['log_file']))
+
+            # Committed in the same transaction as the file's last player updates
+            queue.put_checkpoint(checkpoint_stream(result['log_file']), result['checkpoint'])
+
+            stats['files_processed'] += 1
+            stats['lines_processed'] += result['lines']
+            stats['events'] += len(result['events']) - result['disconnects']
+            bytes_done += result['bytes']
+
+            elapsed = max(time.time() - started, 1e-6)
+            print(f"   [{stats['files_processed']}/{len(tasks)}] {result['server_name']} "
+                  f"{os.path.basename(os.path.dirname(result['log_file']))}: "
+                  f"{result['lines']:,} lines, {len(result['events']) - result['disconnects']} players "
+                  f"| {bytes_done / elapsed / 1024 / 1024:.1f} MB/s | queue {queue.depth()}")
+
+    queue.close()
+    queue_stats = queue.stats()
+    stats['alerts_generated'] = queue_stats['alerts']
+    stats['errors'] = queue_stats['errors']
+
+    return stats
+
+
+if __name__ == "__main__":
+    from player_database import PlayerDatabase
+    from auto_monitor import DB_PATH, LOG_PATHS
+
+    parser = argparse.ArgumentParser(description="Import all archived session logs into the player database")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument('--include-live', action='store_true', help="Also import each server's newest session")
+    parser.add_argument('--db', default=DB_PATH, help="Player database path")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("📥 BACKFILLING PLAYER DATABASE FROM ALL SESSION LOGS")
+    print("="*60 + "\n")
+
+    db = PlayerDatabase(args.db)
+    stats = backfill(db, LOG_PATHS, workers=args.workers, include_live=args.include_live)
+
+    print("\n" + "="*60)
+    print(f"✅ BACKFILL COMPLETE: {stats}")
+    print("="*60 + "\n")
@@ -0,0 +1,157 @@
+"""
+Typed Log Events for Arma Reforger
+Small slotted objects produced by log_classifier - one per interesting log line
+"""
+
+from typing import List, Optional, Tuple
+
+
+class LogEvent:
+    """
+    Base class for every parsed log event
+    server_name is filled in by the enrichment stage, log_time ("HH:MM:SS")
+    comes from the line prefix when present
+    """
+
+    __slots__ = ('server_name', 'log_time')
+    kind = 'other'
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name, None)!r}" for name in self._fields())
+        return f"{type(self).__name__}({fields})"
+
+    @classmethod
+    def _fields(cls) -> List[str]:
+        names = []
+        for klass in reversed(cls.__mro__):
+            names.extend(getattr(klass, '__slots__', ()))
+        return names
+
+
+class PlayerConnected(LogEvent):
+    """BattlEye Server: 'Player #283 Crowbar™ (1.2.3.4:2302) connected'"""
+
+    __slots__ = ('player_id', 'name', 'address', 'ip', 'port')
+    kind = 'be_connect'
+
+    def __init__(self, player_id: str, name: str, address: str, ip: str, port: Optional[str],
+                 log_time: str = None):
+        self.server_name = None
+        self.log_time = log_time
+        self.player_id = player_id
+        self.name = name
+        self.address = address
+        self.ip = ip
+        self.port = port
+
+
+class PlayerGuid(LogEvent):
+    """BattlEye Server: 'Player #283 Crowbar™ - BE GUID: abc123' (ip is filled in from the connect line)"""
+
+    __slots__ = ('player_id', 'name', 'beguid', 'ip')
+    kind = 'be_guid'
+
+    def __init__(self, player_id: str, name: str, beguid: str, log_time: str = None):
+        self.server_name = None
+        self.log_time = log_time
+        self.player_id = player_id
+        self.name = name
+        self.beguid = beguid
+        self.ip = None
+
+
+class PlayerDisconnected(LogEvent):
+    """
+    BattlEye Server: 'Player #214 jimmyrobbo2102 disconnected'
+    or "Player id=1 Name (12345678) disconnected" (guid set)
+    """
+
+    __slots__ = ('player_id', 'name', 'guid')
+    kind = 'be_disconnect'
+
+    def __init__(self, player_id: Optional[str], name: str, guid: str = None, log_time: str = None):
+        self.server_name = None
+        self.log_time = log_time
+        self.player_id = player_id
+        self.name = name
+        self.guid = guid
+
+
+class PlayerJoined(LogEvent):
+    """Player joined, id: 131, ... name: Heck Let Loose, identityId: xxx"""
+
+    __slots__ = ('player_id', 'name', 'identity')
+    kind = 'player_joined'
+
+    def __init__(self, player_id: str, name: str, identity: Optional[str], log_time: str = None):
+        self.server_name = None
+        self.log_time = log_time
+        self.player_id = player_id
+        self.name = name
+        self.identity = identity
+
+
+class PlayerUpdated(LogEvent):
+    """### Updating player: PlayerId=131, Name=Heck Let Loose"""
+
+    __slots__ = ('player_id', 'name')
+    kind = 'player_updated'
+
+    def __init__(self, player_id: str, name: str, log_time: str = None):
+        self.server_name = None
+        self.log_time = log_time
+        self.player_id = player_id
+        self.name = name
+
+
+class PlayerAuthenticated(LogEvent):
+    """Player id=1 Name (12345678) has been authenticated. IP: 1.2.3.4:2302 BE GUID: abc123"""
+
+    __slots__ = ('player_id', 'name', 'guid', 'ip', 'beguid')
+    kind = 'player_authenticated'
+
+    def __init__(self, player_id: Optional[str], name: str, guid: str, ip: Optional[str],
+                 beguid: Optional[str], log_time: str = None):
+        self.server_name = None
+        self.log_time = log_time
+        self.player_id = player_id
+        self.name = name
+        self.guid = guid
+        self.ip = ip
+        self.beguid = beguid
+
+
+class NetStats(LogEvent):
+    """
+    FPS/stats line with [C131], PktLoss: 12/100 entries
+    losses: [(connection_id, loss_percent)]; names maps connection_id -> player name
+    (filled in by the enrichment stage from earlier join/connect lines)
+    """
+
+    __slots__ = ('losses', 'names')
+    kind = 'net_stats'
+
+    def __init__(self, losses: List[Tuple[str, int]], log_time: str = None):
+        self.server_name = None
+        self.log_time = log_time
+        self.losses = losses
+        self.names = None
+
+    def player_losses(self) -> List[Tuple[str, int, str]]:
+        """[(connection_id, loss_percent, player_name)]"""
+        names = self.names or {}
+        return [(conn_id, loss, names.get(conn_id, f"Connection {conn_id}"))
+                for conn_id, loss in self.losses]
+
+
+class CrashMarker(LogEvent):
+    """A line containing one of the crash keywords (Application crash, malloc())"""
+
+    __slots__ = ('keyword', 'line')
+    kind = 'crash'
+
+    def __init__(self, keyword: str, line: str, log_time: str = None):
+        self.server_name = None
+        self.log_time = log_time
+        self.keyword = keyword
+        self.line = line
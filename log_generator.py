@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Synthetic Arma Reforger console.log Generator
+Writes realistic session logs (BattlEye connect/GUID/disconnect, Player joined,
+authentication, PktLoss FPS lines, engine noise, optional crash) in the same
+layout as the real servers: <logs root>/<YYYY-MM-DD_HH-MM-SS>/console.log
+
+Usage: python3 log_generator.py OUTPUT_DIR [--servers 3] [--sessions 4] [--players 128] ...
+"""
+
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+NOISE = [
+    "SCRIPT       : SCR_BaseGameMode: Game state changed",
+    "RESOURCES    : Loading prefab {1234ABCD}Prefabs/Vehicles/Wheeled/UAZ469.et",
+    "NETWORK      : Replication tick took 3.2 ms",
+    "WORLD        : Entity spawned at <1234.5 12.0 5678.9>",
+    "AI           : Group waypoint completed",
+    "SCRIPT       : SCR_CampaignMilitaryBaseComponent: Base captured",
+    "ENTITY       : Streaming in 14 entities",
+]
+
+NAME_PARTS = ["Crowbar", "Heck", "Ghost", "Viper", "Sarge", "Doc", "Tank", "Hawk", "Nomad",
+              "Reaper", "Bravo", "Echo", "Wolf", "Rook", "Jimmy", "Robbo", "Skeeter", "Ace"]
+
+
+class SyntheticPlayer:
+    """One persistent identity in the generated population"""
+
+    __slots__ = ('guid', 'beguid', 'identity', 'name', 'ip')
+
+    def __init__(self, rng: random.Random, index: int, shared_ips: List[str]):
+        self.guid = str(10000000 + index)
+        self.beguid = f"{rng.getrandbits(128):032x}"
+        self.identity = (f"{rng.getrandbits(32):08x}-{rng.getrandbits(16):04x}-{rng.getrandbits(16):04x}-"
+                         f"{rng.getrandbits(16):04x}-{rng.getrandbits(48):012x}")
+        self.name = f"{rng.choice(NAME_PARTS)}{rng.choice(NAME_PARTS)}{index}"
+        # A few players share an IP (households, alts, VPN exits)
+        if shared_ips and rng.random() < 0.05:
+            self.ip = rng.choice(shared_ips)
+        else:
+            self.ip = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+class SessionGenerator:
+    def __init__(self, players: int = 128, churn_per_hour: float = 60, duration_minutes: float = 120,
+                 population: int = None, stats_interval: int = 10, noise_per_second: float = 20,
+                 name_change_rate: float = 0.02, crash: bool = False, seed: int = 1):
+        """
+        players: server slots (steady-state players online)
+        churn_per_hour: leaves (and matching joins) per hour once the server is full
+        population: distinct identities to draw from (default 4x slots)
+        stats_interval: seconds between FPS/PktLoss lines
+        crash: end the session with an 'Application crash' marker
+        """
+        self.players = players
+        self.churn_per_hour = churn_per_hour
+        self.duration_minutes = duration_minutes
+        self.stats_interval = stats_interval
+        self.noise_per_second = noise_per_second
+        self.name_change_rate = name_change_rate
+        self.crash = crash
+        self.rng = random.Random(seed)
+
+        shared_ips = [f"100.64.{i}.{i + 1}" for i in range(8)]
+        self.population = [SyntheticPlayer(self.rng, i, shared_ips) for i in range(population or players * 4)]
+
+    def lines(self, start: datetime = None) -> Iterator[str]:
+        """Yield one session's console.log lines (with trailing newlines)"""
+        rng = self.rng
+        start = start or datetime(2026, 1, 1, 12, 0, 0)
+        duration = int(self.duration_minutes * 60)
+
+        offline = list(self.population)
+        rng.shuffle(offline)
+        online = {}  # player_id -> (SyntheticPlayer, be_num, port)
+        next_id = 1
+        next_be = 0
+        leave_p = self.churn_per_hour / 3600 / max(self.players, 1)
+
+        clock = [0, 0]  # [second, ms] of the last line, so timestamps never go backwards
+
+        def ts(second, ms=None):
+            if clock[0] != second:
+                clock[0], clock[1] = second, 0
+            clock[1] = min(999, clock[1] + rng.randint(1, 15)) if ms is None else max(ms, clock[1])
+            t = start + timedelta(seconds=second)
+            return f"{t:%H:%M:%S}.{clock[1]:03d}"
+
+        yield f"{ts(0, 0)}  ENGINE       : Game project loaded, starting server\n"
+
+        for second in range(duration):
+            # Fill to capacity quickly at start; afterwards joins replace leavers
+            joins = 0
+            if len(online) < self.players and offline:
+                joins = min(self.players - len(online), rng.randint(1, 4), len(offline))
+
+            for _ in range(joins):
+                p = offline.pop()
+                if rng.random() < self.name_change_rate:
+                    p.name = f"{rng.choice(NAME_PARTS)}{rng.choice(NAME_PARTS)}{rng.randint(1, 999)}"
+                pid, be_num, port = next_id, next_be, rng.randint(2000, 65000)
+                next_id += 1
+                next_be += 1
+                online[pid] = (p, be_num, port)
+                yield f"{ts(second)}  BATTLEYE     : BattlEye Server: 'Player #{be_num} {p.name} ({p.ip}:{port}) connected'\n"
+                yield f"{ts(second)}  BATTLEYE     : BattlEye Server: 'Player #{be_num} {p.name} - BE GUID: {p.beguid}'\n"
+                yield f"{ts(second)}  DEFAULT      : Player joined, id: {pid}, platform: PC, name: {p.name}, identityId: {p.identity}\n"
+                yield f"{ts(second)}  DEFAULT      : ### Updating player: PlayerId={pid}, Name={p.name}\n"
+                yield (f"{ts(second)}  DEFAULT      : Player id={pid} {p.name} ({p.guid}) has been authenticated. "
+                       f"IP: {p.ip}:{port} BE GUID: {p.beguid}\n")
+
+            # Churn
+            for pid in [pid for pid in online if rng.random() < leave_p]:
+                p, be_num, _ = online.pop(pid)
+                yield f"{ts(second)}  BATTLEYE     : BattlEye Server: 'Player #{be_num} {p.name} disconnected'\n"
+                yield f"{ts(second)}  DEFAULT      : Player id={pid} {p.name} ({p.guid}) disconnected\n"
+                offline.insert(0, p)
+
+            if second % self.stats_interval == 0 and online:
+                stats = ' '.join(f"[C{pid}], PktLoss: {min(100, int(rng.expovariate(0.4)))}/100, Ping: {rng.randint(20, 180)}"
+                                 for pid in online)
+                yield f"{ts(second, 0)}  DEFAULT      : FPS: {rng.uniform(30, 60):.1f}, frame time (avg: 16.6 ms) {stats}\n"
+
+            noise = int(self.noise_per_second) + (rng.random() < self.noise_per_second % 1)
+            for _ in range(noise):
+                yield f"{ts(second)}  {rng.choice(NOISE)}\n"
+
+        if self.crash:
+            yield f"{ts(duration, 0)}  ENGINE    (E): Application crash detected, writing minidump\n"
+            yield f"{ts(duration, 1)}  ENGINE    (E): malloc(): corrupted top size\n"
+        else:
+            for pid, (p, be_num, _) in list(online.items()):
+                yield f"{ts(duration, 0)}  BATTLEYE     : BattlEye Server: 'Player #{be_num} {p.name} disconnected'\n"
+            yield f"{ts(duration, 1)}  ENGINE       : Server shutting down\n"
+
+    def write_session(self, log_root: str, start: datetime) -> str:
+        """Write one session directory under log_root; returns the console.log path"""
+        session_dir = os.path.join(log_root, f"{start:%Y-%m-%d_%H-%M-%S}")
+        os.makedirs(session_dir, exist_ok=True)
+        log_file = os.path.join(session_dir, "console.log")
+        with open(log_file, 'w', encoding='utf-8') as f:
+            f.writelines(self.lines(start))
+        return log_file
+
+
+def generate_tree(output_dir: str, servers: int = 3, sessions: int = 4, start: datetime = None,
+                  seed: int = 1, **session_options) -> Dict[str, str]:
+    """
+    Write a LOG_PATHS-style tree: <output_dir>/<server>/<session>/console.log
+    Returns {server_name: logs root}, ready to use as LOG_PATHS
+    """
+    start = start or datetime(2026, 1, 1, 6, 0, 0)
+    log_paths = {}
+    for s in range(servers):
+        server_name = f"ttt{s + 1}"
+        log_root = os.path.join(output_dir, server_name)
+        os.makedirs(log_root, exist_ok=True)
+        generator = SessionGenerator(seed=seed * 1000 + s, **session_options)
+        minutes = session_options.get('duration_minutes', 120)
+        for i in range(sessions):
+            generator.write_session(log_root, start + timedelta(minutes=i * (minutes + 5)))
+        log_paths[server_name] = log_root
+    return log_paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic Arma Reforger console.log sessions")
+    parser.add_argument('output_dir')
+    parser.add_argument('--servers', type=int, default=3)
+    parser.add_argument('--sessions', type=int, default=4, help="Sessions per server")
+    parser.add_argument('--players', type=int, default=128, help="Slots per server")
+    parser.add_argument('--churn', type=float, default=60, help="Leaves per hour once full")
+    parser.add_argument('--minutes', type=float, default=120, help="Session length")
+    parser.add_argument('--noise', type=float, default=20, help="Engine noise lines per second")
+    parser.add_argument('--crash', action='store_true', help="End every session with a crash marker")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    paths = generate_tree(args.output_dir, servers=args.servers, sessions=args.sessions, seed=args.seed,
+                          players=args.players, churn_per_hour=args.churn, duration_minutes=args.minutes,
+                          noise_per_second=args.noise, crash=args.crash)
+
+    total = sum(os.path.getsize(os.path.join(root, d, "console.log"))
+                for root in paths.values() for d in os.listdir(root))
+    print(f"✅ Wrote {args.servers} x {args.sessions} sessions ({total / 1024 / 1024:.1f} MB)")
+    for server_name, root in paths.items():
+        print(f"   {server_name}: {root}")
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Inverted Index over Archived Session Logs
+Maps player names, BE GUIDs, identity IDs and IPs to (session, byte offset)
+postings, so player searches seek straight to matching lines instead of
+scanning every console.log. Closed sessions are indexed once, incrementally.
+
+Usage: python3 log_index.py [search term]
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from log_classifier import classify_line
+from log_manifest import get_manifest
+from log_events import PlayerConnected, PlayerGuid, PlayerDisconnected, PlayerJoined
+
+# Bump to drop and rebuild existing indexes when what gets indexed changes
+INDEX_VERSION = 1
+
+# Only the lines the linear scan keeps ('BattlEye' or 'Player joined' lines) are indexed,
+# so archived and live sessions match the same lines
+_INDEXED_EVENTS = (PlayerConnected, PlayerGuid, PlayerDisconnected, PlayerJoined)
+
+
+def _event_terms(event) -> List[str]:
+    """Normalized search terms for one player event"""
+    terms = [event.name.lower()]
+    cls = type(event)
+    if cls is PlayerConnected:
+        terms.append(event.address)  # ip:port - substring searches for the IP alone still match
+    elif cls is PlayerGuid:
+        terms.append(event.beguid.lower())
+    elif cls is PlayerJoined and event.identity:
+        terms.append(event.identity.lower())
+    return terms
+
+
+class LogIndex:
+    def __init__(self, db_path: str, log_paths: Dict[str, str], log_name: str = "console.log"):
+        """Open (or create) the index database for the given server log roots"""
+        self.db_path = db_path
+        self.log_paths = log_paths
+        self.log_name = log_name
+        self.manifest = get_manifest(log_paths, log_name)
+        self.local = threading.local()
+        self._init_database()
+
+    def _get_connection(self):
+        """Thread-safe database connection"""
+        if not hasattr(self.local, 'conn'):
+            self.local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self.local.conn
+
+    def _init_database(self):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        # One row per indexed session file; size is how far it has been indexed
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS indexed_sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                server_name TEXT NOT NULL,
+                session_dir TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                indexed_at REAL NOT NULL,
+                UNIQUE(server_name, session_dir)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS terms (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                term TEXT NOT NULL UNIQUE
+            )
+        ''')
+
+        # Clustered by term so a lookup is one contiguous range read
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL,
+                session_id INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                PRIMARY KEY (term_id, session_id, offset)
+            ) WITHOUT ROWID
+        ''')
+
+        cursor.execute('PRAGMA user_version')
+        if cursor.fetchone()[0] < INDEX_VERSION:
+            # Indexed with different line/term rules - start over (the next update() re-indexes)
+            cursor.execute('DELETE FROM postings')
+            cursor.execute('DELETE FROM indexed_sessions')
+            cursor.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+
+        self._init_term_search(cursor)
+        conn.commit()
+
+    def _init_term_search(self, cursor):
+        """
+        Trigram full-text index over the terms, so substring searches don't scan every term
+        Needs SQLite 3.34+ with FTS5; otherwise searches fall back to scanning the terms table
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'terms_fts'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS terms_fts USING fts5(
+                    term, content='terms', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Trigram term index unavailable ({e}) - log index searches will scan")
+            self.term_search = False
+            return
+
+        # Terms are only ever added
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS terms_fts_insert AFTER INSERT ON terms BEGIN
+                INSERT INTO terms_fts (rowid, term) VALUES (new.id, new.term);
+            END
+        ''')
+
+        if not exists:
+            # Existing index: add the terms recorded before the trigram index existed
+            cursor.execute("INSERT INTO terms_fts (terms_fts) VALUES ('rebuild')")
+        self.term_search = True
+
+    def closed_sessions(self, server_name: str) -> List[Tuple[str, str]]:
+        """(session_dir, log file) for every session except the newest, which is still being written"""
+        return [(info.name, info.log_file) for info in self.manifest.closed_sessions(server_name)]
+
+    def _term_ids(self, cursor, terms) -> Dict[str, int]:
+        cursor.executemany('INSERT OR IGNORE INTO terms (term) VALUES (?)', [(t,) for t in terms])
+        ids = {}
+        terms = list(terms)
+        for i in range(0, len(terms), 500):
+            batch = terms[i:i + 500]
+            cursor.execute(f'SELECT term, id FROM terms WHERE term IN ({",".join("?" * len(batch))})', batch)
+            ids.update(cursor.fetchall())
+        return ids
+
+    def index_file(self, server_name: str, session_dir: str, log_file: str) -> int:
+        """
+        Index one session file from where the last run stopped
+        Returns the number of postings added
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT id, size FROM indexed_sessions WHERE server_name = ? AND session_dir = ?',
+                       (server_name, session_dir))
+        row = cursor.fetchone()
+        session_id, start = (row[0], row[1]) if row else (None, 0)
+
+        if os.path.getsize(log_file) <= start:
+            return 0
+
+        postings = []  # (term, offset)
+        offset = start
+        with open(log_file, 'rb') as f:
+            f.seek(start)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # partial last line - picked up next run
+                if b'BattlEye' in raw or b'Player joined' in raw:
+                    event = classify_line(raw.decode('utf-8', errors='replace'))
+                    if isinstance(event, _INDEXED_EVENTS):
+                        for term in _event_terms(event):
+                            postings.append((term, offset))
+                offset += len(raw)
+
+        if session_id is None:
+            cursor.execute('''
+                INSERT INTO indexed_sessions (server_name, session_dir, file_path, size, indexed_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (server_name, session_dir, log_file, offset, time.time()))
+            session_id = cursor.lastrowid
+        else:
+            cursor.execute('UPDATE indexed_sessions SET size = ?, indexed_at = ? WHERE id = ?',
+                           (offset, time.time(), session_id))
+
+        term_ids = self._term_ids(cursor, {term for term, _ in postings})
+        cursor.executemany('INSERT OR IGNORE INTO postings (term_id, session_id, offset) VALUES (?, ?, ?)',
+                           [(term_ids[term], session_id, off) for term, off in postings])
+        conn.commit()
+        return len(postings)
+
+    def pending_sessions(self, server_name: str) -> List[Tuple[str, str, int]]:
+        """
+        Closed sessions not yet (fully) indexed - normally none, or the one that just closed
+        Returns (session_dir, log file, indexed size); lines before that offset are already searchable
+        """
+        conn = self._get_connection()
+        known = dict(conn.execute('SELECT session_dir, size FROM indexed_sessions WHERE server_name = ?',
+                                  (server_name,)).fetchall())
+        # Archived sessions no longer grow, so the manifest's sizes are current
+        return [(info.name, info.log_file, known.get(info.name, 0))
+                for info in self.manifest.closed_sessions(server_name)
+                if known.get(info.name, -1) < info.log_size]
+
+    def update(self) -> Dict:
+        """Index every closed session not yet (fully) indexed - cheap when nothing changed"""
+        stats = {'sessions_indexed': 0, 'postings_added': 0}
+
+        for server_name in self.log_paths:
+            for session_dir, log_file, _ in self.pending_sessions(server_name):
+                try:
+                    stats['postings_added'] += self.index_file(server_name, session_dir, log_file)
+                    stats['sessions_indexed'] += 1
+                except OSError as e:
+                    print(f"⚠️ Could not index {log_file}: {e}")
+
+        return stats
+
+    def search(self, server_name: str, search_term: str, limit: int = 100) -> List[str]:
+        """
+        Matching player lines for a (substring) search term, newest session first
+        Only the matching lines are read, by seeking to their byte offsets.
+        The term is matched against the indexed player names, IP:ports, BE GUIDs and
+        identity IDs of those lines, not against the rest of the line text
+        """
+        conn = self._get_connection()
+        needle = search_term.lower()
+
+        # Trigrams need at least 3 characters to match anything; shorter needles scan the terms
+        if self.term_search and len(needle) >= 3:
+            matching_terms = "SELECT rowid AS id FROM terms_fts WHERE terms_fts MATCH ?"
+            needle = '"' + needle.replace('"', '""') + '"'
+        else:
+            matching_terms = "SELECT id FROM terms WHERE instr(term, ?) > 0"
+
+        rows = conn.execute(f'''
+            SELECT s.file_path, p.offset
+            FROM ({matching_terms}) t
+            JOIN postings p ON p.term_id = t.id
+            JOIN indexed_sessions s ON s.id = p.session_id
+            WHERE s.server_name = ?
+            GROUP BY p.session_id, p.offset
+            ORDER BY s.session_dir DESC, p.offset
+            LIMIT ?
+        ''', (needle, server_name, limit)).fetchall()
+
+        results = []
+        handles = {}
+        try:
+            for file_path, offset in rows:
+                f = handles.get(file_path)
+                if f is None:
+                    try:
+                        f = handles[file_path] = open(file_path, 'rb')
+                    except OSError:
+                        continue  # session deleted since it was indexed
+                f.seek(offset)
+                results.append(f.readline().decode('utf-8', errors='replace').strip())
+        finally:
+            for f in handles.values():
+                f.close()
+
+        return results
+
+    def prune(self) -> int:
+        """Drop sessions whose log files no longer exist; returns how many were removed"""
+        conn = self._get_connection()
+        gone = [sid for sid, path in conn.execute('SELECT id, file_path FROM indexed_sessions')
+                if not os.path.exists(path)]
+        if gone:
+            # postings are keyed by term first, so delete in one pass rather than per session
+            placeholders = ",".join("?" * len(gone))
+            conn.execute(f'DELETE FROM postings WHERE session_id IN ({placeholders})', gone)
+            conn.execute(f'DELETE FROM indexed_sessions WHERE id IN ({placeholders})', gone)
+            conn.commit()
+        return len(gone)
+
+    def get_stats(self) -> Dict:
+        conn = self._get_connection()
+        return {
+            'sessions': conn.execute('SELECT COUNT(*) FROM indexed_sessions').fetchone()[0],
+            'terms': conn.execute('SELECT COUNT(*) FROM terms').fetchone()[0],
+            'postings': conn.execute('SELECT COUNT(*) FROM postings').fetchone()[0],
+        }
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, '/srv/armareforger/player_database')
+    from auto_monitor import LOG_PATHS
+
+    index = LogIndex("/srv/armareforger/Skeeters_Clanker/data/log_index.db", LOG_PATHS)
+
+    started = time.time()
+    print(f"📇 Updating log index... {index.update()} ({time.time() - started:.1f}s)")
+    print(f"📊 {index.get_stats()}")
+
+    if len(sys.argv) > 1:
+        for server_name in LOG_PATHS:
+            started = time.perf_counter()
+            lines = index.search(server_name, sys.argv[1])
+            print(f"\n🔍 {server_name}: {len(lines)} lines ({(time.perf_counter() - started) * 1000:.1f} ms)")
+            for line in lines[:20]:
+                print(f"   {line}")
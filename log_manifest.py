@@ -0,0 +1,155 @@
+"""
+Shared Session-Directory Manifest
+Keeps a sorted list of the dated session directories of every server (with
+console.log sizes and mtimes) so "latest session" / "recent sessions" lookups
+don't list and stat every archived directory on each call.
+
+The log root's mtime changes whenever a session directory is created or
+removed, so a single os.stat per lookup tells whether the cached list is
+still valid. Only new directories (and the one that was newest) are stat'ed
+on a rescan; archived sessions never change.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class SessionInfo:
+    """One dated session directory; log_size/log_mtime are None if it has no log file"""
+
+    __slots__ = ('name', 'path', 'log_file', 'log_size', 'log_mtime')
+
+    def __init__(self, name: str, path: str, log_file: str, log_size: Optional[int], log_mtime: Optional[float]):
+        self.name = name
+        self.path = path
+        self.log_file = log_file
+        self.log_size = log_size
+        self.log_mtime = log_mtime
+
+    def __repr__(self):
+        return f"SessionInfo({self.name!r}, log_size={self.log_size})"
+
+
+class SessionManifest:
+    def __init__(self, log_paths: Dict[str, str], log_name: str = "console.log", max_age: float = 60.0):
+        """
+        log_paths: {server_name: logs root}, looked up exactly as given
+        max_age: rescan at least this often even if the root mtime looks unchanged
+                 (covers filesystems with coarse mtime resolution)
+        """
+        self.log_paths = log_paths
+        self.log_name = log_name
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._cache = {}  # server_name -> (root mtime_ns, scanned_at, [SessionInfo] oldest first)
+        self.stats = {'hits': 0, 'scans': 0, 'stats': 0}
+
+    def _stat_log(self, name: str, path: str) -> SessionInfo:
+        log_file = os.path.join(path, self.log_name)
+        self.stats['stats'] += 1
+        try:
+            st = os.stat(log_file)
+            return SessionInfo(name, path, log_file, st.st_size, st.st_mtime)
+        except OSError:
+            return SessionInfo(name, path, log_file, None, None)
+
+    def _scan(self, server_name: str, root: str, previous: List[SessionInfo]) -> List[SessionInfo]:
+        known = {info.name: info for info in previous[:-1]}  # the old newest session may have grown
+        sessions = []
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.name.startswith('20') and entry.is_dir():
+                    info = known.get(entry.name) or self._stat_log(entry.name, entry.path)
+                    sessions.append(info)
+        sessions.sort(key=lambda info: info.name)  # names are timestamps
+        self.stats['scans'] += 1
+        return sessions
+
+    def sessions(self, server_name: str) -> List[SessionInfo]:
+        """Every session directory of a server, oldest first ([] if the log root is missing; shared - don't modify)"""
+        root = self.log_paths.get(server_name)
+        if not root:
+            return []
+
+        try:
+            root_mtime = os.stat(root).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._cache.pop(server_name, None)
+            return []
+
+        with self._lock:
+            cached = self._cache.get(server_name)
+            now = time.time()
+            if cached and cached[0] == root_mtime and now - cached[1] < self.max_age:
+                self.stats['hits'] += 1
+                return cached[2]
+
+            try:
+                sessions = self._scan(server_name, root, cached[2] if cached else [])
+            except OSError:
+                return []
+            self._cache[server_name] = (root_mtime, now, sessions)
+            return sessions
+
+    def refresh(self, server_name: str = None):
+        """Forget cached listings (all servers by default) so the next lookup rescans"""
+        with self._lock:
+            if server_name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(server_name, None)
+
+    def latest(self, server_name: str) -> Optional[SessionInfo]:
+        sessions = self.sessions(server_name)
+        return sessions[-1] if sessions else None
+
+    def latest_dir(self, server_name: str) -> Optional[str]:
+        """Most recent dated session directory"""
+        info = self.latest(server_name)
+        return info.path if info else None
+
+    def recent_dirs(self, server_name: str, max_sessions: int = None) -> List[str]:
+        """Session directories, most recent first"""
+        sessions = self.sessions(server_name)
+        if max_sessions is not None:
+            sessions = sessions[-max_sessions:] if max_sessions > 0 else []
+        return [info.path for info in reversed(sessions)]
+
+    def closed_sessions(self, server_name: str) -> List[SessionInfo]:
+        """Every session except the newest (which is still being written) that has a log file"""
+        return [info for info in self.sessions(server_name)[:-1] if info.log_size is not None]
+
+
+_shared: Dict[Tuple[int, str], Tuple[Dict, SessionManifest]] = {}
+_shared_lock = threading.Lock()
+
+
+def get_manifest(log_paths: Dict[str, str], log_name: str = "console.log") -> SessionManifest:
+    """The process-wide manifest for a LOG_PATHS dict, so every module shares one cache"""
+    key = (id(log_paths), log_name)
+    with _shared_lock:
+        entry = _shared.get(key)
+        if entry is None or entry[0] is not log_paths:
+            entry = _shared[key] = (log_paths, SessionManifest(log_paths, log_name))
+        return entry[1]
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, '/srv/armareforger/player_database')
+    from auto_monitor import LOG_PATHS
+
+    manifest = get_manifest(LOG_PATHS)
+    for server_name in LOG_PATHS:
+        started = time.perf_counter()
+        sessions = manifest.sessions(server_name)
+        cold = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        manifest.sessions(server_name)
+        warm = (time.perf_counter() - started) * 1000
+        latest = sessions[-1].name if sessions else None
+        print(f"📁 {server_name}: {len(sessions)} sessions, latest {latest} (cold {cold:.2f} ms, cached {warm:.3f} ms)")
+    print(f"📊 {manifest.stats}")
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Per-Session Summary Sidecars
+Once a session directory is no longer the newest one its console.log is frozen,
+so it is summarized once into a small JSON file next to it (players seen with
+names/BE GUID/identity/IPs, connect and disconnect times, peak concurrency,
+crash markers, error counts). Historical commands read the sidecars and only
+parse the live session's log.
+
+Usage: python3 log_summary.py   (writes missing sidecars for every closed session)
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from log_classifier import LogClock, classify_line
+from log_events import (LogEvent, PlayerConnected, PlayerGuid, PlayerDisconnected, PlayerJoined,
+                        PlayerAuthenticated, CrashMarker)
+from log_manifest import SessionInfo, get_manifest
+from log_tailer import FileCursor
+
+SUMMARY_NAME = "session_summary.json"
+SUMMARY_VERSION = 1
+MAX_CRASH_MARKERS = 20
+
+
+class SessionSummarizer:
+    """
+    Incremental summary of one session's console.log: feed lines as they are read,
+    ask for the summary at any point (players still connected count up to the last line)
+    """
+
+    def __init__(self, session_name: str = None):
+        self.session_name = session_name
+        self.players = []       # player records, in order of first connect
+        self.by_name = {}       # lower name -> record
+        self.by_beguid = {}     # BE GUID -> record
+        self.by_guid = {}       # platform GUID -> record
+        self.open_by_be = {}    # BE player number -> (record, connection)
+        self.crashes = []
+        self.errors = 0
+        self.line_count = 0
+        self.peak = 0
+        self.clock = LogClock()
+        self.first_time = self.last_time = None
+
+    def _record_for(self, name):
+        record = self.by_name.get(name.lower())
+        if record is None:
+            record = {'names': [name], 'beguid': None, 'identity': None, 'guid': None,
+                      'ips': [], 'connections': []}
+            self.players.append(record)
+            self.by_name[name.lower()] = record
+        return record
+
+    def _add_name(self, record, name):
+        if name not in record['names']:
+            record['names'].append(name)
+        self.by_name.setdefault(name.lower(), record)
+
+    def _merge(self, into, record):
+        """Same BE GUID seen under two names in one session"""
+        for name in record['names']:
+            self._add_name(into, name)
+            self.by_name[name.lower()] = into
+        for ip in record['ips']:
+            if ip not in into['ips']:
+                into['ips'].append(ip)
+        into['connections'].extend(record['connections'])
+        for key in ('identity', 'guid'):
+            into[key] = into[key] or record[key]
+        for num, (owner, conn) in list(self.open_by_be.items()):
+            if owner is record:
+                self.open_by_be[num] = (into, conn)
+        self.players.remove(record)
+
+    @staticmethod
+    def _close(conn, elapsed, log_time):
+        conn[1] = log_time
+        if elapsed is not None and conn[3] is not None:
+            conn[2] = elapsed - conn[3]
+
+    def feed(self, lines: Iterable[str]):
+        for line in lines:
+            self.feed_line(line)
+
+    def feed_line(self, line: str) -> Optional[LogEvent]:
+        """Add one line; returns its classified event (None for other lines)"""
+        self.line_count += 1
+        if '(E)' in line:
+            self.errors += 1
+
+        event = classify_line(line)
+        if event is None:
+            return None
+
+        cls = type(event)
+        if event.log_time:
+            self.first_time = self.first_time or event.log_time
+            self.last_time = event.log_time
+        elapsed = self.clock.elapsed(event.log_time)
+
+        if cls is PlayerConnected:
+            record = self._record_for(event.name)
+            if event.ip and event.ip not in record['ips']:
+                record['ips'].append(event.ip)
+            conn = [event.log_time, None, None, elapsed]  # [connected, disconnected, seconds, start]
+            record['connections'].append(conn)
+            self.open_by_be[event.player_id] = (record, conn)
+            self.peak = max(self.peak, len(self.open_by_be))
+
+        elif cls is PlayerGuid:
+            owner = self.open_by_be.get(event.player_id)
+            record = owner[0] if owner else self._record_for(event.name)
+            existing = self.by_beguid.get(event.beguid)
+            if existing is not None and existing is not record:
+                self._merge(existing, record)
+                record = existing
+            record['beguid'] = event.beguid
+            self.by_beguid[event.beguid] = record
+
+        elif cls is PlayerJoined:
+            record = self._record_for(event.name)
+            if event.identity:
+                record['identity'] = event.identity
+
+        elif cls is PlayerAuthenticated:
+            record = self.by_beguid.get(event.beguid) if event.beguid else None
+            if record is None:
+                record = self._record_for(event.name)
+            self._add_name(record, event.name)
+            record['guid'] = event.guid
+            self.by_guid[event.guid] = record
+            if event.ip and event.ip not in record['ips']:
+                record['ips'].append(event.ip)
+
+        elif cls is PlayerDisconnected:
+            if event.guid is None:
+                owner = self.open_by_be.pop(event.player_id, None)
+                if owner:
+                    self._close(owner[1], elapsed, event.log_time)
+            else:
+                # id-format disconnect: close the player's connection if BattlEye didn't
+                record = self.by_guid.get(event.guid)
+                for num, (owner, conn) in list(self.open_by_be.items()):
+                    if owner is record:
+                        del self.open_by_be[num]
+                        self._close(conn, elapsed, event.log_time)
+
+        elif cls is CrashMarker:
+            if len(self.crashes) < MAX_CRASH_MARKERS:
+                self.crashes.append({'time': event.log_time, 'keyword': event.keyword,
+                                     'line': event.line.strip()[:300]})
+
+        return event
+
+    def summary(self) -> Dict:
+        """Summary of everything fed so far (the summarizer itself is left unchanged)"""
+        # Still connected when the log ends (shutdown/crash/live session): count up to the last line
+        clock = self.clock
+        end = clock.days * 86400 + clock.last if clock.last is not None else None
+        still_open = {id(conn) for _, conn in self.open_by_be.values()}
+
+        players = []
+        for record in self.players:
+            connections = []
+            for original in record['connections']:
+                conn = list(original)
+                if id(original) in still_open:
+                    self._close(conn, end, None)
+                connections.append(conn[:3])
+            players.append(dict(record, names=list(record['names']), ips=list(record['ips']),
+                                connections=connections))
+
+        return {
+            'version': SUMMARY_VERSION,
+            'session': self.session_name,
+            'first_time': self.first_time,
+            'last_time': self.last_time,
+            'lines': self.line_count,
+            'errors': self.errors,
+            'crashes': list(self.crashes),
+            'peak_players': self.peak,
+            'connections': sum(len(record['connections']) for record in players),
+            'players': players,
+        }
+
+
+def summarize_lines(lines: Iterable[str], session_name: str = None) -> Dict:
+    """Summary of one session's console.log lines"""
+    summarizer = SessionSummarizer(session_name)
+    summarizer.feed(lines)
+    return summarizer.summary()
+
+
+class LiveSession:
+    """
+    The live session's console.log, read incrementally by byte offset
+    Each new line is parsed once into a running summary; besides that only the
+    lines player searches look at ('BattlEye' / 'Player joined') and the player
+    connect/join/disconnect events are kept - never the log text itself
+    """
+
+    def __init__(self, log_file: str, session_name: str = 'live'):
+        self.log_file = log_file
+        self.cursor = FileCursor(log_file)
+        self.summarizer = SessionSummarizer(session_name)
+        self._player_lines = []
+        self._player_events = []
+        self._lock = threading.Lock()
+
+    def update(self):
+        """Read and parse whatever was appended since the last call"""
+        with self._lock:
+            for chunk in self.cursor.iter_chunks():
+                for line in chunk:
+                    event = self.summarizer.feed_line(line)
+                    if 'BattlEye' in line or 'Player joined' in line:
+                        self._player_lines.append(line.strip())
+                    if isinstance(event, (PlayerConnected, PlayerJoined, PlayerDisconnected)):
+                        self._player_events.append(event)
+
+    @property
+    def line_count(self) -> int:
+        return self.summarizer.line_count
+
+    def player_lines(self) -> List[str]:
+        with self._lock:
+            return list(self._player_lines)
+
+    def player_events(self) -> List[LogEvent]:
+        """PlayerConnected / PlayerJoined / PlayerDisconnected events, in log order"""
+        with self._lock:
+            return list(self._player_events)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return self.summarizer.summary()
+
+
+def summarize_log(log_file: str, session_name: str = None) -> Dict:
+    with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
+        return summarize_lines(f, session_name)
+
+
+def summary_path(log_file: str) -> str:
+    return os.path.join(os.path.dirname(log_file), SUMMARY_NAME)
+
+
+def player_matches(record: Dict, search_lower: str) -> bool:
+    """Substring match against every name, IP, BE GUID and identity of a player record"""
+    for value in record['names'] + record['ips'] + [record['beguid'], record['identity'], record['guid']]:
+        if value and search_lower in value.lower():
+            return True
+    return False
+
+
+class SessionSummaries:
+    def __init__(self, log_paths: Dict[str, str], log_name: str = "console.log", max_cached: int = 64):
+        """max_cached: summaries kept in memory (least recently used are dropped)"""
+        self.manifest = get_manifest(log_paths, log_name)
+        self.log_paths = log_paths
+        self.max_cached = max_cached
+        self._cache = OrderedDict()  # log_file -> (log_size, summary), least recently used first
+        self._written = {}           # log_file -> log_size of its up-to-date sidecar
+        self._lock = threading.Lock()
+
+    def _load(self, info: SessionInfo) -> Optional[Dict]:
+        try:
+            with open(summary_path(info.log_file), 'r') as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if summary.get('version') != SUMMARY_VERSION or summary.get('log_size') != info.log_size:
+            return None  # written by an older version or before the log was complete
+        return summary
+
+    def _write(self, info: SessionInfo, summary: Dict) -> bool:
+        path = summary_path(info.log_file)
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(summary, f, separators=(',', ':'))
+            os.replace(tmp, path)
+            return True
+        except OSError as e:
+            print(f"⚠️ Could not write session summary {path}: {e}")
+            return False
+
+    def get(self, info: SessionInfo) -> Tuple[Dict, bool]:
+        """
+        Summary of a closed session: memory cache, then sidecar, then parse + write
+        Returns (summary, built) where built is True if the log had to be parsed
+        """
+        with self._lock:
+            cached = self._cache.get(info.log_file)
+            if cached:
+                self._cache.move_to_end(info.log_file)
+        if cached and cached[0] == info.log_size:
+            return cached[1], False
+
+        summary = self._load(info)
+        built = summary is None
+        written = not built
+        if built:
+            summary = summarize_log(info.log_file, info.name)
+            summary['log_size'] = info.log_size
+            written = self._write(info, summary)
+
+        with self._lock:
+            self._cache[info.log_file] = (info.log_size, summary)
+            self._cache.move_to_end(info.log_file)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+            if written:
+                self._written[info.log_file] = info.log_size
+        return summary, built
+
+    def closed(self, server_name: str, max_sessions: int = None) -> List[Dict]:
+        """Summaries of closed sessions, most recent first"""
+        sessions = self.manifest.closed_sessions(server_name)
+        if max_sessions is not None:
+            sessions = sessions[-max_sessions:] if max_sessions > 0 else []
+        summaries = []
+        for info in reversed(sessions):
+            try:
+                summaries.append(self.get(info)[0])
+            except OSError:
+                continue
+        return summaries
+
+    def update(self) -> int:
+        """Write sidecars for sessions that closed since the last run; returns how many were built"""
+        built = 0
+        for server_name in self.log_paths:
+            for info in self.manifest.closed_sessions(server_name):
+                if self._written.get(info.log_file) == info.log_size:
+                    continue  # sidecar already checked - don't load it back into the cache
+                try:
+                    built += self.get(info)[1]
+                except OSError as e:
+                    print(f"⚠️ Could not summarize {info.log_file}: {e}")
+        return built
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    sys.path.insert(0, '/srv/armareforger/player_database')
+    from auto_monitor import LOG_PATHS
+
+    summaries = SessionSummaries(LOG_PATHS)
+    started = time.time()
+    built = summaries.update()
+    print(f"📝 Wrote {built} session summaries ({time.time() - started:.1f}s)")
+
+    for server_name in LOG_PATHS:
+        recent = summaries.closed(server_name, max_sessions=1)
+        if recent:
+            s = recent[0]
+            print(f"   {server_name} {s['session']}: {len(s['players'])} players, peak {s['peak_players']}, "
+                  f"{len(s['crashes'])} crash markers, {s['errors']} errors")
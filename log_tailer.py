@@ -0,0 +1,438 @@
+"""
+Shared Incremental Log Tailer for Arma Reforger
+Follows each server's console.log by byte offset and rolls over to new session directories
+"""
+
+import hashlib
+import io
+import mmap
+import os
+import select
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from log_manifest import get_manifest
+
+# inotify constants (from <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0x00000800
+
+# Upper bound on how much of a file is read into memory at once
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class _Inotify:
+    """Minimal ctypes wrapper around Linux inotify (no third-party dependency)"""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # path -> watch descriptor
+
+    def watch(self, path: str, mask: int):
+        if path in self.watches:
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd >= 0:
+            self.watches[path] = wd
+
+    def unwatch(self, path: str):
+        wd = self.watches.pop(path, None)
+        if wd is not None:
+            self._libc.inotify_rm_watch(self.fd, wd)
+
+    def wait(self, timeout: float) -> bool:
+        """Block until at least one event arrives (or timeout). Drains the queue."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _hash_line(line: bytes) -> str:
+    return hashlib.sha1(line).hexdigest()
+
+
+def _line_ending_at(f, offset: int) -> Optional[bytes]:
+    """Raw bytes of the line that ends right before `offset` (None if offset is not a line end)"""
+    if offset <= 0:
+        return None
+    window = 65536
+    while True:
+        start = max(0, offset - window)
+        f.seek(start)
+        data = f.read(offset - start)
+        if len(data) != offset - start or not data.endswith(b'\n'):
+            return None
+        nl = data.rfind(b'\n', 0, len(data) - 1)
+        if nl >= 0:
+            return data[nl + 1:]
+        if start == 0:
+            return data
+        window *= 4
+
+
+def read_tail_lines(path: str, lines: int, end: int = None, errors: str = 'replace') -> List[str]:
+    """
+    Last N lines of a file
+    Same result as list(deque(open(path, encoding='utf-8', errors=errors), maxlen=lines))
+    but the file is mmapped and scanned backwards from EOF (or from byte `end`),
+    so only the tail is ever decoded - cost does not grow with file size
+    """
+    if lines <= 0:
+        return []
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if end is None or end > size:
+            end = size
+        if end <= 0:
+            return []
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # The terminator of the last line does not start a new one
+            stop = end - 1 if mm[end - 1] == 0x0A else end
+            start = 0
+            for _ in range(lines):
+                nl = mm.rfind(b'\n', 0, stop)
+                if nl < 0:
+                    start = 0
+                    break
+                start = nl + 1
+                stop = nl
+            data = mm[start:end]
+
+    # `start` always follows a \n, so decoding and newline translation here match
+    # a text-mode read of the whole file. Lone \r also ends a line in text mode,
+    # which can only add lines to the slice, never remove them.
+    text = data.decode('utf-8', errors=errors)
+    return io.StringIO(text, newline=None).readlines()[-lines:]
+
+
+def read_tail(path: str, lines: int, end: int = None, errors: str = 'replace') -> str:
+    """Last N lines of a file as one string (see read_tail_lines)"""
+    return ''.join(read_tail_lines(path, lines, end, errors))
+
+
+class FileCursor:
+    """
+    Byte-offset cursor over a single log file
+    Only complete (newline-terminated) lines are delivered; a partial last line
+    stays unread until the writer finishes it
+    """
+
+    __slots__ = ('path', 'offset', 'inode', 'last_line_hash')
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self.offset = offset
+        self.inode = None
+        self.last_line_hash = None
+
+    @classmethod
+    def restore(cls, path: str, inode: Optional[int], offset: int,
+                last_line_hash: Optional[str]) -> Optional['FileCursor']:
+        """
+        Rebuild a cursor from a saved checkpoint
+        Returns None if the file is gone, was replaced, truncated, or the line
+        before the offset no longer matches the saved hash
+        """
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if inode is not None and st.st_ino != inode:
+                    return None
+                if st.st_size < offset:
+                    return None
+                if offset > 0:
+                    line = _line_ending_at(f, offset)
+                    if line is None or _hash_line(line) != last_line_hash:
+                        return None
+        except OSError:
+            return None
+
+        cursor = cls(path, offset)
+        cursor.inode = st.st_ino
+        cursor.last_line_hash = last_line_hash
+        return cursor
+
+    def checkpoint(self) -> Dict:
+        """Everything needed to resume this cursor later (see FileCursor.restore)"""
+        return {
+            'file_path': self.path,
+            'inode': self.inode,
+            'offset': self.offset,
+            'last_line_hash': self.last_line_hash,
+        }
+
+    def seek_end(self):
+        """Position the cursor after the last complete line currently in the file"""
+        try:
+            with open(self.path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                self.inode = st.st_ino
+                size = st.st_size
+                if size == 0:
+                    self.offset = 0
+                    return
+                # Back up to the last newline so a half-written line is not skipped
+                back = min(size, 65536)
+                f.seek(size - back)
+                chunk = f.read(back)
+                nl = chunk.rfind(b'\n')
+                self.offset = size - back + nl + 1 if nl >= 0 else size - back
+                line = _line_ending_at(f, self.offset)
+                self.last_line_hash = _hash_line(line) if line is not None else None
+        except FileNotFoundError:
+            self.offset = 0
+
+    def read_lines(self, max_bytes: int = CHUNK_SIZE) -> List[str]:
+        """Return new complete lines since the last call (at most ~max_bytes worth)"""
+        try:
+            with open(self.path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if self.inode is not None and st.st_ino != self.inode:
+                    # File was replaced under the same name - start over
+                    self.offset = 0
+                self.inode = st.st_ino
+                if st.st_size < self.offset:
+                    # File was truncated
+                    self.offset = 0
+                available = st.st_size - self.offset
+                if available <= 0:
+                    return []
+                f.seek(self.offset)
+                data = f.read(min(available, max_bytes))
+                end = data.rfind(b'\n')
+                while end < 0 and len(data) < available:
+                    # A single line longer than max_bytes - keep reading until it ends
+                    more = f.read(min(available - len(data), max_bytes))
+                    if not more:
+                        break
+                    data += more
+                    end = data.rfind(b'\n')
+        except FileNotFoundError:
+            return []
+
+        if end < 0:
+            return []
+        self.offset += end + 1
+        self.last_line_hash = _hash_line(data[data.rfind(b'\n', 0, end) + 1:end + 1])
+        text = data[:end + 1].decode('utf-8', errors='replace')
+        # Same newline handling as open(..., 'r'): \r and \r\n become \n
+        return io.StringIO(text, newline=None).readlines()
+
+    def iter_chunks(self) -> Iterator[List[str]]:
+        """
+        Yield new complete lines chunk by chunk up to the current end of file
+        The cursor offset points at the end of a chunk once it has been yielded,
+        so checkpoints taken between chunks never skip lines
+        """
+        while True:
+            lines = self.read_lines()
+            if not lines:
+                return
+            yield lines
+
+    def iter_lines(self) -> Iterator[str]:
+        """Yield every new complete line up to the current end of file"""
+        for lines in self.iter_chunks():
+            yield from lines
+
+
+class LogTailer:
+    """
+    Follows the newest console.log of every server in LOG_PATHS
+
+    - keeps one byte-offset cursor per server
+    - notices when get_latest_log_dir flips to a new dated session directory,
+      drains what is left of the old file and continues from byte 0 of the new one
+    - uses inotify when available and falls back to stat polling
+    """
+
+    def __init__(self, log_paths: Dict[str, str], log_name: str = "console.log",
+                 start_at_end: bool = True, use_inotify: bool = True,
+                 on_rollover: Callable[[str, str, str], None] = None):
+        self.log_paths = log_paths
+        self.log_name = log_name
+        self.start_at_end = start_at_end
+        self.on_rollover = on_rollover
+        self.cursors: Dict[str, FileCursor] = {}
+        self.manifest = get_manifest(log_paths, log_name)
+
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify else "polling"
+
+    def get_latest_log_dir(self, server_name: str) -> Optional[str]:
+        """Get the most recent dated session directory for a server"""
+        return self.manifest.latest_dir(server_name)
+
+    def _watch(self, server_name: str, log_file: str = None):
+        if not self._inotify:
+            return
+        root = self.log_paths.get(server_name)
+        if root and os.path.isdir(root):
+            self._inotify.watch(root, IN_CREATE | IN_MOVED_TO)
+        if log_file:
+            log_dir = os.path.dirname(log_file)
+            if os.path.isdir(log_dir):
+                self._inotify.watch(log_dir, IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE)
+
+    def _unwatch_file(self, log_file: str):
+        if self._inotify:
+            self._inotify.unwatch(os.path.dirname(log_file))
+
+    def restore(self, server_name: str, checkpoint: Dict) -> bool:
+        """
+        Resume a server from a saved checkpoint instead of the start/end of its log
+        If the checkpointed session is no longer the newest one, its remainder is
+        drained before rolling over. Returns False if the checkpoint is stale.
+        """
+        cursor = FileCursor.restore(checkpoint['file_path'], checkpoint.get('inode'),
+                                    checkpoint['offset'], checkpoint.get('last_line_hash'))
+        if cursor is None:
+            return False
+        self.cursors[server_name] = cursor
+        self._watch(server_name, cursor.path)
+        return True
+
+    def checkpoint(self, server_name: str) -> Optional[Dict]:
+        """Current position of a server's cursor (None if it has not started yet)"""
+        cursor = self.cursors.get(server_name)
+        return cursor.checkpoint() if cursor else None
+
+    def start(self, server_name: str) -> Optional[FileCursor]:
+        """
+        Create the server's cursor (at the start or end of its newest log) without reading
+        Returns the existing cursor if the server is already being followed
+        """
+        cursor = self.cursors.get(server_name)
+        if cursor is not None:
+            return cursor
+
+        log_dir = self.get_latest_log_dir(server_name)
+        if not log_dir:
+            return None
+        log_file = os.path.join(log_dir, self.log_name)
+
+        cursor = FileCursor(log_file)
+        if self.start_at_end:
+            cursor.seek_end()
+        self.cursors[server_name] = cursor
+        self._watch(server_name, log_file)
+        return cursor
+
+    def iter_new_chunks(self, server_name: str) -> Iterator[List[str]]:
+        """
+        Yield new complete lines for one server, one chunk (list of lines) at a time
+        On session rollover the old file is drained first, then on_rollover fires,
+        then lines from the new session follow
+        """
+        log_dir = self.get_latest_log_dir(server_name)
+        if not log_dir:
+            return
+        log_file = os.path.join(log_dir, self.log_name)
+
+        cursor = self.start(server_name)
+        if cursor.path != log_file:
+            # New session directory - finish the previous file before switching
+            yield from cursor.iter_chunks()
+            old_path = cursor.path
+            self._unwatch_file(old_path)
+            cursor = FileCursor(log_file)
+            self.cursors[server_name] = cursor
+            self._watch(server_name, log_file)
+            if self.on_rollover:
+                self.on_rollover(server_name, old_path, log_file)
+
+        yield from cursor.iter_chunks()
+
+    def iter_new_lines(self, server_name: str) -> Iterator[str]:
+        """Yield new complete lines for one server (see iter_new_chunks)"""
+        for lines in self.iter_new_chunks(server_name):
+            yield from lines
+
+    def poll(self) -> Dict[str, List[str]]:
+        """Collect new lines for every server: {server_name: [lines]}"""
+        new_lines = {}
+        for server_name in self.log_paths:
+            lines = list(self.iter_new_lines(server_name))
+            if lines:
+                new_lines[server_name] = lines
+        return new_lines
+
+    def wait(self, timeout: float = 2.0):
+        """Sleep until something changes on disk (inotify) or the poll interval passes"""
+        if self._inotify and self._inotify.watches:
+            self._inotify.wait(timeout)
+        else:
+            time.sleep(timeout)
+
+    def follow(self, interval: float = 2.0) -> Iterator[Tuple[str, str]]:
+        """Yield (server_name, line) forever"""
+        while True:
+            for server_name, lines in self.poll().items():
+                for line in lines:
+                    yield server_name, line
+            self.wait(interval)
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("🧪 Testing log tailer...")
+    with tempfile.TemporaryDirectory() as root:
+        session1 = os.path.join(root, "2025-01-01_10-00-00")
+        os.makedirs(session1)
+        log1 = os.path.join(session1, "console.log")
+        with open(log1, 'w') as f:
+            f.write("old line\n")
+
+        tailer = LogTailer({"TTT1": root})
+        print(f"Mode: {tailer.mode}")
+        print(f"Initial poll (should be empty): {tailer.poll()}")
+
+        with open(log1, 'a') as f:
+            f.write("line one\npartial")
+        print(f"After append: {tailer.poll()}")
+
+        with open(log1, 'a') as f:
+            f.write(" done\n")
+        session2 = os.path.join(root, "2025-01-02_10-00-00")
+        os.makedirs(session2)
+        with open(os.path.join(session2, "console.log"), 'w') as f:
+            f.write("new session\n")
+        print(f"After rollover: {tailer.poll()}")
+        tailer.close()
+
+    print("\n✅ Log tailer working!")
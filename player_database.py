@@ -5,30 +5,253 @@ Tracks player names, IPs, GUIDs, and detects changes
 
 import sqlite3
 import json
-from datetime import datetime
+import gzip
+import ipaddress
+import os
+import time
+from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Tuple
 from pathlib import Path
 import threading
+from collections import Counter
+import queue
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Alt clusters: link weight per identifier two GUIDs share, and how many GUIDs may share
+# one identifier before it is treated as generic (CGNAT/shared IP, "Player") and links nothing
+ALT_LINK_WEIGHTS = {'beguid': 3.0, 'ip': 2.0, 'name': 1.0}
+ALT_MAX_SHARED = 25
+
+# player_summary keeps this many of a player's most recent names/IPs and alerts
+SUMMARY_RECENT = 10
+SUMMARY_ALERTS = 5
+
+_V4_MAPPED = bytes(10) + b'\xff\xff'
+
+def pack_ip(ip: Optional[str]) -> Optional[bytes]:
+    """
+    16-byte sortable form of an IPv4/IPv6 address (IPv4 as ::ffff:a.b.c.d, so both
+    families share one index and a subnet is one contiguous range); None if not an IP
+    """
+    if not ip:
+        return None
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    return _V4_MAPPED + address.packed if address.version == 4 else address.packed
+
+def subnet_range(cidr: str) -> Tuple[bytes, bytes]:
+    """(lowest, highest) packed address of a CIDR block, e.g. '203.0.113.0/24'; ValueError if invalid"""
+    network = ipaddress.ip_network(cidr.strip(), strict=False)
+    low, high = network.network_address.packed, network.broadcast_address.packed
+    if network.version == 4:
+        return _V4_MAPPED + low, _V4_MAPPED + high
+    return low, high
+
+class PlayerCache:
+    """
+    Bounded LRU of (current_name, current_ip, beguid) by GUID
+    Lets update_player diff an event against the player's row without a SELECT
+    """
+    
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, guid: str) -> Optional[Tuple]:
+        with self._lock:
+            row = self._rows.get(guid)
+            if row is None:
+                self.misses += 1
+                return None
+            self._rows.move_to_end(guid)
+            self.hits += 1
+            return row
+    
+    def put(self, guid: str, name: str, ip: Optional[str], beguid: Optional[str]):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._rows[guid] = (name, ip, beguid)
+            self._rows.move_to_end(guid)
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, guid: str = None):
+        """Drop one GUID, or everything"""
+        with self._lock:
+            if guid is None:
+                self.invalidations += len(self._rows)
+                self._rows.clear()
+            elif self._rows.pop(guid, None) is not None:
+                self.invalidations += 1
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._rows),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
 
 class PlayerDatabase:
-    def __init__(self, db_path: str = "players.db"):
-        """Initialize the player database with connection pooling"""
+    def __init__(self, db_path: str = "players.db", synchronous: str = "NORMAL",
+                 cache_size: int = -32000, mmap_size: int = 268435456,
+                 busy_timeout: int = 10000, read_pool_size: int = 4,
+                 player_cache_size: int = 10000, alt_min_weight: float = 2.0,
+                 alt_max_age_days: int = None):
+        """
+        Initialize the player database with connection pooling
+        The database runs in WAL mode so readers never wait for the writer.
+        synchronous: NORMAL is safe with WAL (only the last commit can be lost on power failure)
+        cache_size: pages, or KiB if negative (SQLite PRAGMA semantics)
+        mmap_size: bytes of the file to memory-map for reads
+        busy_timeout: ms to wait for another process's write lock before "database is locked"
+        read_pool_size: read-only connections shared by the heavy read queries
+        player_cache_size: players whose current name/IP/BE GUID are kept in memory (0 = off)
+        alt_min_weight: link weight (see ALT_LINK_WEIGHTS) at which two GUIDs join one alt cluster
+        alt_max_age_days: links with no shared use newer than this don't cluster (applied by
+                          rebuild_alt_clusters; None = no limit)
+        """
         self.db_path = db_path
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self.read_pool_size = read_pool_size
         self.local = threading.local()
+        self._read_pool = queue.LifoQueue()
+        self._read_conns = 0
+        self._read_lock = threading.Lock()
+        self._thread_conns = {}  # thread id -> connections it is using (for interrupt())
+        self.player_cache = PlayerCache(player_cache_size)
+        self.alt_min_weight = alt_min_weight
+        self.alt_max_age_days = alt_max_age_days
         self._init_database()
     
+    def _configure(self, conn):
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout)}')
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        conn.execute(f'PRAGMA cache_size = {int(self.cache_size)}')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        return conn
+    
     def _get_connection(self):
         """Thread-safe database connection"""
         if not hasattr(self.local, 'conn'):
-            self.local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.local.conn.row_factory = sqlite3.Row
+            self.local.conn = self._configure(sqlite3.connect(
+                self.db_path, timeout=self.busy_timeout / 1000, check_same_thread=False))
+            self._thread_conns.setdefault(threading.get_ident(), []).append(self.local.conn)
         return self.local.conn
     
+    def _open_reader(self):
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        conn = self._configure(sqlite3.connect(uri, uri=True, timeout=self.busy_timeout / 1000,
+                                               check_same_thread=False))
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+    
+    @contextmanager
+    def _reader(self):
+        """
+        Borrow a read-only connection from the pool
+        In WAL mode it reads the last committed snapshot and never waits for the ingest writer
+        """
+        if self.db_path == ':memory:':
+            yield self._get_connection()  # nothing to share - read through the writer
+            return
+        
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            with self._read_lock:
+                create = self._read_conns < self.read_pool_size
+                if create:
+                    self._read_conns += 1
+            conn = self._open_reader() if create else self._read_pool.get()
+        in_use = self._thread_conns.setdefault(threading.get_ident(), [])
+        in_use.append(conn)
+        try:
+            yield conn
+        finally:
+            in_use.remove(conn)
+            if conn.in_transaction:
+                conn.rollback()
+            self._read_pool.put(conn)
+    
+    def interrupt(self, thread_id: int):
+        """
+        Abort the query running on another thread's connections
+        It fails there with sqlite3.OperationalError('interrupted'); idle connections are unaffected
+        """
+        for conn in list(self._thread_conns.get(thread_id, ())):
+            conn.interrupt()
+    
+    def _sync_player_cache(self, conn):
+        """
+        Drop the player cache if anyone else (another process or connection) committed
+        since this connection last looked - PRAGMA data_version doesn't read any table
+        """
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if getattr(self.local, 'data_version', None) != version:
+            self.player_cache.invalidate()
+            self.local.data_version = version
+    
+    def _in_batch(self) -> bool:
+        return getattr(self.local, 'in_batch', False)
+    
+    def _commit(self, conn):
+        """Commit now, unless inside batch() - then the batch commits once at the end"""
+        if not self._in_batch():
+            conn.commit()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group many writes into one transaction (one commit/fsync for the lot)
+        A failing update_player inside the batch only rolls back its own savepoint
+        """
+        conn = self._get_connection()
+        if self._in_batch():
+            yield
+            return
+        
+        # IMMEDIATE takes the write lock up front (waiting up to busy_timeout), so a batch
+        # that reads first can't fail later when another process committed in between
+        conn.execute('BEGIN IMMEDIATE')
+        self.local.in_batch = True
+        try:
+            yield
+            conn.commit()
+        except:
+            conn.rollback()
+            self.player_cache.invalidate()  # rows written through during the batch never landed
+            raise
+        finally:
+            self.local.in_batch = False
+    
     def _init_database(self):
         """Create all necessary tables with indexes"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
+        # WAL is persistent in the file: readers and the writer no longer block each other
+        cursor.execute('PRAGMA journal_mode = WAL')
+        
         # Main players table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS players (
@@ -74,11 +297,20 @@ class PlayerDatabase:
                 first_used TIMESTAMP NOT NULL,
                 last_used TIMESTAMP NOT NULL,
                 use_count INTEGER DEFAULT 1,
+                ip_packed BLOB,
                 FOREIGN KEY (guid) REFERENCES players(guid),
                 UNIQUE(guid, ip_address)
             )
         ''')
         
+        # Databases from before ip_packed: add the column and fill it in
+        cursor.execute('PRAGMA table_info(player_ips)')
+        if 'ip_packed' not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE player_ips ADD COLUMN ip_packed BLOB')
+            cursor.execute('SELECT id, ip_address FROM player_ips')
+            cursor.executemany('UPDATE player_ips SET ip_packed = ? WHERE id = ?',
+                               [(pack_ip(ip), row_id) for row_id, ip in cursor.fetchall()])
+        
         # BEGUID changes tracking
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS beguid_changes (
@@ -120,6 +352,72 @@ class PlayerDatabase:
             )
         ''')
         
+        # Play sessions: opened on connect, closed on disconnect / server restart
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guid TEXT NOT NULL,
+                server_name TEXT,
+                started_at TIMESTAMP NOT NULL,
+                ended_at TIMESTAMP,
+                duration_seconds INTEGER,
+                end_reason TEXT,
+                FOREIGN KEY (guid) REFERENCES players(guid)
+            )
+        ''')
+        # Sessions key servers in upper case (see _session_server); fold rows written before that,
+        # once - user_version records the migrations already applied
+        cursor.execute('PRAGMA user_version')
+        if cursor.fetchone()[0] < 1:
+            cursor.execute('UPDATE sessions SET server_name = UPPER(server_name) WHERE server_name != UPPER(server_name)')
+            cursor.execute('PRAGMA user_version = 1')
+        
+        # Alt detection: one row per identifier two GUIDs share (guid_a < guid_b)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'alt_links'")
+        build_alt_clusters = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alt_evidence (
+                guid_a TEXT NOT NULL,
+                guid_b TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                seen_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (guid_a, guid_b, kind, value)
+            )
+        ''')
+        
+        # Evidence summed per pair of GUIDs
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alt_links (
+                guid_a TEXT NOT NULL,
+                guid_b TEXT NOT NULL,
+                weight REAL NOT NULL,
+                shared INTEGER NOT NULL,
+                last_seen TIMESTAMP NOT NULL,
+                PRIMARY KEY (guid_a, guid_b)
+            )
+        ''')
+        
+        # Persisted union-find: every clustered GUID points straight at its cluster id
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alt_clusters (
+                guid TEXT PRIMARY KEY,
+                cluster_id TEXT NOT NULL
+            )
+        ''')
+        
+        # Log ingestion checkpoints (resume tailing after a restart)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+                stream TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                inode INTEGER,
+                offset INTEGER NOT NULL,
+                last_line_hash TEXT,
+                updated_at TIMESTAMP NOT NULL
+            )
+        ''')
+        
         # Create indexes for faster lookups
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_players_name ON players(current_name)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_players_ip ON players(current_ip)')
@@ -128,34 +426,336 @@ class PlayerDatabase:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_names_name ON player_names(name)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_ips_guid ON player_ips(guid)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_ips_ip ON player_ips(ip_address)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_guid ON player_alerts(guid)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_unack ON player_alerts(acknowledged)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ips_packed ON player_ips(ip_packed)')
+        # A player's alerts newest first (history, and the player_summary triggers on every new alert)
+        cursor.execute('DROP INDEX IF EXISTS idx_alerts_guid')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_guid_created ON player_alerts(guid, created_at)')
+        # Serves both the unacknowledged filter and the newest-first keyset pages of /db-alerts
+        cursor.execute('DROP INDEX IF EXISTS idx_alerts_unack')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_unack_created ON player_alerts(acknowledged, created_at, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_timestamp ON connection_events(timestamp)')
+        # A player's history: rows for one GUID, already in the order get_player_history returns them
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_guid_timestamp ON connection_events(guid, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_beguid_changes_guid ON beguid_changes(guid, changed_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_guid ON sessions(guid, started_at)')
+        # Only the few open sessions are indexed for the connect/disconnect/restart lookups
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_open ON sessions(guid, server_name, started_at) WHERE ended_at IS NULL')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_open_server ON sessions(server_name, started_at) WHERE ended_at IS NULL')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_beguid_changes_old ON beguid_changes(old_beguid)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alt_links_b ON alt_links(guid_b)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alt_clusters_cluster ON alt_clusters(cluster_id)')
+        
+        self._init_name_search(cursor)
+        build_stats_counters = self._init_stats_counters(cursor)
+        build_player_summary = self._init_player_summary(cursor)
         
         conn.commit()
+        if build_stats_counters:
+            # Existing database: count what was recorded before the counters existed
+            self.check_stats_counters()
+        if build_player_summary:
+            # Existing database: summarize the players recorded before the table existed
+            summarized = self.rebuild_player_summary()
+            if summarized:
+                print(f"📇 Built profile summaries for {summarized} players")
+        if build_alt_clusters:
+            # Existing database: link the players recorded before clustering existed
+            stats = self.rebuild_alt_clusters()
+            if stats['clustered_players']:
+                print(f"🔗 Built {stats['clusters']} alt clusters from existing history")
         print(f"✅ Database initialized at {self.db_path}")
     
+    def _init_name_search(self, cursor):
+        """
+        Trigram full-text index over every name ever used (current names are in player_names too)
+        Triggers keep it in sync with player_names, so every write path updates it
+        Needs SQLite 3.34+ with FTS5; otherwise name searches fall back to LIKE scans
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'player_names_fts'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS player_names_fts USING fts5(
+                    name, content='player_names', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Trigram name index unavailable ({e}) - name searches will scan")
+            self.name_search = False
+            return
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS player_names_fts_insert AFTER INSERT ON player_names BEGIN
+                INSERT INTO player_names_fts (rowid, name) VALUES (new.id, new.name);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS player_names_fts_delete AFTER DELETE ON player_names BEGIN
+                INSERT INTO player_names_fts (player_names_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS player_names_fts_update AFTER UPDATE OF name ON player_names BEGIN
+                INSERT INTO player_names_fts (player_names_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                INSERT INTO player_names_fts (rowid, name) VALUES (new.id, new.name);
+            END
+        ''')
+        
+        if not exists:
+            # Existing database: index the names recorded before the index existed
+            cursor.execute("INSERT INTO player_names_fts (player_names_fts) VALUES ('rebuild')")
+        self.name_search = True
+    
+    def _init_stats_counters(self, cursor) -> bool:
+        """
+        Single-row table of get_stats' counts, kept current by triggers on every write
+        Distinct VPN IPs are reference-counted in stats_vpn_ips (one row per VPN IP)
+        Returns True if the table is new and still has to be filled
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'stats_counters'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_counters (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_players INTEGER NOT NULL DEFAULT 0,
+                banned_players INTEGER NOT NULL DEFAULT 0,
+                unacknowledged_alerts INTEGER NOT NULL DEFAULT 0,
+                vpn_ips_detected INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO stats_counters (id) VALUES (1)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_vpn_ips (
+                ip_address TEXT PRIMARY KEY,
+                refs INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ips_vpn ON player_ips(ip_address) WHERE is_vpn = 1')
+        
+        # "x IS 1" is 0/1 even for NULL columns, so the deltas never turn a counter NULL.
+        # No INSERT OR IGNORE in these bodies: fired by an upsert's DO UPDATE, a trigger takes the
+        # outer statement's ABORT conflict policy, so the insert has to skip existing rows itself
+        triggers = {
+            'stats_players_insert': '''AFTER INSERT ON players BEGIN
+                UPDATE stats_counters SET total_players = total_players + 1,
+                    banned_players = banned_players + (new.is_banned IS 1) WHERE id = 1;
+            END''',
+            'stats_players_delete': '''AFTER DELETE ON players BEGIN
+                UPDATE stats_counters SET total_players = total_players - 1,
+                    banned_players = banned_players - (old.is_banned IS 1) WHERE id = 1;
+            END''',
+            'stats_players_ban': '''AFTER UPDATE OF is_banned ON players
+                WHEN (old.is_banned IS 1) != (new.is_banned IS 1) BEGIN
+                UPDATE stats_counters SET banned_players = banned_players + (new.is_banned IS 1)
+                    - (old.is_banned IS 1) WHERE id = 1;
+            END''',
+            'stats_alerts_insert': '''AFTER INSERT ON player_alerts BEGIN
+                UPDATE stats_counters SET unacknowledged_alerts = unacknowledged_alerts
+                    + (new.acknowledged IS 0) WHERE id = 1;
+            END''',
+            'stats_alerts_delete': '''AFTER DELETE ON player_alerts BEGIN
+                UPDATE stats_counters SET unacknowledged_alerts = unacknowledged_alerts
+                    - (old.acknowledged IS 0) WHERE id = 1;
+            END''',
+            'stats_alerts_ack': '''AFTER UPDATE OF acknowledged ON player_alerts
+                WHEN (old.acknowledged IS 0) != (new.acknowledged IS 0) BEGIN
+                UPDATE stats_counters SET unacknowledged_alerts = unacknowledged_alerts
+                    + (new.acknowledged IS 0) - (old.acknowledged IS 0) WHERE id = 1;
+            END''',
+            'stats_ips_insert': '''AFTER INSERT ON player_ips WHEN new.is_vpn IS 1 BEGIN
+                INSERT INTO stats_vpn_ips (ip_address, refs) SELECT new.ip_address, 0
+                    WHERE NOT EXISTS (SELECT 1 FROM stats_vpn_ips WHERE ip_address = new.ip_address);
+                UPDATE stats_vpn_ips SET refs = refs + 1 WHERE ip_address = new.ip_address;
+            END''',
+            'stats_ips_delete': '''AFTER DELETE ON player_ips WHEN old.is_vpn IS 1 BEGIN
+                UPDATE stats_vpn_ips SET refs = refs - 1 WHERE ip_address = old.ip_address;
+                DELETE FROM stats_vpn_ips WHERE ip_address = old.ip_address AND refs <= 0;
+            END''',
+            'stats_ips_update': '''AFTER UPDATE OF is_vpn, ip_address ON player_ips
+                WHEN (old.is_vpn IS 1) != (new.is_vpn IS 1) OR old.ip_address IS NOT new.ip_address BEGIN
+                UPDATE stats_vpn_ips SET refs = refs - 1 WHERE old.is_vpn IS 1 AND ip_address = old.ip_address;
+                DELETE FROM stats_vpn_ips WHERE old.is_vpn IS 1 AND ip_address = old.ip_address AND refs <= 0;
+                INSERT INTO stats_vpn_ips (ip_address, refs) SELECT new.ip_address, 0
+                    WHERE new.is_vpn IS 1
+                      AND NOT EXISTS (SELECT 1 FROM stats_vpn_ips WHERE ip_address = new.ip_address);
+                UPDATE stats_vpn_ips SET refs = refs + 1 WHERE new.is_vpn IS 1 AND ip_address = new.ip_address;
+            END''',
+            'stats_vpn_ips_insert': '''AFTER INSERT ON stats_vpn_ips BEGIN
+                UPDATE stats_counters SET vpn_ips_detected = vpn_ips_detected + 1 WHERE id = 1;
+            END''',
+            'stats_vpn_ips_delete': '''AFTER DELETE ON stats_vpn_ips BEGIN
+                UPDATE stats_counters SET vpn_ips_detected = vpn_ips_detected - 1 WHERE id = 1;
+            END''',
+        }
+        self._create_triggers(cursor, triggers)
+        
+        return not exists
+    
+    @staticmethod
+    def _summary_lists(ref: str, names: bool = False, ips: bool = False, alerts: bool = False) -> str:
+        """
+        UPDATE statements recomputing a player's recent-names/IPs/alerts JSON in player_summary
+        ref: SQL for the GUID ('new.guid' in a trigger, 'player_summary.guid' for a rebuild)
+        """
+        columns = []
+        if names:
+            columns.append(f'''recent_names = (
+                SELECT json_group_array(json_object('name', name, 'use_count', use_count,
+                                                    'last_used', last_used))
+                FROM (SELECT name, use_count, last_used FROM player_names WHERE guid = {ref}
+                      ORDER BY last_used DESC, id DESC LIMIT {SUMMARY_RECENT}))''')
+        if ips:
+            columns.append(f'''recent_ips = (
+                SELECT json_group_array(json_object('ip_address', ip_address, 'country', country,
+                                                    'is_vpn', is_vpn, 'use_count', use_count,
+                                                    'last_used', last_used))
+                FROM (SELECT ip_address, country, is_vpn, use_count, last_used FROM player_ips
+                      WHERE guid = {ref} ORDER BY last_used DESC, id DESC LIMIT {SUMMARY_RECENT}))''')
+        if alerts:
+            columns.append(f'''recent_alerts = (
+                SELECT json_group_array(json_object('alert_type', alert_type, 'alert_message', alert_message,
+                                                    'created_at', created_at))
+                FROM (SELECT alert_type, alert_message, created_at FROM player_alerts WHERE guid = {ref}
+                      ORDER BY created_at DESC, id DESC LIMIT {SUMMARY_ALERTS}))''')
+        return f"UPDATE player_summary SET {', '.join(columns)} WHERE guid = {ref};"
+    
+    def _init_player_summary(self, cursor) -> bool:
+        """
+        One row per GUID with everything a profile shows, kept current by triggers on every write:
+        name/IP/alert counts, the most recent names, IPs and alerts as JSON, and session totals.
+        Counts and totals move by deltas; the JSON lists are re-read from the guid indexes.
+        Returns True if the table is new and still has to be filled
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'player_summary'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS player_summary (
+                guid TEXT PRIMARY KEY,
+                name_count INTEGER NOT NULL DEFAULT 0,
+                ip_count INTEGER NOT NULL DEFAULT 0,
+                alert_count INTEGER NOT NULL DEFAULT 0,
+                recent_names TEXT NOT NULL DEFAULT '[]',
+                recent_ips TEXT NOT NULL DEFAULT '[]',
+                recent_alerts TEXT NOT NULL DEFAULT '[]',
+                session_count INTEGER NOT NULL DEFAULT 0,
+                session_seconds INTEGER NOT NULL DEFAULT 0,
+                last_session_at TIMESTAMP
+            )
+        ''')
+        
+        def counted(ref: str, column: str, delta: str) -> str:
+            return f'''INSERT OR IGNORE INTO player_summary (guid) VALUES ({ref}.guid);
+                UPDATE player_summary SET {column} = {column} {delta} 1 WHERE guid = {ref}.guid;'''
+        
+        triggers = {
+            'summary_names_insert': f'''AFTER INSERT ON player_names BEGIN
+                {counted('new', 'name_count', '+')}
+                {self._summary_lists('new.guid', names=True)}
+            END''',
+            'summary_names_update': f'''AFTER UPDATE OF name, use_count, last_used ON player_names BEGIN
+                {self._summary_lists('new.guid', names=True)}
+            END''',
+            'summary_names_delete': f'''AFTER DELETE ON player_names BEGIN
+                {counted('old', 'name_count', '-')}
+                {self._summary_lists('old.guid', names=True)}
+            END''',
+            'summary_ips_insert': f'''AFTER INSERT ON player_ips BEGIN
+                {counted('new', 'ip_count', '+')}
+                {self._summary_lists('new.guid', ips=True)}
+            END''',
+            'summary_ips_update': f'''AFTER UPDATE OF ip_address, country, is_vpn, use_count, last_used
+                ON player_ips BEGIN
+                {self._summary_lists('new.guid', ips=True)}
+            END''',
+            'summary_ips_delete': f'''AFTER DELETE ON player_ips BEGIN
+                {counted('old', 'ip_count', '-')}
+                {self._summary_lists('old.guid', ips=True)}
+            END''',
+            'summary_alerts_insert': f'''AFTER INSERT ON player_alerts BEGIN
+                {counted('new', 'alert_count', '+')}
+                {self._summary_lists('new.guid', alerts=True)}
+            END''',
+            'summary_alerts_delete': f'''AFTER DELETE ON player_alerts BEGIN
+                {counted('old', 'alert_count', '-')}
+                {self._summary_lists('old.guid', alerts=True)}
+            END''',
+            'summary_sessions_insert': '''AFTER INSERT ON sessions BEGIN
+                INSERT OR IGNORE INTO player_summary (guid) VALUES (new.guid);
+                UPDATE player_summary SET session_count = session_count + 1,
+                    session_seconds = session_seconds + COALESCE(new.duration_seconds, 0),
+                    last_session_at = COALESCE(MAX(last_session_at, new.started_at), new.started_at)
+                WHERE guid = new.guid;
+            END''',
+            'summary_sessions_update': '''AFTER UPDATE OF duration_seconds ON sessions BEGIN
+                UPDATE player_summary SET session_seconds = session_seconds
+                    + COALESCE(new.duration_seconds, 0) - COALESCE(old.duration_seconds, 0)
+                WHERE guid = new.guid;
+            END''',
+            'summary_sessions_delete': '''AFTER DELETE ON sessions BEGIN
+                UPDATE player_summary SET session_count = session_count - 1,
+                    session_seconds = session_seconds - COALESCE(old.duration_seconds, 0),
+                    last_session_at = (SELECT MAX(started_at) FROM sessions WHERE guid = old.guid)
+                WHERE guid = old.guid;
+            END''',
+        }
+        self._create_triggers(cursor, triggers)
+        
+        return not exists
+    
+    @staticmethod
+    def _create_triggers(cursor, triggers: Dict[str, str]):
+        """Create each trigger, replacing any existing one whose body has since changed"""
+        for name, body in triggers.items():
+            sql = f'CREATE TRIGGER {name} {body}'
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,))
+            row = cursor.fetchone()
+            if row and row[0] == sql:
+                continue
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(sql)
+    
+    def _name_match(self, name: str) -> Optional[str]:
+        """FTS5 query for a substring search, or None when it has to be a LIKE scan"""
+        # Trigrams need at least 3 characters to match anything
+        if not self.name_search or len(name) < 3:
+            return None
+        return '"' + name.replace('"', '""') + '"'
+    
     def update_player(self, guid: str, name: str, ip: str = None, 
                      beguid: str = None, server_name: str = None,
-                     geo_data: Dict = None) -> List[str]:
+                     geo_data: Dict = None, connected_at: str = None,
+                     open_session: bool = True) -> List[str]:
         """
         Update or create player record and track all changes
+        connected_at: ISO time of the connect (from the log); defaults to now
+        open_session: False for players found by a search rather than a connect line -
+                      they are recorded, but no play session is opened (or reconnected)
         Returns list of alerts generated
         """
         conn = self._get_connection()
         cursor = conn.cursor()
         now = datetime.now().isoformat()
+        connected_at = connected_at or now
         alerts = []
+        in_batch = self._in_batch()
         
         try:
-            # Check if player exists
-            cursor.execute('SELECT * FROM players WHERE guid = ?', (guid,))
-            existing = cursor.fetchone()
+            if in_batch:
+                cursor.execute('SAVEPOINT update_player')
+            
+            # Check if player exists (regulars are usually answered by the cache)
+            self._sync_player_cache(conn)
+            existing = self.player_cache.get(guid)
+            if existing is None:
+                cursor.execute('SELECT current_name, current_ip, beguid FROM players WHERE guid = ?', (guid,))
+                row = cursor.fetchone()
+                existing = tuple(row) if row else None
             
             if existing:
                 # Player exists - check for changes
-                old_name = existing['current_name']
-                old_ip = existing['current_ip']
-                old_beguid = existing['beguid']
+                old_name, old_ip, old_beguid = existing
                 
                 # Name change detection
                 if name != old_name:
@@ -188,7 +788,7 @@ class PlayerDatabase:
                         last_seen = ?, total_connections = total_connections + 1
                     WHERE guid = ?
                 ''', (name, ip, beguid or old_beguid, now, guid))
-                
+            
             else:
                 # New player
                 cursor.execute('''
@@ -212,16 +812,12 @@ class PlayerDatabase:
             
             # Update IP history with geolocation data
             if ip:
-                geo_json = json.dumps(geo_data) if geo_data else None
-                is_vpn = geo_data.get('security', {}).get('is_vpn', False) if geo_data else False
-                is_proxy = geo_data.get('security', {}).get('is_proxy', False) if geo_data else False
-                country = geo_data.get('country_name', '') if geo_data else ''
-                isp = geo_data.get('isp', '') if geo_data else ''
+                country, isp, is_vpn, is_proxy, geo_json = self._geo_fields(geo_data)
                 
                 cursor.execute('''
                     INSERT INTO player_ips (guid, ip_address, country, isp, is_vpn, is_proxy,
-                                          geo_data, first_used, last_used)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                          geo_data, first_used, last_used, ip_packed)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(guid, ip_address) DO UPDATE SET
                         last_used = ?,
                         use_count = use_count + 1,
@@ -230,7 +826,7 @@ class PlayerDatabase:
                         is_vpn = ?,
                         is_proxy = ?,
                         geo_data = ?
-                ''', (guid, ip, country, isp, is_vpn, is_proxy, geo_json, now, now,
+                ''', (guid, ip, country, isp, is_vpn, is_proxy, geo_json, now, now, pack_ip(ip),
                       now, country, isp, is_vpn, is_proxy, geo_json))
                 
                 # VPN detection alert
@@ -245,16 +841,426 @@ class PlayerDatabase:
                 INSERT INTO connection_events (guid, event_type, server_name, timestamp, 
                                               name_used, ip_used)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (guid, 'connect', server_name, now, name, ip))
+            ''', (guid, 'connect', server_name, connected_at, name, ip))
             
-            conn.commit()
-            return alerts
+            # Link to other GUIDs through any identifier this one just started using
+            self._record_alt_evidence(cursor, self._alt_candidates(guid, name, ip, beguid, existing, connected_at))
             
+            # Open a play session; an earlier one still open on this server lost its disconnect line
+            if open_session:
+                session_server = self._session_server(server_name)
+                cursor.execute('''
+                    SELECT id, guid, server_name, started_at FROM sessions
+                    WHERE guid = ? AND server_name IS ? AND ended_at IS NULL AND started_at <= ?
+                ''', (guid, session_server, connected_at))
+                self._close_sessions(cursor, cursor.fetchall(), connected_at, 'reconnect')
+                cursor.execute('INSERT INTO sessions (guid, server_name, started_at) VALUES (?, ?, ?)',
+                               (guid, session_server, connected_at))
+            
+            if in_batch:
+                cursor.execute('RELEASE update_player')
+            else:
+                conn.commit()
+            self.player_cache.put(guid, name, ip, (beguid or existing[2]) if existing else beguid)
+            return alerts
+        
         except Exception as e:
-            conn.rollback()
+            self.player_cache.invalidate(guid)
+            if in_batch:
+                cursor.execute('ROLLBACK TO update_player')
+                cursor.execute('RELEASE update_player')
+                if isinstance(e, sqlite3.OperationalError):
+                    raise  # locked/busy - let the batch owner retry the whole batch
+            else:
+                conn.rollback()
             print(f"❌ Error updating player: {e}")
             return [f"Error: {str(e)}"]
     
+    def update_players_batch(self, events: List[Dict]) -> List[List[str]]:
+        """
+        Apply many update_player calls (dicts of its keyword arguments) in one transaction
+        Existing rows are fetched with one IN (...) query, changes are worked out in
+        memory in event order, and every table is written with executemany.
+        Returns one alert list per event - the same alerts update_player would give
+        """
+        if not events:
+            return []
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        now = datetime.now().isoformat()
+        in_batch = self._in_batch()
+        
+        try:
+            if in_batch:
+                cursor.execute('SAVEPOINT update_players_batch')
+            
+            # Current state of every GUID in the batch: cache first, then one IN (...) query
+            # per 500 misses (999 bound variables max on old SQLite)
+            self._sync_player_cache(conn)
+            state = {}
+            guids = []
+            for guid in {e['guid'] for e in events}:
+                cached = self.player_cache.get(guid)
+                if cached is None:
+                    guids.append(guid)
+                else:
+                    state[guid] = {'name': cached[0], 'ip': cached[1], 'beguid': cached[2],
+                                   'new': False, 'connections': 0}
+            for i in range(0, len(guids), 500):
+                chunk = guids[i:i + 500]
+                cursor.execute(f'''
+                    SELECT guid, current_name, current_ip, beguid FROM players
+                    WHERE guid IN ({",".join("?" * len(chunk))})
+                ''', chunk)
+                for row in cursor.fetchall():
+                    state[row['guid']] = {'name': row['current_name'], 'ip': row['current_ip'],
+                                          'beguid': row['beguid'], 'new': False, 'connections': 0}
+            
+            # Open sessions of those GUIDs: (guid, server) -> [[id or None if opened in this batch, started_at]]
+            open_sessions = {}
+            all_guids = list({e['guid'] for e in events})
+            for i in range(0, len(all_guids), 500):
+                chunk = all_guids[i:i + 500]
+                cursor.execute(f'''
+                    SELECT id, guid, server_name, started_at FROM sessions
+                    WHERE ended_at IS NULL AND guid IN ({",".join("?" * len(chunk))})
+                ''', chunk)
+                for row in cursor.fetchall():
+                    open_sessions.setdefault((row['guid'], row['server_name']), []).append(
+                        [row['id'], row['started_at']])
+            
+            all_alerts = []
+            alert_rows = []
+            beguid_rows = []
+            event_rows = []
+            name_counts = {}  # (guid, name) -> uses in this batch
+            ip_rows = {}      # (guid, ip) -> [country, isp, is_vpn, is_proxy, geo_json, uses]
+            closed_rows = []  # (ended_at, seconds, reason, id) for sessions already in the table
+            session_rows = []  # (guid, server, started_at, ended_at, seconds, reason) to insert
+            playtime = {}     # guid -> seconds closed in this batch
+            batch_users = {}  # (kind, value) -> {guid: last used} for identifiers used earlier in the batch
+            
+            for e in events:
+                guid, name = e['guid'], e['name']
+                ip, beguid = e.get('ip'), e.get('beguid')
+                geo_data = e.get('geo_data')
+                server_name = e.get('server_name')
+                connected_at = e.get('connected_at') or now
+                alerts = []
+                player = state.get(guid)
+                known = (player['name'], player['ip'], player['beguid']) if player else None
+                
+                # Linked against earlier events of the batch exactly as consecutive update_player calls would
+                self._record_alt_evidence(cursor, self._alt_candidates(guid, name, ip, beguid, known, connected_at),
+                                          batch_users)
+                batch_users.setdefault(('name', name), {})[guid] = now
+                if ip:
+                    batch_users.setdefault(('ip', ip), {})[guid] = now
+                for used_beguid in {beguid, known[2] if known else None} - {None}:
+                    batch_users.setdefault(('beguid', used_beguid), {})[guid] = now
+                
+                if player:
+                    old_name, old_ip, old_beguid = player['name'], player['ip'], player['beguid']
+                    
+                    if name != old_name:
+                        alert = f"🔄 Name change: '{old_name}' → '{name}'"
+                        alerts.append(alert)
+                        alert_rows.append((guid, 'name_change', alert, old_name, name, now))
+                    
+                    if ip and ip != old_ip:
+                        alert = f"🌐 IP change: {old_ip} → {ip}"
+                        alerts.append(alert)
+                        alert_rows.append((guid, 'ip_change', alert, old_ip, ip, now))
+                    
+                    if beguid and old_beguid and beguid != old_beguid:
+                        alert = f"🆔 BEGUID change: {old_beguid} → {beguid}"
+                        alerts.append(alert)
+                        alert_rows.append((guid, 'beguid_change', alert, old_beguid, beguid, now))
+                        beguid_rows.append((guid, old_beguid, beguid, now))
+                    
+                    player['name'], player['ip'], player['beguid'] = name, ip, beguid or old_beguid
+                    player['connections'] += 1
+                else:
+                    state[guid] = {'name': name, 'ip': ip, 'beguid': beguid, 'new': True, 'connections': 1}
+                    
+                    alert = f"✨ New player: {name} ({guid[:8]}...)"
+                    alerts.append(alert)
+                    alert_rows.append((guid, 'new_player', alert, None, name, now))
+                
+                name_counts[(guid, name)] = name_counts.get((guid, name), 0) + 1
+                
+                if ip:
+                    country, isp, is_vpn, is_proxy, geo_json = self._geo_fields(geo_data)
+                    uses = ip_rows[(guid, ip)][5] + 1 if (guid, ip) in ip_rows else 1
+                    ip_rows[(guid, ip)] = [country, isp, is_vpn, is_proxy, geo_json, uses]
+                    
+                    if is_vpn or is_proxy:
+                        vpn_type = "VPN" if is_vpn else "Proxy"
+                        alert = f"⚠️ {vpn_type} detected: {name} from {ip}"
+                        alerts.append(alert)
+                        alert_rows.append((guid, 'vpn_detected', alert, None, ip, now))
+                
+                event_rows.append((guid, 'connect', server_name, connected_at, name, ip))
+                all_alerts.append(alerts)
+                if not e.get('open_session', True):
+                    continue
+                
+                server_name = self._session_server(server_name)
+                still_open = []
+                for session_id, started_at in open_sessions.get((guid, server_name), ()):
+                    if started_at > connected_at:
+                        still_open.append([session_id, started_at])
+                        continue
+                    seconds = self._session_seconds(started_at, connected_at)
+                    if session_id is None:
+                        session_rows.append((guid, server_name, started_at, connected_at, seconds, 'reconnect'))
+                    else:
+                        closed_rows.append((connected_at, seconds, 'reconnect', session_id))
+                    event_rows.append((guid, 'disconnect', server_name, connected_at, None, None))
+                    playtime[guid] = playtime.get(guid, 0) + seconds
+                still_open.append([None, connected_at])
+                open_sessions[(guid, server_name)] = still_open
+            
+            for (guid, server_name), sessions in open_sessions.items():
+                session_rows.extend((guid, server_name, started_at, None, None, None)
+                                    for session_id, started_at in sessions if session_id is None)
+            
+            # New players start at 1 connection like update_player's INSERT; existing ones add theirs
+            cursor.executemany('''
+                INSERT INTO players (guid, beguid, current_name, current_ip,
+                                   first_seen, last_seen, total_connections, total_playtime_seconds)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guid) DO UPDATE SET
+                    current_name = excluded.current_name,
+                    current_ip = excluded.current_ip,
+                    beguid = excluded.beguid,
+                    last_seen = excluded.last_seen,
+                    total_connections = total_connections + excluded.total_connections,
+                    total_playtime_seconds = total_playtime_seconds + excluded.total_playtime_seconds
+            ''', [(guid, p['beguid'], p['name'], p['ip'], now, now, p['connections'], playtime.get(guid, 0))
+                  for guid, p in state.items() if p['new'] or p['connections']])
+            
+            cursor.executemany('''
+                INSERT INTO player_names (guid, name, first_used, last_used, use_count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(guid, name) DO UPDATE SET
+                    last_used = excluded.last_used,
+                    use_count = use_count + excluded.use_count
+            ''', [(guid, name, now, now, uses) for (guid, name), uses in name_counts.items()])
+            
+            # The last event's geolocation wins, as it would after consecutive updates
+            cursor.executemany('''
+                INSERT INTO player_ips (guid, ip_address, country, isp, is_vpn, is_proxy,
+                                      geo_data, first_used, last_used, use_count, ip_packed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guid, ip_address) DO UPDATE SET
+                    last_used = excluded.last_used,
+                    use_count = use_count + excluded.use_count,
+                    country = excluded.country,
+                    isp = excluded.isp,
+                    is_vpn = excluded.is_vpn,
+                    is_proxy = excluded.is_proxy,
+                    geo_data = excluded.geo_data
+            ''', [(guid, ip, country, isp, is_vpn, is_proxy, geo_json, now, now, uses, pack_ip(ip))
+                  for (guid, ip), (country, isp, is_vpn, is_proxy, geo_json, uses) in ip_rows.items()])
+            
+            cursor.executemany('''
+                INSERT INTO beguid_changes (guid, old_beguid, new_beguid, changed_at)
+                VALUES (?, ?, ?, ?)
+            ''', beguid_rows)
+            
+            cursor.executemany('''
+                INSERT INTO connection_events (guid, event_type, server_name, timestamp,
+                                              name_used, ip_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', event_rows)
+            
+            cursor.executemany('''
+                INSERT INTO player_alerts (guid, alert_type, alert_message,
+                                          old_value, new_value, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', alert_rows)
+            
+            cursor.executemany('''
+                UPDATE sessions SET ended_at = ?, duration_seconds = ?, end_reason = ?
+                WHERE id = ?
+            ''', closed_rows)
+            
+            cursor.executemany('''
+                INSERT INTO sessions (guid, server_name, started_at, ended_at, duration_seconds, end_reason)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', session_rows)
+            
+            if in_batch:
+                cursor.execute('RELEASE update_players_batch')
+            else:
+                conn.commit()
+            for guid, p in state.items():
+                self.player_cache.put(guid, p['name'], p['ip'], p['beguid'])
+            return all_alerts
+        
+        except Exception as e:
+            for event in events:
+                self.player_cache.invalidate(event['guid'])
+            if in_batch:
+                cursor.execute('ROLLBACK TO update_players_batch')
+                cursor.execute('RELEASE update_players_batch')
+                if isinstance(e, sqlite3.OperationalError):
+                    raise  # locked/busy - let the batch owner retry the whole batch
+            else:
+                conn.rollback()
+            print(f"❌ Error updating {len(events)} players: {e}")
+            return [[f"Error: {str(e)}"] for _ in events]
+    
+    @staticmethod
+    def _session_seconds(started_at: str, ended_at: str) -> int:
+        """Length of a session from its ISO timestamps (0 if the clock went backwards)"""
+        try:
+            seconds = (datetime.fromisoformat(ended_at) - datetime.fromisoformat(started_at)).total_seconds()
+        except (TypeError, ValueError):
+            return 0
+        return max(0, int(seconds))
+    
+    def _close_sessions(self, cursor, rows, ended_at: str, reason: str) -> int:
+        """
+        Close open session rows (id, guid, server_name, started_at) at ended_at and add
+        their length to each player's total_playtime_seconds; returns seconds closed
+        """
+        updates = []
+        events = []
+        playtime = {}
+        for row in rows:
+            seconds = self._session_seconds(row['started_at'], ended_at)
+            updates.append((ended_at, seconds, reason, row['id']))
+            events.append((row['guid'], 'disconnect', row['server_name'], ended_at))
+            playtime[row['guid']] = playtime.get(row['guid'], 0) + seconds
+        if not updates:
+            return 0
+        
+        cursor.executemany('''
+            UPDATE sessions SET ended_at = ?, duration_seconds = ?, end_reason = ?
+            WHERE id = ? AND ended_at IS NULL
+        ''', updates)
+        cursor.executemany('''
+            UPDATE players SET total_playtime_seconds = total_playtime_seconds + ?
+            WHERE guid = ?
+        ''', [(seconds, guid) for guid, seconds in playtime.items()])
+        cursor.executemany('''
+            INSERT INTO connection_events (guid, event_type, server_name, timestamp)
+            VALUES (?, ?, ?, ?)
+        ''', events)
+        return sum(playtime.values())
+    
+    @staticmethod
+    def _session_server(server_name: Optional[str]) -> Optional[str]:
+        """Server key for sessions: auto_monitor's 'TTT1' and the bot's 'ttt1' are one server"""
+        return server_name.upper() if server_name else server_name
+    
+    def close_session(self, guid: str, server_name: str = None, ended_at: str = None,
+                      reason: str = 'disconnect') -> Optional[int]:
+        """
+        Close a player's open session on a server (disconnect line)
+        Returns the session length in seconds, or None if nothing was open
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        ended_at = ended_at or datetime.now().isoformat()
+        server_name = self._session_server(server_name)
+        
+        # Sessions that started after ended_at belong to a later connect (e.g. live tailing vs a backfill)
+        cursor.execute('''
+            SELECT id, guid, server_name, started_at FROM sessions
+            WHERE guid = ? AND server_name IS ? AND ended_at IS NULL AND started_at <= ?
+        ''', (guid, server_name, ended_at))
+        rows = cursor.fetchall()
+        if not rows:
+            return None
+        
+        seconds = self._close_sessions(cursor, rows, ended_at, reason)
+        self._commit(conn)
+        return seconds
+    
+    def close_server_sessions(self, server_name: str, ended_at: str = None,
+                              reason: str = 'server_restart') -> int:
+        """
+        Close every session still open on a server (it restarted or its log rolled over)
+        ended_at should be when the old session's log stopped; sessions that started
+        later are left alone. Returns how many sessions were closed
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        ended_at = ended_at or datetime.now().isoformat()
+        server_name = self._session_server(server_name)
+        
+        cursor.execute('''
+            SELECT id, guid, server_name, started_at FROM sessions
+            WHERE server_name IS ? AND ended_at IS NULL AND started_at <= ?
+        ''', (server_name, ended_at))
+        rows = cursor.fetchall()
+        
+        self._close_sessions(cursor, rows, ended_at, reason)
+        self._commit(conn)
+        return len(rows)
+    
+    def get_open_sessions(self, server_name: str = None) -> List[Dict]:
+        """Players currently in a session (optionally on one server), longest first"""
+        server_name = self._session_server(server_name)
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            # Separate statements: "? IS NULL OR server_name = ?" can't search idx_sessions_open_server
+            if server_name is None:
+                cursor.execute('''
+                    SELECT s.guid, p.current_name, s.server_name, s.started_at
+                    FROM sessions s
+                    JOIN players p ON p.guid = s.guid
+                    WHERE s.ended_at IS NULL
+                    ORDER BY s.started_at
+                ''')
+            else:
+                cursor.execute('''
+                    SELECT s.guid, p.current_name, s.server_name, s.started_at
+                    FROM sessions s
+                    JOIN players p ON p.guid = s.guid
+                    WHERE s.ended_at IS NULL AND s.server_name = ?
+                    ORDER BY s.started_at
+                ''', (server_name,))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_playtime(self, guid: str, server_name: str = None) -> Dict:
+        """
+        Closed-session totals for a player from the sessions table (one indexed read)
+        total_playtime_seconds is the all-server rollup kept on the players row
+        """
+        server_name = self._session_server(server_name)
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT (SELECT total_playtime_seconds FROM players WHERE guid = ?) AS total_playtime_seconds,
+                       COUNT(ended_at) AS sessions,
+                       COALESCE(SUM(duration_seconds), 0) AS total_seconds,
+                       COALESCE(MAX(duration_seconds), 0) AS longest_seconds,
+                       COUNT(*) - COUNT(ended_at) AS open_sessions,
+                       MIN(started_at) AS first_session,
+                       MAX(started_at) AS last_session
+                FROM sessions
+                WHERE guid = ? AND (? IS NULL OR server_name = ?)
+            ''', (guid, guid, server_name, server_name))
+            
+            return dict(cursor.fetchone())
+    
+    @staticmethod
+    def _geo_fields(geo_data: Optional[Dict]) -> Tuple:
+        """(country, isp, is_vpn, is_proxy, geo_json) as stored in player_ips"""
+        if not geo_data:
+            return '', '', False, False, None
+        security = geo_data.get('security', {})
+        return (geo_data.get('country_name', ''), geo_data.get('isp', ''),
+                security.get('is_vpn', False), security.get('is_proxy', False), json.dumps(geo_data))
+    
     def _create_alert(self, guid: str, alert_type: str, message: str, 
                      old_value: str = None, new_value: str = None):
         """Create an alert record"""
@@ -282,11 +1288,33 @@ class PlayerDatabase:
         return dict(player)
     
     def get_player_by_name(self, name: str) -> Optional[Dict]:
-        """Get player by current name"""
+        """
+        Get player by current name (case-insensitive substring)
+        Best match first: exact name, then prefix, then FTS rank, then most recently seen
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
+        match = self._name_match(name)
         
-        cursor.execute('SELECT * FROM players WHERE current_name LIKE ?', (f'%{name}%',))
+        if match:
+            cursor.execute('''
+                SELECT p.*
+                FROM player_names_fts f
+                JOIN player_names pn ON pn.id = f.rowid
+                JOIN players p ON p.guid = pn.guid AND p.current_name = pn.name
+                WHERE player_names_fts MATCH ?
+                ORDER BY (p.current_name = ? COLLATE NOCASE) DESC,
+                         (instr(lower(p.current_name), lower(?)) = 1) DESC,
+                         f.rank, p.last_seen DESC
+                LIMIT 1
+            ''', (match, name, name))
+        else:
+            cursor.execute('''
+                SELECT * FROM players WHERE current_name LIKE ?
+                ORDER BY (current_name = ? COLLATE NOCASE) DESC,
+                         (instr(lower(current_name), lower(?)) = 1) DESC, last_seen DESC
+                LIMIT 1
+            ''', (f'%{name}%', name, name))
         player = cursor.fetchone()
         
         if not player:
@@ -296,120 +1324,598 @@ class PlayerDatabase:
     
     def get_player_history(self, guid: str) -> Dict:
         """Get complete player history including names, IPs, and alerts"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # Get all names used
-        cursor.execute('''
-            SELECT name, first_used, last_used, use_count
-            FROM player_names
-            WHERE guid = ?
-            ORDER BY last_used DESC
-        ''', (guid,))
-        names = [dict(row) for row in cursor.fetchall()]
-        
-        # Get all IPs used
-        cursor.execute('''
-            SELECT ip_address, country, isp, is_vpn, is_proxy, 
-                   first_used, last_used, use_count
-            FROM player_ips
-            WHERE guid = ?
-            ORDER BY last_used DESC
-        ''', (guid,))
-        ips = [dict(row) for row in cursor.fetchall()]
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            # Get all names used
+            cursor.execute('''
+                SELECT name, first_used, last_used, use_count
+                FROM player_names
+                WHERE guid = ?
+                ORDER BY last_used DESC
+            ''', (guid,))
+            names = [dict(row) for row in cursor.fetchall()]
+            
+            # Get all IPs used
+            cursor.execute('''
+                SELECT ip_address, country, isp, is_vpn, is_proxy, 
+                       first_used, last_used, use_count
+                FROM player_ips
+                WHERE guid = ?
+                ORDER BY last_used DESC
+            ''', (guid,))
+            ips = [dict(row) for row in cursor.fetchall()]
+            
+            # Get BEGUID changes
+            cursor.execute('''
+                SELECT old_beguid, new_beguid, changed_at
+                FROM beguid_changes
+                WHERE guid = ?
+                ORDER BY changed_at DESC
+            ''', (guid,))
+            beguid_changes = [dict(row) for row in cursor.fetchall()]
+            
+            # Get recent alerts
+            cursor.execute('''
+                SELECT alert_type, alert_message, old_value, new_value, created_at
+                FROM player_alerts
+                WHERE guid = ?
+                ORDER BY created_at DESC
+                LIMIT 20
+            ''', (guid,))
+            alerts = [dict(row) for row in cursor.fetchall()]
+            
+            # Get connection history
+            cursor.execute('''
+                SELECT event_type, server_name, timestamp, name_used, ip_used
+                FROM connection_events
+                WHERE guid = ?
+                ORDER BY timestamp DESC
+                LIMIT 50
+            ''', (guid,))
+            connections = [dict(row) for row in cursor.fetchall()]
+            
+            return {
+                'names': names,
+                'ips': ips,
+                'beguid_changes': beguid_changes,
+                'alerts': alerts,
+                'connections': connections
+            }
+    
+    def get_player_profile(self, guid: str) -> Optional[Dict]:
+        """
+        Player row plus its player_summary in one read by primary key (what a profile shows)
+        recent_names/recent_ips/recent_alerts are lists, newest first; the complete
+        lists are in get_player_history
+        """
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT p.*, s.name_count, s.ip_count, s.alert_count,
+                       s.recent_names, s.recent_ips, s.recent_alerts,
+                       s.session_count, s.session_seconds, s.last_session_at
+                FROM players p
+                LEFT JOIN player_summary s ON s.guid = p.guid
+                WHERE p.guid = ?
+            ''', (guid,))
+            player = cursor.fetchone()
         
-        # Get BEGUID changes
-        cursor.execute('''
-            SELECT old_beguid, new_beguid, changed_at
-            FROM beguid_changes
-            WHERE guid = ?
-            ORDER BY changed_at DESC
-        ''', (guid,))
-        beguid_changes = [dict(row) for row in cursor.fetchall()]
+        if not player:
+            return None
         
-        # Get recent alerts
-        cursor.execute('''
-            SELECT alert_type, alert_message, old_value, new_value, created_at
-            FROM player_alerts
-            WHERE guid = ?
-            ORDER BY created_at DESC
-            LIMIT 20
-        ''', (guid,))
-        alerts = [dict(row) for row in cursor.fetchall()]
+        profile = dict(player)
+        for key in ('recent_names', 'recent_ips', 'recent_alerts'):
+            profile[key] = json.loads(profile[key]) if profile[key] else []
+        for key in ('name_count', 'ip_count', 'alert_count', 'session_count', 'session_seconds'):
+            profile[key] = profile[key] or 0
+        return profile
+    
+    def rebuild_player_summary(self) -> int:
+        """
+        Recompute every player_summary row from the history tables
+        The triggers keep it current, so this is only needed for a database that had
+        history before the table existed (or after editing the tables by hand)
+        Returns the number of players summarized
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
         
-        # Get connection history
+        cursor.execute('DELETE FROM player_summary')
         cursor.execute('''
-            SELECT event_type, server_name, timestamp, name_used, ip_used
-            FROM connection_events
-            WHERE guid = ?
-            ORDER BY timestamp DESC
-            LIMIT 50
-        ''', (guid,))
-        connections = [dict(row) for row in cursor.fetchall()]
+            INSERT INTO player_summary (guid, name_count, ip_count, alert_count,
+                                        session_count, session_seconds, last_session_at)
+            SELECT p.guid,
+                   (SELECT COUNT(*) FROM player_names WHERE guid = p.guid),
+                   (SELECT COUNT(*) FROM player_ips WHERE guid = p.guid),
+                   (SELECT COUNT(*) FROM player_alerts WHERE guid = p.guid),
+                   (SELECT COUNT(*) FROM sessions WHERE guid = p.guid),
+                   (SELECT COALESCE(SUM(duration_seconds), 0) FROM sessions WHERE guid = p.guid),
+                   (SELECT MAX(started_at) FROM sessions WHERE guid = p.guid)
+            FROM players p
+        ''')
+        summarized = cursor.rowcount
+        cursor.execute(self._summary_lists('player_summary.guid', names=True, ips=True, alerts=True))
+        self._commit(conn)
         
-        return {
-            'names': names,
-            'ips': ips,
-            'beguid_changes': beguid_changes,
-            'alerts': alerts,
-            'connections': connections
-        }
+        return summarized
     
     def find_alts(self, ip_address: str) -> List[Dict]:
         """Find all players who have used a specific IP address"""
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT DISTINCT p.guid, p.current_name, p.first_seen, p.last_seen,
+                       pi.first_used as ip_first_used, pi.last_used as ip_last_used
+                FROM players p
+                JOIN player_ips pi ON p.guid = pi.guid
+                WHERE pi.ip_address = ?
+                ORDER BY pi.last_used DESC
+            ''', (ip_address,))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def find_alts_in_subnet(self, cidr: str, limit: int = 500) -> List[Dict]:
+        """
+        Players who have used any address in a CIDR block (IPv4 or IPv6), one row each
+        An index range scan on ip_packed; raises ValueError for an invalid CIDR
+        """
+        low, high = subnet_range(cidr)
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT p.guid, p.current_name, p.current_ip, p.first_seen, p.last_seen,
+                       COUNT(*) AS ips_in_subnet, GROUP_CONCAT(pi.ip_address, ', ') AS ips,
+                       MAX(pi.last_used) AS subnet_last_used
+                FROM player_ips pi
+                JOIN players p ON p.guid = pi.guid
+                WHERE pi.ip_packed BETWEEN ? AND ?
+                GROUP BY p.guid
+                ORDER BY subnet_last_used DESC
+                LIMIT ?
+            ''', (low, high, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def find_name_alts(self, name: str, limit: int = 500) -> List[Dict]:
+        """
+        Find all GUIDs that have used a specific name (case-insensitive substring)
+        Ranked: exact name, then prefix, then FTS rank, then most recent use
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
+        match = self._name_match(name)
         
-        cursor.execute('''
-            SELECT DISTINCT p.guid, p.current_name, p.first_seen, p.last_seen,
-                   pi.first_used as ip_first_used, pi.last_used as ip_last_used
-            FROM players p
-            JOIN player_ips pi ON p.guid = pi.guid
-            WHERE pi.ip_address = ?
-            ORDER BY pi.last_used DESC
-        ''', (ip_address,))
+        if match:
+            cursor.execute('''
+                SELECT p.guid, p.current_name, p.current_ip,
+                       pn.first_used, pn.last_used
+                FROM player_names_fts f
+                JOIN player_names pn ON pn.id = f.rowid
+                JOIN players p ON p.guid = pn.guid
+                WHERE player_names_fts MATCH ?
+                ORDER BY (pn.name = ? COLLATE NOCASE) DESC,
+                         (instr(lower(pn.name), lower(?)) = 1) DESC,
+                         f.rank, pn.last_used DESC
+                LIMIT ?
+            ''', (match, name, name, limit))
+        else:
+            cursor.execute('''
+                SELECT p.guid, p.current_name, p.current_ip, 
+                       pn.first_used, pn.last_used
+                FROM players p
+                JOIN player_names pn ON p.guid = pn.guid
+                WHERE pn.name LIKE ?
+                ORDER BY (pn.name = ? COLLATE NOCASE) DESC,
+                         (instr(lower(pn.name), lower(?)) = 1) DESC, pn.last_used DESC
+                LIMIT ?
+            ''', (f'%{name}%', name, name, limit))
         
         return [dict(row) for row in cursor.fetchall()]
     
-    def find_name_alts(self, name: str) -> List[Dict]:
-        """Find all GUIDs that have used a specific name"""
+    # ---- alt clusters ------------------------------------------------------
+    
+    @staticmethod
+    def _alt_candidates(guid: str, name: str, ip: Optional[str], beguid: Optional[str],
+                        known: Optional[Tuple], seen_at: str) -> List[Tuple]:
+        """
+        (guid, kind, value, seen_at) for identifiers that differ from the player's current ones
+        Unchanged name/IP/BE GUID can't create new links, so regulars cost nothing here
+        """
+        old_name, old_ip, old_beguid = known or (None, None, None)
+        candidates = []
+        if name != old_name:
+            candidates.append((guid, 'name', name, seen_at))
+        if ip and ip != old_ip:
+            candidates.append((guid, 'ip', ip, seen_at))
+        if beguid and beguid != old_beguid:
+            candidates.append((guid, 'beguid', beguid, seen_at))
+        return candidates
+    
+    def _guids_sharing(self, cursor, kind: str, value: str, guid: str,
+                       batch_users: Dict = None) -> Dict[str, str]:
+        """
+        Other GUIDs that used an identifier -> when they last used it (at most ALT_MAX_SHARED)
+        batch_users adds uses by earlier events of update_players_batch, not written yet
+        """
+        if kind == 'ip':
+            cursor.execute('''
+                SELECT guid, last_used FROM player_ips WHERE ip_address = ? AND guid != ? LIMIT ?
+            ''', (value, guid, ALT_MAX_SHARED))
+        elif kind == 'name':
+            cursor.execute('''
+                SELECT guid, last_used FROM player_names WHERE name = ? AND guid != ? LIMIT ?
+            ''', (value, guid, ALT_MAX_SHARED))
+        else:
+            cursor.execute('''
+                SELECT guid, last_seen FROM players WHERE beguid = ? AND guid != ?
+                UNION ALL
+                SELECT guid, changed_at FROM beguid_changes WHERE old_beguid = ? AND guid != ?
+                LIMIT ?
+            ''', (value, guid, value, guid, ALT_MAX_SHARED))
+        others = {}
+        for other, used in cursor.fetchall():
+            others[other] = max(others.get(other) or used, used)
+        if batch_users:
+            for other, used in batch_users.get((kind, value), {}).items():
+                if other != guid:
+                    others[other] = max(others.get(other) or used, used)
+        return others
+    
+    def _alt_link_counts(self, weight: float, last_seen: str) -> bool:
+        """Whether a link is strong (and recent) enough to put both GUIDs in one cluster"""
+        if weight < self.alt_min_weight:
+            return False
+        if self.alt_max_age_days is not None:
+            return last_seen >= (datetime.now() - timedelta(days=self.alt_max_age_days)).isoformat()
+        return True
+    
+    def _record_alt_evidence(self, cursor, candidates: List[Tuple], batch_users: Dict = None):
+        """
+        Link each candidate's GUID to every other GUID that used the same identifier
+        Evidence is recorded once per (pair, identifier); a link that reaches the
+        threshold unions the two clusters. Links made before an identifier became too
+        common stay until the next rebuild_alt_clusters
+        """
+        for guid, kind, value, seen_at in candidates:
+            others = self._guids_sharing(cursor, kind, value, guid, batch_users)
+            if len(others) >= ALT_MAX_SHARED:
+                continue  # too common to mean anything
+            
+            for other, used in others.items():
+                guid_a, guid_b = sorted((guid, other))
+                shared_at = min(seen_at, used) if used else seen_at
+                cursor.execute('''
+                    INSERT OR IGNORE INTO alt_evidence (guid_a, guid_b, kind, value, seen_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (guid_a, guid_b, kind, value, shared_at))
+                if cursor.rowcount != 1:
+                    continue  # already known
+                
+                cursor.execute('''
+                    INSERT INTO alt_links (guid_a, guid_b, weight, shared, last_seen)
+                    VALUES (?, ?, ?, 1, ?)
+                    ON CONFLICT(guid_a, guid_b) DO UPDATE SET
+                        weight = weight + excluded.weight,
+                        shared = shared + 1,
+                        last_seen = MAX(last_seen, excluded.last_seen)
+                ''', (guid_a, guid_b, ALT_LINK_WEIGHTS[kind], shared_at))
+                cursor.execute('SELECT weight, last_seen FROM alt_links WHERE guid_a = ? AND guid_b = ?',
+                               (guid_a, guid_b))
+                weight, last_seen = cursor.fetchone()
+                if self._alt_link_counts(weight, last_seen):
+                    self._union_alt_clusters(cursor, guid_a, guid_b)
+    
+    def _union_alt_clusters(self, cursor, guid_a: str, guid_b: str):
+        """Union by size: the smaller cluster is relabelled, so lookups never chase parents"""
+        cursor.execute('SELECT guid, cluster_id FROM alt_clusters WHERE guid IN (?, ?)', (guid_a, guid_b))
+        clusters = {row[0]: row[1] for row in cursor.fetchall()}
+        cluster_a, cluster_b = clusters.get(guid_a), clusters.get(guid_b)
+        
+        if cluster_a is None and cluster_b is None:
+            cursor.executemany('INSERT INTO alt_clusters (guid, cluster_id) VALUES (?, ?)',
+                               [(guid_a, guid_a), (guid_b, guid_a)])
+        elif cluster_a is None:
+            cursor.execute('INSERT INTO alt_clusters (guid, cluster_id) VALUES (?, ?)', (guid_a, cluster_b))
+        elif cluster_b is None:
+            cursor.execute('INSERT INTO alt_clusters (guid, cluster_id) VALUES (?, ?)', (guid_b, cluster_a))
+        elif cluster_a != cluster_b:
+            cursor.execute('''
+                SELECT cluster_id, COUNT(*) FROM alt_clusters WHERE cluster_id IN (?, ?) GROUP BY cluster_id
+            ''', (cluster_a, cluster_b))
+            sizes = dict(cursor.fetchall())
+            keep, merge = (cluster_a, cluster_b) if sizes[cluster_a] >= sizes[cluster_b] else (cluster_b, cluster_a)
+            cursor.execute('UPDATE alt_clusters SET cluster_id = ? WHERE cluster_id = ?', (keep, merge))
+    
+    def rebuild_alt_clusters(self, min_weight: float = None, max_age_days: int = None) -> Dict:
+        """
+        Recompute every alt link and cluster from the name/IP/BE GUID history
+        Needed after changing the thresholds, and now and then when alt_max_age_days is
+        set (clusters only ever merge incrementally, so aged-out links need a rebuild).
+        The result is staged in TEMP tables without the write lock; one short transaction
+        then applies only the rows that changed
+        """
+        if min_weight is not None:
+            self.alt_min_weight = min_weight
+        if max_age_days is not None:
+            self.alt_max_age_days = max_age_days
+        
         conn = self._get_connection()
         cursor = conn.cursor()
         
+        # identifier -> {guid: last used}, skipping identifiers too common to count
+        groups = {}
         cursor.execute('''
-            SELECT DISTINCT p.guid, p.current_name, p.current_ip, 
-                   pn.first_used, pn.last_used
-            FROM players p
-            JOIN player_names pn ON p.guid = pn.guid
-            WHERE pn.name LIKE ?
-            ORDER BY pn.last_used DESC
-        ''', (f'%{name}%',))
+            SELECT 'ip', ip_address, guid, last_used FROM player_ips
+            WHERE ip_address IN (SELECT ip_address FROM player_ips GROUP BY ip_address
+                                 HAVING COUNT(*) BETWEEN 2 AND ?)
+            UNION ALL
+            SELECT 'name', name, guid, last_used FROM player_names
+            WHERE name IN (SELECT name FROM player_names GROUP BY name HAVING COUNT(*) BETWEEN 2 AND ?)
+            UNION ALL
+            SELECT 'beguid', beguid, guid, last_seen FROM players WHERE beguid IS NOT NULL
+            UNION ALL
+            SELECT 'beguid', old_beguid, guid, changed_at FROM beguid_changes WHERE old_beguid IS NOT NULL
+        ''', (ALT_MAX_SHARED, ALT_MAX_SHARED))
+        for kind, value, guid, used in cursor.fetchall():
+            users = groups.setdefault((kind, value), {})
+            users[guid] = max(users.get(guid) or used, used)
         
-        return [dict(row) for row in cursor.fetchall()]
-    
-    def get_unacknowledged_alerts(self, limit: int = 50) -> List[Dict]:
-        """Get all unacknowledged alerts"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        evidence = []
+        links = {}  # (guid_a, guid_b) -> [weight, shared, last_seen]
+        for (kind, value), users in groups.items():
+            if not 2 <= len(users) <= ALT_MAX_SHARED:
+                continue
+            guids = sorted(users)
+            for i, guid_a in enumerate(guids):
+                for guid_b in guids[i + 1:]:
+                    shared_at = min(users[guid_a], users[guid_b])
+                    evidence.append((guid_a, guid_b, kind, value, shared_at))
+                    link = links.setdefault((guid_a, guid_b), [0.0, 0, shared_at])
+                    link[0] += ALT_LINK_WEIGHTS[kind]
+                    link[1] += 1
+                    link[2] = max(link[2], shared_at)
+        
+        # In-memory union-find, then written out flat
+        parent = {}
+        
+        def find(guid):
+            parent.setdefault(guid, guid)
+            while parent[guid] != guid:
+                parent[guid] = parent[parent[guid]]
+                guid = parent[guid]
+            return guid
         
+        for (guid_a, guid_b), (weight, shared, last_seen) in links.items():
+            if self._alt_link_counts(weight, last_seen):
+                root_a, root_b = find(guid_a), find(guid_b)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+        
+        # Clusters keep the id most of their members already had, so unchanged ones aren't rewritten
+        cursor.execute('SELECT guid, cluster_id FROM alt_clusters')
+        current = dict(cursor.fetchall())
+        members = {}
+        for guid in parent:
+            members.setdefault(find(guid), []).append(guid)
+        cluster_ids = {}
+        taken = set()
+        for root, guids in members.items():
+            labels = Counter(current[guid] for guid in guids if guid in current)
+            label = next((label for label, _ in labels.most_common() if label not in taken), root)
+            taken.add(label)
+            for guid in guids:
+                cluster_ids[guid] = label
+        
+        # Staging tables live in the connection's temp database: filling them takes no lock on players.db
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS alt_evidence_new (
+                guid_a TEXT NOT NULL, guid_b TEXT NOT NULL, kind TEXT NOT NULL, value TEXT NOT NULL,
+                seen_at TIMESTAMP NOT NULL, PRIMARY KEY (guid_a, guid_b, kind, value)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS alt_links_new (
+                guid_a TEXT NOT NULL, guid_b TEXT NOT NULL, weight REAL NOT NULL, shared INTEGER NOT NULL,
+                last_seen TIMESTAMP NOT NULL, PRIMARY KEY (guid_a, guid_b)
+            )
+        ''')
         cursor.execute('''
-            SELECT a.*, p.current_name, p.current_ip
-            FROM player_alerts a
-            JOIN players p ON a.guid = p.guid
-            WHERE a.acknowledged = 0
-            ORDER BY a.created_at DESC
-            LIMIT ?
-        ''', (limit,))
+            CREATE TEMP TABLE IF NOT EXISTS alt_clusters_new (guid TEXT PRIMARY KEY, cluster_id TEXT NOT NULL)
+        ''')
+        for table in ('alt_evidence_new', 'alt_links_new', 'alt_clusters_new'):
+            cursor.execute(f'DELETE FROM temp.{table}')
+        cursor.executemany('''
+            INSERT INTO temp.alt_evidence_new (guid_a, guid_b, kind, value, seen_at) VALUES (?, ?, ?, ?, ?)
+        ''', evidence)
+        cursor.executemany('''
+            INSERT INTO temp.alt_links_new (guid_a, guid_b, weight, shared, last_seen) VALUES (?, ?, ?, ?, ?)
+        ''', [(guid_a, guid_b, *link) for (guid_a, guid_b), link in links.items()])
+        cursor.executemany('INSERT INTO temp.alt_clusters_new (guid, cluster_id) VALUES (?, ?)',
+                           cluster_ids.items())
+        self._commit(conn)
         
-        return [dict(row) for row in cursor.fetchall()]
+        # The swap: delete rows that are gone or changed, insert the new/changed ones
+        with self.batch():
+            cursor.execute('''
+                DELETE FROM alt_evidence WHERE NOT EXISTS (
+                    SELECT 1 FROM temp.alt_evidence_new n
+                    WHERE n.guid_a = alt_evidence.guid_a AND n.guid_b = alt_evidence.guid_b
+                      AND n.kind = alt_evidence.kind AND n.value = alt_evidence.value
+                      AND n.seen_at = alt_evidence.seen_at)
+            ''')
+            cursor.execute('''
+                INSERT OR IGNORE INTO alt_evidence (guid_a, guid_b, kind, value, seen_at)
+                SELECT guid_a, guid_b, kind, value, seen_at FROM temp.alt_evidence_new
+            ''')
+            cursor.execute('''
+                DELETE FROM alt_links WHERE NOT EXISTS (
+                    SELECT 1 FROM temp.alt_links_new n
+                    WHERE n.guid_a = alt_links.guid_a AND n.guid_b = alt_links.guid_b
+                      AND n.weight = alt_links.weight AND n.shared = alt_links.shared
+                      AND n.last_seen = alt_links.last_seen)
+            ''')
+            cursor.execute('''
+                INSERT OR IGNORE INTO alt_links (guid_a, guid_b, weight, shared, last_seen)
+                SELECT guid_a, guid_b, weight, shared, last_seen FROM temp.alt_links_new
+            ''')
+            cursor.execute('''
+                DELETE FROM alt_clusters WHERE NOT EXISTS (
+                    SELECT 1 FROM temp.alt_clusters_new n
+                    WHERE n.guid = alt_clusters.guid AND n.cluster_id = alt_clusters.cluster_id)
+            ''')
+            cursor.execute('''
+                INSERT OR IGNORE INTO alt_clusters (guid, cluster_id)
+                SELECT guid, cluster_id FROM temp.alt_clusters_new
+            ''')
+        
+        for table in ('alt_evidence_new', 'alt_links_new', 'alt_clusters_new'):
+            cursor.execute(f'DELETE FROM temp.{table}')
+        self._commit(conn)
+        
+        return {
+            'links': len(links),
+            'clusters': len(members),
+            'clustered_players': len(parent),
+        }
+    
+    def get_alt_cluster(self, guid: str, min_weight: float = None) -> Dict:
+        """
+        Every GUID in the player's alt cluster with the links between them
+        Reads only the cluster's own rows. min_weight above the clustering threshold
+        narrows the result to what stays connected to this GUID through stronger links.
+        Returns {'cluster_id', 'members': [player rows], 'links': [...]} (no members if unlinked)
+        """
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT cluster_id FROM alt_clusters WHERE guid = ?', (guid,))
+            row = cursor.fetchone()
+            if not row:
+                return {'cluster_id': None, 'members': [], 'links': []}
+            cluster_id = row['cluster_id']
+            
+            cursor.execute('''
+                SELECT p.guid, p.current_name, p.current_ip, p.beguid, p.first_seen, p.last_seen,
+                       p.is_banned, p.ban_reason
+                FROM alt_clusters c
+                JOIN players p ON p.guid = c.guid
+                WHERE c.cluster_id = ?
+                ORDER BY p.last_seen DESC
+            ''', (cluster_id,))
+            members = [dict(row) for row in cursor.fetchall()]
+            member_guids = {member['guid'] for member in members}
+            
+            cursor.execute('''
+                SELECT l.guid_a, l.guid_b, l.weight, l.last_seen
+                FROM alt_clusters c
+                JOIN alt_links l ON l.guid_a = c.guid
+                WHERE c.cluster_id = ?
+            ''', (cluster_id,))
+            links = {(row['guid_a'], row['guid_b']): dict(row, shared=[]) for row in cursor.fetchall()
+                     if row['guid_b'] in member_guids}
+            
+            cursor.execute('''
+                SELECT e.guid_a, e.guid_b, e.kind, e.value
+                FROM alt_clusters c
+                JOIN alt_evidence e ON e.guid_a = c.guid
+                WHERE c.cluster_id = ?
+            ''', (cluster_id,))
+            for row in cursor.fetchall():
+                link = links.get((row['guid_a'], row['guid_b']))
+                if link:
+                    link['shared'].append((row['kind'], row['value']))
+        
+        links = sorted(links.values(), key=lambda link: -link['weight'])
+        if min_weight is not None and min_weight > self.alt_min_weight:
+            # Walk only the strong links out from this GUID
+            strong = {}
+            for link in links:
+                if link['weight'] >= min_weight:
+                    strong.setdefault(link['guid_a'], []).append(link['guid_b'])
+                    strong.setdefault(link['guid_b'], []).append(link['guid_a'])
+            reached = {guid}
+            pending = [guid]
+            while pending:
+                for other in strong.get(pending.pop(), ()):
+                    if other not in reached:
+                        reached.add(other)
+                        pending.append(other)
+            members = [member for member in members if member['guid'] in reached]
+            links = [link for link in links if link['guid_a'] in reached and link['guid_b'] in reached
+                     and link['weight'] >= min_weight]
+        
+        return {'cluster_id': cluster_id, 'members': members, 'links': links}
+    
+    def get_unacknowledged_alerts(self, limit: int = 50, after_id: int = None) -> List[Dict]:
+        """
+        Unacknowledged alerts, newest first
+        Pass the last id of a page as after_id for the next one - a keyset cursor,
+        so deep pages cost the same as the first (no OFFSET scan)
+        """
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            if after_id is None:
+                cursor.execute('''
+                    SELECT a.*, p.current_name, p.current_ip
+                    FROM player_alerts a
+                    JOIN players p ON a.guid = p.guid
+                    WHERE a.acknowledged = 0
+                    ORDER BY a.created_at DESC, a.id DESC
+                    LIMIT ?
+                ''', (limit,))
+            else:
+                cursor.execute('''
+                    SELECT a.*, p.current_name, p.current_ip
+                    FROM player_alerts a
+                    JOIN players p ON a.guid = p.guid
+                    WHERE a.acknowledged = 0
+                      AND (a.created_at, a.id) < (SELECT created_at, id FROM player_alerts WHERE id = ?)
+                    ORDER BY a.created_at DESC, a.id DESC
+                    LIMIT ?
+                ''', (after_id, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
     
     def acknowledge_alert(self, alert_id: int):
         """Mark an alert as acknowledged"""
+        self.acknowledge_alerts(ids=[alert_id])
+    
+    def acknowledge_alerts(self, ids: List[int] = None, before_timestamp: str = None,
+                           guid: str = None) -> int:
+        """
+        Acknowledge many alerts in one UPDATE
+        ids: these alerts; before_timestamp: everything created before it; guid: one player's.
+        Filters combine (AND). Returns how many alerts were newly acknowledged.
+        """
+        if ids is None and before_timestamp is None and guid is None:
+            raise ValueError("acknowledge_alerts needs ids, before_timestamp or guid")
+        
+        # With ids or a guid, look those rows up directly; the unary + stops SQLite from
+        # walking every unacknowledged alert through idx_alerts_unack_created instead
+        conditions = ['acknowledged = 0' if ids is None and guid is None else '+acknowledged = 0']
+        params = []
+        if ids is not None:
+            # One bound JSON array instead of a placeholder per id (no variable limit)
+            conditions.append('id IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps([int(alert_id) for alert_id in ids]))
+        if before_timestamp is not None:
+            conditions.append('created_at < ?')
+            params.append(before_timestamp)
+        if guid is not None:
+            conditions.append('guid = ?')
+            params.append(guid)
+        
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('UPDATE player_alerts SET acknowledged = 1 WHERE id = ?', (alert_id,))
-        conn.commit()
+        cursor.execute(f"UPDATE player_alerts SET acknowledged = 1 WHERE {' AND '.join(conditions)}", params)
+        self._commit(conn)
+        return cursor.rowcount
     
     def ban_player(self, guid: str, reason: str):
         """Mark a player as banned"""
@@ -422,6 +1928,7 @@ class PlayerDatabase:
             WHERE guid = ?
         ''', (reason, guid))
         conn.commit()
+        self.player_cache.invalidate(guid)
     
     def unban_player(self, guid: str):
         """Remove ban from a player"""
@@ -434,6 +1941,7 @@ class PlayerDatabase:
             WHERE guid = ?
         ''', (guid,))
         conn.commit()
+        self.player_cache.invalidate(guid)
     
     def add_notes(self, guid: str, notes: str):
         """Add admin notes to a player"""
@@ -442,45 +1950,160 @@ class PlayerDatabase:
         
         cursor.execute('UPDATE players SET notes = ? WHERE guid = ?', (notes, guid))
         conn.commit()
+        self.player_cache.invalidate(guid)
     
     def get_stats(self) -> Dict:
-        """Get database statistics"""
+        """Get database statistics (one row kept current by triggers - see check_stats_counters)"""
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT total_players, banned_players, unacknowledged_alerts, vpn_ips_detected
+                FROM stats_counters WHERE id = 1
+            ''')
+            return dict(cursor.fetchone())
+    
+    def check_stats_counters(self, repair: bool = True) -> Dict:
+        """
+        Recount everything get_stats reports the slow way and compare with stats_counters
+        Mismatches (e.g. rows changed with triggers disabled) are fixed when repair is set
+        Returns {'consistent', 'counters', 'actual'}
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT COUNT(*) as total FROM players')
-        total_players = cursor.fetchone()['total']
+        cursor.execute('''
+            SELECT (SELECT COUNT(*) FROM players) AS total_players,
+                   (SELECT COUNT(*) FROM players WHERE is_banned = 1) AS banned_players,
+                   (SELECT COUNT(*) FROM player_alerts WHERE acknowledged = 0) AS unacknowledged_alerts,
+                   (SELECT COUNT(DISTINCT ip_address) FROM player_ips WHERE is_vpn = 1) AS vpn_ips_detected
+        ''')
+        actual = dict(cursor.fetchone())
+        cursor.execute('''
+            SELECT total_players, banned_players, unacknowledged_alerts, vpn_ips_detected
+            FROM stats_counters WHERE id = 1
+        ''')
+        counters = dict(cursor.fetchone())
+        cursor.execute('''
+            WITH real AS (SELECT ip_address, COUNT(*) AS refs FROM player_ips WHERE is_vpn = 1 GROUP BY ip_address)
+            SELECT (SELECT COUNT(*) FROM (SELECT * FROM real EXCEPT SELECT * FROM stats_vpn_ips))
+                 + (SELECT COUNT(*) FROM (SELECT * FROM stats_vpn_ips EXCEPT SELECT * FROM real))
+        ''')
+        vpn_refs_ok = cursor.fetchone()[0] == 0
+        consistent = counters == actual and vpn_refs_ok
+        
+        if not consistent and repair:
+            # Counter triggers fire on stats_vpn_ips too, so set the row after refilling it
+            cursor.execute('DELETE FROM stats_vpn_ips')
+            cursor.execute('''
+                INSERT INTO stats_vpn_ips (ip_address, refs)
+                SELECT ip_address, COUNT(*) FROM player_ips WHERE is_vpn = 1 GROUP BY ip_address
+            ''')
+            cursor.execute('''
+                UPDATE stats_counters SET total_players = ?, banned_players = ?,
+                    unacknowledged_alerts = ?, vpn_ips_detected = ?
+                WHERE id = 1
+            ''', (actual['total_players'], actual['banned_players'],
+                  actual['unacknowledged_alerts'], actual['vpn_ips_detected']))
+            self._commit(conn)
         
-        cursor.execute('SELECT COUNT(*) as total FROM players WHERE is_banned = 1')
-        banned_players = cursor.fetchone()['total']
+        return {'consistent': consistent, 'counters': counters, 'actual': actual}
+    
+    def get_cache_stats(self) -> Dict:
+        """Player cache hit/miss counters"""
+        return self.player_cache.stats()
+    
+    def get_checkpoint(self, stream: str) -> Optional[Dict]:
+        """Get the saved ingestion position for a log stream (e.g. a server name)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
         
-        cursor.execute('SELECT COUNT(*) as total FROM player_alerts WHERE acknowledged = 0')
-        unack_alerts = cursor.fetchone()['total']
+        cursor.execute('''
+            SELECT file_path, inode, offset, last_line_hash, updated_at
+            FROM ingest_checkpoints
+            WHERE stream = ?
+        ''', (stream,))
+        row = cursor.fetchone()
         
-        cursor.execute('SELECT COUNT(DISTINCT ip_address) as total FROM player_ips WHERE is_vpn = 1')
-        vpn_ips = cursor.fetchone()['total']
+        return dict(row) if row else None
+    
+    def save_checkpoint(self, stream: str, file_path: str, inode: int,
+                        offset: int, last_line_hash: str = None):
+        """Record how far a log stream has been ingested"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        now = datetime.now().isoformat()
         
-        return {
-            'total_players': total_players,
-            'banned_players': banned_players,
-            'unacknowledged_alerts': unack_alerts,
-            'vpn_ips_detected': vpn_ips
-        }
+        cursor.execute('''
+            INSERT INTO ingest_checkpoints (stream, file_path, inode, offset, 
+                                           last_line_hash, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(stream) DO UPDATE SET
+                file_path = excluded.file_path,
+                inode = excluded.inode,
+                offset = excluded.offset,
+                last_line_hash = excluded.last_line_hash,
+                updated_at = excluded.updated_at
+        ''', (stream, file_path, inode, offset, last_line_hash, now))
+        self._commit(conn)
     
-    def cleanup_old_events(self, days: int = 30):
-        """Clean up old connection events to prevent database bloat"""
+    def cleanup_old_events(self, days: int = 30, archive_dir: str = None,
+                           chunk_size: int = 5000, pause: float = 0.05) -> int:
+        """
+        Clean up old connection events to prevent database bloat
+        Rows older than `days` are removed oldest first in chunks of chunk_size, each its own
+        short transaction (with a pause between) so the ingest writer is never locked out for long.
+        With archive_dir, every chunk is first appended to a gzipped JSON-lines file per month
+        (connection_events-YYYY-MM.jsonl.gz). Freed pages are reused, so the file stops growing.
+        Returns the number of rows deleted
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
         
-        cutoff = datetime.now()
-        cutoff = cutoff.replace(day=cutoff.day - days).isoformat()
+        if archive_dir:
+            os.makedirs(archive_dir, exist_ok=True)
         
-        cursor.execute('DELETE FROM connection_events WHERE timestamp < ?', (cutoff,))
-        deleted = cursor.rowcount
-        conn.commit()
+        deleted = 0
+        while True:
+            cursor.execute('''
+                SELECT id, guid, event_type, server_name, timestamp, name_used, ip_used
+                FROM connection_events
+                WHERE timestamp < ?
+                ORDER BY timestamp
+                LIMIT ?
+            ''', (cutoff, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            
+            if archive_dir:
+                self._archive_events(archive_dir, rows)
+            
+            cursor.execute(f'DELETE FROM connection_events WHERE id IN ({",".join("?" * len(rows))})',
+                           [row['id'] for row in rows])
+            conn.commit()
+            deleted += len(rows)
+            
+            if len(rows) < chunk_size:
+                break
+            time.sleep(pause)
         
         return deleted
-
+    
+    def _archive_events(self, archive_dir: str, rows):
+        """Append rows to their month's archive (gzip members concatenate, so appending is safe)"""
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row['timestamp'][:7], []).append(dict(row))
+        
+        for month, events in by_month.items():
+            path = os.path.join(archive_dir, f"connection_events-{month}.jsonl.gz")
+            with gzip.open(path, 'at', encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
 
 if __name__ == "__main__":
     # Test the database
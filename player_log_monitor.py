@@ -3,15 +3,19 @@ Log Parser Integration for Player Database
 Monitors BattleEye logs and automatically updates player database
 """
 
-import re
+import os
 import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import requests
-from collections import deque
 import time
 
 from player_database import PlayerDatabase
+from log_tailer import FileCursor, read_tail_lines
+from log_classifier import classify_line, parse_events
+from log_events import PlayerAuthenticated, PlayerDisconnected
 
 class PlayerLogMonitor:
     """
@@ -25,18 +29,10 @@ class PlayerLogMonitor:
         self.geo_cache = {}  # Cache IP lookups to reduce API calls
         self.cache_ttl = 3600  # 1 hour cache for IP lookups
         
-        # Player connection regex patterns
-        self.connect_pattern = re.compile(
-            r"Player (?:id=(\d+) )?(.+?) \((\d+)\) has been authenticated\."
-        )
-        self.disconnect_pattern = re.compile(
-            r"Player (?:id=\d+ )?(.+?) \((\d+)\) disconnected"
-        )
-        self.guid_pattern = re.compile(r"\((\d+)\)")
-        self.beguid_pattern = re.compile(r"BE GUID: (\w+)")
-        self.ip_pattern = re.compile(
-            r"(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}):(\d+)"
-        )
+        # Blocking work never runs on the event loop: SQLite writes go to one
+        # dedicated thread (so they stay serialized), HTTP lookups to the default pool
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="player-db")
+        self._geo_pending = {}  # ip -> in-flight lookup future, shared by concurrent callers
         
         print(f"✅ Player log monitor initialized with database: {db_path}")
     
@@ -45,33 +41,28 @@ class PlayerLogMonitor:
         Parse a player connection from log line
         Returns player data dictionary if connection found
         """
-        # Match authenticated player line
-        auth_match = self.connect_pattern.search(log_line)
-        if not auth_match:
+        # Single classifier pass (shared with the bot and crash monitor)
+        event = classify_line(log_line)
+        if type(event) is not PlayerAuthenticated:
             return None
         
-        player_id = auth_match.group(1)
-        player_name = auth_match.group(2)
-        guid = auth_match.group(3)
-        
-        # Extract IP address
-        ip_match = self.ip_pattern.search(log_line)
-        ip_address = ip_match.group(1) if ip_match else None
-        
-        # Extract BEGUID if present
-        beguid_match = self.beguid_pattern.search(log_line)
-        beguid = beguid_match.group(1) if beguid_match else None
-        
         return {
-            'player_id': player_id,
-            'name': player_name,
-            'guid': guid,
-            'ip': ip_address,
-            'beguid': beguid,
+            'player_id': event.player_id,
+            'name': event.name,
+            'guid': event.guid,
+            'ip': event.ip,
+            'beguid': event.beguid,
             'server_name': server_name,
             'timestamp': datetime.now().isoformat()
         }
     
+    def _cached_geolocation(self, ip: str) -> Optional[Dict]:
+        if ip in self.geo_cache:
+            cached_data, cached_time = self.geo_cache[ip]
+            if time.time() - cached_time < self.cache_ttl:
+                return cached_data
+        return None
+    
     def get_ip_geolocation(self, ip: str) -> Optional[Dict]:
         """
         Get geolocation data for an IP address with caching
@@ -81,10 +72,9 @@ class PlayerLogMonitor:
             return None
         
         # Check cache
-        if ip in self.geo_cache:
-            cached_data, cached_time = self.geo_cache[ip]
-            if time.time() - cached_time < self.cache_ttl:
-                return cached_data
+        cached = self._cached_geolocation(ip)
+        if cached is not None:
+            return cached
         
         # Fetch from API
         try:
@@ -115,28 +105,99 @@ class PlayerLogMonitor:
         Process a single log line and update database if player event detected
         Returns list of alerts if any generated
         """
-        player_data = self.parse_player_connection(log_line, server_name)
-        
-        if not player_data:
+        event = classify_line(log_line)
+        if type(event) is PlayerDisconnected and event.guid:
+            self.db.close_session(event.guid, server_name)
+            return None
+        if type(event) is not PlayerAuthenticated:
             return None
         
+        event.server_name = server_name
+        return self.process_event(event)
+    
+    def process_event(self, event: PlayerAuthenticated) -> Optional[list]:
+        """
+        Update the database from an authentication event (from the parse pipeline)
+        Returns list of alerts if any generated
+        """
         # Get geolocation data if IP available
         geo_data = None
-        if player_data['ip']:
-            geo_data = self.get_ip_geolocation(player_data['ip'])
+        if event.ip:
+            geo_data = self.get_ip_geolocation(event.ip)
         
         # Update database and get alerts
         alerts = self.db.update_player(
-            guid=player_data['guid'],
-            name=player_data['name'],
-            ip=player_data['ip'],
-            beguid=player_data['beguid'],
-            server_name=player_data['server_name'],
+            guid=event.guid,
+            name=event.name,
+            ip=event.ip,
+            beguid=event.beguid,
+            server_name=event.server_name,
             geo_data=geo_data
         )
         
         return alerts if alerts else None
     
+    async def run_db(self, func, *args, **kwargs):
+        """Await a blocking database call on the dedicated DB thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, functools.partial(func, *args, **kwargs))
+    
+    async def get_ip_geolocation_async(self, ip: str) -> Optional[Dict]:
+        """
+        Non-blocking get_ip_geolocation: cache hits return immediately,
+        concurrent lookups of the same IP share one HTTP request
+        """
+        if not self.api_key:
+            return None
+        
+        cached = self._cached_geolocation(ip)
+        if cached is not None:
+            return cached
+        
+        pending = self._geo_pending.get(ip)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = loop.run_in_executor(None, self.get_ip_geolocation, ip)
+            self._geo_pending[ip] = pending
+            pending.add_done_callback(lambda _: self._geo_pending.pop(ip, None))
+        
+        # shield: one cancelled caller must not cancel the lookup for the others
+        return await asyncio.shield(pending)
+    
+    async def process_events_async(self, events: List) -> List[list]:
+        """
+        Non-blocking process_event for a batch of authentication and disconnect events
+        Geo lookups run concurrently; DB writes then happen in log order on the DB thread
+        (a disconnect closes the player's session). Returns the alert list for each event
+        (empty when none)
+        """
+        if not events:
+            return []
+        
+        ips = {event.ip for event in events if type(event) is PlayerAuthenticated and event.ip}
+        lookups = await asyncio.gather(*(self.get_ip_geolocation_async(ip) for ip in ips))
+        geo_by_ip = dict(zip(ips, lookups))
+        
+        def write_all():
+            results = []
+            for event in events:
+                if type(event) is PlayerDisconnected:
+                    if event.guid:  # BattlEye's own disconnect line has no platform GUID
+                        self.db.close_session(event.guid, event.server_name)
+                    results.append([])
+                    continue
+                results.append(self.db.update_player(
+                    guid=event.guid,
+                    name=event.name,
+                    ip=event.ip,
+                    beguid=event.beguid,
+                    server_name=event.server_name,
+                    geo_data=geo_by_ip.get(event.ip)
+                ) or [])
+            return results
+        
+        return await self.run_db(write_all)
+    
     async def monitor_log_file(self, log_file_path: str, server_name: str, 
                                alert_callback=None):
         """
@@ -145,26 +206,32 @@ class PlayerLogMonitor:
         """
         print(f"📡 Starting log monitor for {server_name}: {log_file_path}")
         
+        loop = asyncio.get_running_loop()
+        
+        if not await loop.run_in_executor(None, os.path.exists, log_file_path):
+            print(f"❌ Log file not found: {log_file_path}")
+            return
+        
         try:
-            with open(log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                # Go to end of file
-                f.seek(0, 2)
+            # Byte-offset cursor: only new complete lines are read, starting at end of file
+            cursor = FileCursor(log_file_path)
+            await loop.run_in_executor(None, cursor.seek_end)
+            
+            # This coroutine only coordinates - reads, lookups and writes all run in executors
+            while True:
+                lines = await loop.run_in_executor(None, cursor.read_lines)
                 
-                while True:
-                    line = f.readline()
-                    
-                    if line:
-                        # Process the line
-                        alerts = self.process_log_line(line, server_name)
-                        
-                        if alerts and alert_callback:
-                            await alert_callback(alerts, server_name)
-                    else:
-                        # No new lines, wait a bit
-                        await asyncio.sleep(1)
+                events = [event for event in parse_events(lines, server_name)
+                          if type(event) in (PlayerAuthenticated, PlayerDisconnected)]
+                
+                for alerts in await self.process_events_async(events):
+                    if alerts and alert_callback:
+                        await alert_callback(alerts, server_name)
+                
+                if not lines:
+                    # No new lines, wait a bit
+                    await asyncio.sleep(1)
                         
-        except FileNotFoundError:
-            print(f"❌ Log file not found: {log_file_path}")
         except Exception as e:
             print(f"❌ Error monitoring log: {e}")
     
@@ -184,28 +251,33 @@ class PlayerLogMonitor:
         }
         
         try:
-            with open(log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                # Read from end if file is large
-                lines = deque(f, maxlen=max_lines)
+            # Read from end if file is large (mmap tail - never walks the whole file)
+            lines = read_tail_lines(log_file_path, max_lines, errors='ignore')
+            
+            stats['lines_processed'] = len(lines)
+            
+            for event in parse_events(lines, server_name):
+                if type(event) is PlayerDisconnected and event.guid:
+                    self.db.close_session(event.guid, server_name)
+                    continue
+                if type(event) is not PlayerAuthenticated:
+                    continue
                 
-                for line in lines:
-                    stats['lines_processed'] += 1
+                try:
+                    alerts = self.process_event(event)
                     
-                    try:
-                        alerts = self.process_log_line(line, server_name)
+                    if alerts:
+                        stats['players_found'] += 1
+                        stats['alerts_generated'] += len(alerts)
                         
-                        if alerts:
-                            stats['players_found'] += 1
-                            stats['alerts_generated'] += len(alerts)
-                            
-                    except Exception as e:
-                        stats['errors'] += 1
-                        print(f"⚠️ Error processing line: {e}")
-                        continue
-                
-                print(f"✅ Batch processing complete: {stats}")
-                return stats
-                
+                except Exception as e:
+                    stats['errors'] += 1
+                    print(f"⚠️ Error processing line: {e}")
+                    continue
+            
+            print(f"✅ Batch processing complete: {stats}")
+            return stats
+            
         except FileNotFoundError:
             print(f"❌ Log file not found: {log_file_path}")
             stats['errors'] += 1
@@ -215,14 +287,12 @@ class PlayerLogMonitor:
             stats['errors'] += 1
             return stats
     
-    def get_active_sessions(self) -> list:
+    def get_active_sessions(self, server_name: str = None) -> list:
         """
         Get list of currently active player sessions
         (Players who connected but haven't disconnected yet)
         """
-        # This would track active sessions in memory
-        # For now, return recent connections from database
-        return []
+        return self.db.get_open_sessions(server_name)
 
 
 # Example integration with existing Discord bot
@@ -253,7 +323,10 @@ class DatabaseAlertHandler:
                 }]
             }
             
-            response = requests.post(self.webhook_url, json=message, timeout=5)
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                None, functools.partial(requests.post, self.webhook_url, json=message, timeout=5)
+            )
             
             if response.status_code not in [200, 204]:
                 print(f"⚠️ Webhook error: {response.status_code}")
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Replay Benchmark Harness
+Replays synthetic (log_generator) or real session logs through the same code
+paths production uses and reports throughput and latency per stage:
+
+  parse        log_classifier.parse_events over every archived session
+  monitor      PlayerLogMonitor.process_event (one commit per connection)
+  ingest       IngestQueue (batched commits)
+  crash scans  crash_monitor.scan_logs_for_packet_loss / scan_logs_for_crashes
+  bot queries  LogIndex build + search (/find-player, /player-ip, /player-history)
+               and the /players session parse
+  live         N servers written in real time x speed, tailed by LogTailer ->
+               EventPipeline -> IngestQueue; reports how far behind ingestion runs
+
+Usage: python3 replay_bench.py [--servers 3] [--players 128] [--sessions 3] [--minutes 60]
+                               [--speed 60] [--live-seconds 20] [--logs EXISTING_ROOT]
+"""
+
+import argparse
+import bisect
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from log_classifier import parse_events, EventPipeline
+from log_events import PlayerAuthenticated
+from log_generator import generate_tree
+from log_tailer import LogTailer, read_tail
+from player_database import PlayerDatabase
+from ingest_queue import IngestQueue
+from log_index import LogIndex
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def latency_summary(values: List[float]) -> str:
+    """'p50 1.2 / p95 3.4 / p99 5.6 / max 7.8 ms' from seconds"""
+    ms = [v * 1000 for v in values]
+    return (f"p50 {percentile(ms, 50):.2f} / p95 {percentile(ms, 95):.2f} / "
+            f"p99 {percentile(ms, 99):.2f} / max {max(ms, default=0):.2f} ms")
+
+
+def session_files(log_paths: Dict[str, str]) -> List[tuple]:
+    """[(server_name, console.log)] oldest first"""
+    files = []
+    for server_name, root in log_paths.items():
+        for d in sorted(os.listdir(root)):
+            log_file = os.path.join(root, d, "console.log")
+            if d.startswith('20') and os.path.exists(log_file):
+                files.append((server_name, log_file))
+    return files
+
+
+def bench_parse(files) -> List[PlayerAuthenticated]:
+    """Parse every session; returns the authentication events for the DB stages"""
+    lines = 0
+    size = 0
+    auth_events = []
+    started = time.perf_counter()
+    for server_name, log_file in files:
+        size += os.path.getsize(log_file)
+        with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
+            for event in parse_events(f, server_name):
+                if type(event) is PlayerAuthenticated:
+                    auth_events.append(event)
+    elapsed = time.perf_counter() - started
+    for _, log_file in files:
+        with open(log_file, 'rb') as f:
+            lines += sum(1 for _ in f)
+    print(f"📖 parse        {lines:,} lines / {size / 1024 / 1024:.1f} MB in {elapsed:.2f}s "
+          f"→ {lines / elapsed:,.0f} lines/s, {size / 1024 / 1024 / elapsed:.1f} MB/s "
+          f"({len(auth_events):,} player connections)")
+    return auth_events
+
+
+def bench_monitor(work_dir: str, events: List[PlayerAuthenticated], limit: int):
+    """Per-connection path: PlayerLogMonitor.process_event (no geo API key)"""
+    try:
+        from player_log_monitor import PlayerLogMonitor
+    except ImportError as e:
+        print(f"⏭️ monitor      skipped ({e})")
+        return
+    monitor = PlayerLogMonitor(os.path.join(work_dir, "monitor.db"))
+    events = events[:limit]
+    latencies = []
+    started = time.perf_counter()
+    for event in events:
+        t = time.perf_counter()
+        monitor.process_event(event)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+    print(f"🗄️ monitor      {len(events):,} connections → {len(events) / elapsed:,.0f}/s "
+          f"| per connection {latency_summary(latencies)}")
+
+
+def bench_ingest(work_dir: str, events: List[PlayerAuthenticated], limit: int):
+    """Batched path: IngestQueue with one commit per batch"""
+    db = PlayerDatabase(os.path.join(work_dir, "ingest.db"))
+    queue = IngestQueue(db)
+    events = events[:limit]
+    started = time.perf_counter()
+    for event in events:
+        queue.put(event.guid, event.name, event.ip, event.beguid, event.server_name)
+    queue.close()
+    elapsed = time.perf_counter() - started
+    stats = queue.stats()
+    print(f"📦 ingest       {len(events):,} connections → {len(events) / elapsed:,.0f}/s "
+          f"| {stats['batches']} batches, last {stats['last_batch_ms']:.1f} ms, max depth {stats['max_depth']}")
+
+
+class _ReplayContainer:
+    """Stands in for a docker container: logs(tail=N) comes from a console.log"""
+
+    def __init__(self, log_file: str):
+        self.log_file = log_file
+
+    def logs(self, tail=100):
+        return read_tail(self.log_file, tail).encode('utf-8')
+
+
+def bench_crash_scans(log_paths: Dict[str, str], files, rounds: int):
+    try:
+        import crash_monitor
+    except ImportError as e:
+        print(f"⏭️ crash scans  skipped ({e})")
+        return
+
+    # In place: the module's console tailer holds a reference to this dict
+    crash_monitor.LOG_PATHS.clear()
+    crash_monitor.LOG_PATHS.update(log_paths)
+    loss_latencies = []
+    crash_latencies = []
+    for server_name in log_paths:
+        latest = [f for s, f in files if s == server_name][-1]
+        container = _ReplayContainer(latest)
+        for _ in range(rounds):
+            t = time.perf_counter()
+            crash_monitor.scan_logs_for_packet_loss(container, server_name)
+            loss_latencies.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            crash_monitor.scan_logs_for_crashes(container)
+            crash_latencies.append(time.perf_counter() - t)
+    print(f"💥 packet loss  {latency_summary(loss_latencies)}")
+    print(f"💥 crash scan   {latency_summary(crash_latencies)}")
+
+
+def bench_bot_queries(work_dir: str, log_paths: Dict[str, str], files, events, queries: int):
+    index = LogIndex(os.path.join(work_dir, "log_index.db"), log_paths)
+    started = time.perf_counter()
+    stats = index.update()
+    print(f"📇 index build  {stats['sessions_indexed']} sessions, {stats['postings_added']:,} postings "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(7)
+    names = list({e.name for e in events}) or ["nobody"]
+    latencies = []
+    for _ in range(queries):
+        server_name = rng.choice(list(log_paths))
+        t = time.perf_counter()
+        index.search(server_name, rng.choice(names)[:8])
+        latencies.append(time.perf_counter() - t)
+    print(f"🔍 player search {latency_summary(latencies)}")
+
+    # /players and /player-ips parse the whole current session
+    latencies = []
+    for server_name in log_paths:
+        latest = [f for s, f in files if s == server_name][-1]
+        with open(latest, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        t = time.perf_counter()
+        online = set()
+        for event in parse_events(text.split('\n')):
+            if event.kind == 'be_connect':
+                online.add(event.name)
+            elif event.kind == 'be_disconnect':
+                online.discard(event.name)
+        latencies.append(time.perf_counter() - t)
+    print(f"👥 /players     {latency_summary(latencies)} (whole session parse)")
+
+
+def bench_live(work_dir: str, files, seconds: float, speed: float):
+    """
+    Real-time replay: one writer thread per server appends its newest session at
+    speed x real time; LogTailer -> EventPipeline -> IngestQueue consumes.
+    Lag = time between a line hitting the file and its chunk being processed.
+    """
+    live_root = os.path.join(work_dir, "live")
+    sources = {}
+    for server_name, log_file in files:
+        sources[server_name] = log_file  # newest session wins
+    log_paths = {}
+    for server_name in sources:
+        root = os.path.join(live_root, server_name)
+        os.makedirs(os.path.join(root, "2099-01-01_00-00-00"))
+        log_paths[server_name] = root
+
+    db = PlayerDatabase(os.path.join(work_dir, "live.db"))
+    queue = IngestQueue(db)
+    pipeline = EventPipeline()
+    pipeline.subscribe(lambda e: queue.put(e.guid, e.name, e.ip, e.beguid, e.server_name), PlayerAuthenticated)
+
+    written = {s: [] for s in sources}  # server -> [(end offset, write time)]
+    stop = threading.Event()
+
+    def writer(server_name, source):
+        with open(source, 'rb') as f:
+            data = f.readlines()
+        # The generator's lines span duration_minutes; estimate real-time rate from line timestamps
+        first, last = data[0][:8].decode(), data[-1][:8].decode()
+        span = max(1, _seconds(last) - _seconds(first))
+        per_tick = max(1, int(len(data) / span * speed * 0.05))
+        target = os.path.join(log_paths[server_name], "2099-01-01_00-00-00", "console.log")
+        offset = 0
+        with open(target, 'ab', buffering=0) as out:
+            for i in range(0, len(data), per_tick):
+                if stop.is_set():
+                    break
+                chunk = b''.join(data[i:i + per_tick])
+                out.write(chunk)
+                offset += len(chunk)
+                written[server_name].append((offset, time.perf_counter()))
+                time.sleep(0.05)
+
+    for server_name in sources:
+        open(os.path.join(log_paths[server_name], "2099-01-01_00-00-00", "console.log"), 'wb').close()
+
+    tailer = LogTailer(log_paths, start_at_end=False)
+    for server_name in log_paths:
+        tailer.start(server_name)
+
+    threads = [threading.Thread(target=writer, args=(s, src), daemon=True) for s, src in sources.items()]
+    for t in threads:
+        t.start()
+
+    lags = []
+    lines_done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for server_name in log_paths:
+            for lines in tailer.iter_new_chunks(server_name):
+                pipeline.feed(lines, server_name)
+                lines_done += len(lines)
+                offset = tailer.checkpoint(server_name)['offset']
+                marks = written[server_name]
+                i = bisect.bisect_left(marks, (offset, 0))
+                if i < len(marks):
+                    lags.append(time.perf_counter() - marks[i][1])
+        tailer.wait(0.05)
+
+    stop.set()
+    for t in threads:
+        t.join()
+    queue.close()
+    tailer.close()
+    elapsed = time.perf_counter() - started
+    bytes_written = sum(marks[-1][0] for marks in written.values() if marks)
+    print(f"📡 live         {len(sources)} servers at {speed:g}x: {lines_done:,} lines in {elapsed:.1f}s "
+          f"({lines_done / elapsed:,.0f} lines/s, {bytes_written / 1024 / 1024 / elapsed:.2f} MB/s)")
+    print(f"📡 live lag     {latency_summary(lags)} | ingest {queue.stats()['written']:,} connections, "
+          f"max queue depth {queue.stats()['max_depth']}")
+
+
+def _seconds(hms: str) -> int:
+    h, m, s = hms.split(':')
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay session logs through the parsing/DB stack")
+    parser.add_argument('--logs', help="Existing LOG_PATHS-style root (<root>/<server>/<session>/console.log)")
+    parser.add_argument('--servers', type=int, default=3)
+    parser.add_argument('--players', type=int, default=128, help="Slots per server")
+    parser.add_argument('--sessions', type=int, default=3, help="Sessions per server")
+    parser.add_argument('--minutes', type=float, default=60, help="Session length")
+    parser.add_argument('--churn', type=float, default=60, help="Leaves per hour once full")
+    parser.add_argument('--speed', type=float, default=60, help="Live replay speed (x real time)")
+    parser.add_argument('--live-seconds', type=float, default=20)
+    parser.add_argument('--db-events', type=int, default=5000, help="Connections replayed per DB stage")
+    parser.add_argument('--keep', action='store_true', help="Keep the work directory")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="replay_bench_")
+    try:
+        if args.logs:
+            log_paths = {d: os.path.join(args.logs, d) for d in sorted(os.listdir(args.logs))
+                         if os.path.isdir(os.path.join(args.logs, d))}
+        else:
+            t = time.perf_counter()
+            log_paths = generate_tree(os.path.join(work_dir, "logs"), servers=args.servers,
+                                      sessions=args.sessions, players=args.players,
+                                      churn_per_hour=args.churn, duration_minutes=args.minutes)
+            print(f"🧪 Generated {args.servers} servers x {args.sessions} sessions "
+                  f"({args.players} slots, {args.minutes:g} min) in {time.perf_counter() - t:.1f}s")
+
+        files = session_files(log_paths)
+        print("\n" + "="*60)
+        events = bench_parse(files)
+        bench_monitor(work_dir, events, args.db_events)
+        bench_ingest(work_dir, events, args.db_events)
+        bench_crash_scans(log_paths, files, rounds=20)
+        bench_bot_queries(work_dir, log_paths, files, events, queries=200)
+        bench_live(work_dir, files, args.live_seconds, args.speed)
+        print("="*60 + "\n")
+    finally:
+        if args.keep:
+            print(f"📁 Work directory kept: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
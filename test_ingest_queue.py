@@ -0,0 +1,78 @@
+"""
+Regression tests for the Ingest Queue
+Run with: python -m pytest test_ingest_queue.py
+"""
+
+import threading
+
+import pytest
+
+from ingest_queue import IngestQueue, POLICY_DROP, POLICY_MERGE
+from player_database import PlayerDatabase
+
+
+@pytest.mark.parametrize('policy', [POLICY_DROP, POLICY_MERGE])
+def test_reconnect_after_disconnect_is_not_a_duplicate(tmp_path, monkeypatch, policy):
+    """connect, disconnect, connect: the second connect is written even while the first is queued"""
+    # Hold the writer until all three items are queued
+    started = threading.Event()
+    take_batch = IngestQueue._take_batch
+    monkeypatch.setattr(IngestQueue, '_take_batch', lambda self: started.wait() and take_batch(self))
+
+    db = PlayerDatabase(str(tmp_path / "players.db"))
+    queue = IngestQueue(db, policy=policy)
+    queue.put('guid-a', 'Alpha', server_name='TTT1', connected_at='2026-03-01T20:00:00')
+    queue.put_disconnect('guid-a', 'TTT1', '2026-03-01T20:10:00')
+    queue.put('guid-a', 'Alpha', server_name='TTT1', connected_at='2026-03-01T20:20:00')
+    started.set()
+    queue.close()
+
+    assert db.get_player_by_guid('guid-a')['total_connections'] == 2
+    assert queue.stats()['dropped'] == queue.stats()['merged'] == 0
+
+
+def test_failed_batch_still_saves_checkpoints(tmp_path):
+    """A run that can't be written loses only its own events, not the batch's checkpoints"""
+    db = PlayerDatabase(str(tmp_path / "players.db"))
+    update_players_batch = db.update_players_batch
+
+    def failing_batch(events):
+        if any(event['guid'] == 'guid-bad' for event in events):
+            raise ValueError("bad event")
+        return update_players_batch(events)
+
+    db.update_players_batch = failing_batch
+    queue = IngestQueue(db)
+    queue.put('guid-a', 'Alpha', server_name='TTT1')
+    queue.put_checkpoint('TTT1', {'file_path': 'console.log', 'inode': 1, 'offset': 100})
+    queue.put('guid-bad', 'Bad', server_name='TTT1')
+    queue.put_checkpoint('TTT1', {'file_path': 'console.log', 'inode': 1, 'offset': 200})
+    queue.close()
+
+    assert db.get_player_by_guid('guid-a') is not None
+    assert db.get_player_by_guid('guid-bad') is None
+    assert db.get_checkpoint('TTT1')['offset'] == 200
+    assert queue.stats()['errors'] == 1
+
+
+def test_dropped_markers_count_as_errors(tmp_path):
+    """A checkpoint the fallback couldn't save is an error, not a saved checkpoint"""
+    db = PlayerDatabase(str(tmp_path / "players.db"))
+    save_checkpoint = db.save_checkpoint
+
+    def failing_checkpoint(stream, **checkpoint):
+        if stream == 'broken':
+            raise ValueError("bad checkpoint")
+        return save_checkpoint(stream, **checkpoint)
+
+    db.save_checkpoint = failing_checkpoint
+    queue = IngestQueue(db)
+    queue.put('guid-a', 'Alpha', server_name='TTT1')
+    queue.put_checkpoint('broken', {'file_path': 'console.log', 'inode': 1, 'offset': 100})
+    queue.put_checkpoint('TTT1', {'file_path': 'console.log', 'inode': 1, 'offset': 100})
+    queue.close()
+
+    stats = queue.stats()
+    assert stats['checkpoints'] == 1
+    assert stats['errors'] == 1
+    assert stats['written'] == 1
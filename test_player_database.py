@@ -0,0 +1,75 @@
+"""
+Regression tests for the Player Database
+Run with: python -m pytest test_player_database.py
+"""
+
+from player_database import PlayerDatabase
+
+VPN = {'security': {'is_vpn': True}}
+NO_VPN = {'security': {}}
+
+
+def test_vpn_flag_flip_on_shared_ip(tmp_path):
+    """A known IP turning VPN again must not collide with another GUID's stats_vpn_ips row"""
+    db = PlayerDatabase(str(tmp_path / "players.db"))
+
+    db.update_player('guid-a', 'Alpha', '203.0.113.7', server_name='TTT1', geo_data=VPN)
+    db.update_player('guid-b', 'Bravo', '203.0.113.7', server_name='TTT1', geo_data=NO_VPN)
+    # The upsert's DO UPDATE flips guid-b's row to VPN: stats_ips_update fires inside it
+    alerts = db.update_player('guid-b', 'Bravo', '203.0.113.7', server_name='TTT1', geo_data=VPN)
+    assert not any(alert.startswith('Error') for alert in alerts)
+
+    # Failed geo lookup, then VPN again (1 -> 0 -> 1)
+    for geo_data in (NO_VPN, VPN):
+        alerts = db.update_player('guid-a', 'Alpha', '203.0.113.7', server_name='TTT1', geo_data=geo_data)
+        assert not any(alert.startswith('Error') for alert in alerts)
+
+    assert db.get_player_by_guid('guid-b')['total_connections'] == 2
+    check = db.check_stats_counters(repair=False)
+    assert check['consistent']
+    assert db.get_stats()['vpn_ips_detected'] == 1
+
+
+def test_search_results_do_not_open_sessions(tmp_path):
+    """Players found by a log search are recorded without a phantom play session"""
+    db = PlayerDatabase(str(tmp_path / "players.db"))
+
+    db.update_player('guid-a', 'Alpha', '198.51.100.1', server_name='TTT1', connected_at='2026-03-01T20:00:00')
+    db.close_session('guid-a', 'TTT1', '2026-03-01T20:30:00')
+    db.update_player('guid-a', 'Alpha', '198.51.100.1', server_name='ttt1', open_session=False)
+    db.update_players_batch([{'guid': 'guid-a', 'name': 'Alpha', 'server_name': 'ttt1', 'open_session': False}])
+
+    assert db.get_playtime('guid-a')['total_playtime_seconds'] == 1800
+    assert db.get_open_sessions() == []
+
+
+def test_sessions_match_server_names_case_insensitively(tmp_path):
+    """A session opened as 'ttt1' is closed by a restart of 'TTT1'"""
+    db = PlayerDatabase(str(tmp_path / "players.db"))
+
+    db.update_player('guid-a', 'Alpha', server_name='ttt1', connected_at='2026-03-01T20:00:00')
+    assert db.close_server_sessions('TTT1', '2026-03-01T21:00:00') == 1
+    assert db.get_playtime('guid-a')['total_playtime_seconds'] == 3600
+
+
+def test_batch_and_single_updates_link_the_same_alts(tmp_path):
+    """update_players_batch records the same alt evidence and links as one update_player per event"""
+    events = [
+        {'guid': 'guid-a', 'name': 'Alpha', 'ip': '203.0.113.1', 'connected_at': '2026-03-01T20:00:00'},
+        {'guid': 'guid-b', 'name': 'Bravo', 'ip': '203.0.113.1', 'connected_at': '2026-03-01T20:05:00'},
+        {'guid': 'guid-a', 'name': 'Charlie', 'ip': '203.0.113.2', 'connected_at': '2026-03-01T20:10:00'},
+        {'guid': 'guid-c', 'name': 'Charlie', 'ip': '203.0.113.2', 'connected_at': '2026-03-01T20:15:00'},
+    ]
+    single = PlayerDatabase(str(tmp_path / "single.db"))
+    for event in events:
+        single.update_player(**event)
+    batch = PlayerDatabase(str(tmp_path / "batch.db"))
+    batch.update_players_batch(events)
+
+    def links(db):
+        conn = db._get_connection()
+        return (sorted(map(tuple, conn.execute('SELECT * FROM alt_evidence'))),
+                sorted(map(tuple, conn.execute('SELECT * FROM alt_links'))))
+
+    assert links(single)[1]
+    assert links(batch) == links(single)